@@ -0,0 +1,138 @@
+# dev/bench_frontend.py
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import httpx
+import numpy as np
+import requests
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dev.benchmark import free_port
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+PAYLOAD = {
+    "text": "The council approved a new budget for schools, roads and parks after months of debate. "
+            "Residents raised concerns about rising costs while officials promised more transparency.",
+    "max_length": 40,
+}
+
+
+def self_signed(directory: str) -> tuple:
+    key, cert = os.path.join(directory, "key.pem"), os.path.join(directory, "cert.pem")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+        "-keyout", key, "-out", cert, "-subj", "/CN=127.0.0.1",
+        "-addext", "subjectAltName=IP:127.0.0.1",
+    ], check=True, capture_output=True)
+    return key, cert
+
+
+def pooled_client(url: str, verify) -> httpx.Client:
+    """Configured like get_client() in streamlit_app.py"""
+    return httpx.Client(
+        base_url=url,
+        transport=httpx.HTTPTransport(
+            http2=HTTP2, retries=2, verify=verify,
+            limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+        ),
+        timeout=httpx.Timeout(30, connect=10),
+    )
+
+
+def stream_events(lines) -> int:
+    """Read an SSE stream to its end; returns the number of events"""
+    return sum(1 for line in lines if line.startswith("event: "))
+
+
+def timed(call: Callable[[], None], runs: int) -> List[float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frontend API round trips: a new connection per call vs a pooled client")
+    parser.add_argument("--url", help="a deployed API (default: start one locally behind TLS)")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    process = None
+    with tempfile.TemporaryDirectory() as directory:
+        url, verify = args.url, True
+        if url is None:
+            key, cert = self_signed(directory)
+            port = free_port()
+            url, verify = f"https://127.0.0.1:{port}", cert
+            process = subprocess.Popen([
+                sys.executable, "-m", "uvicorn", "src.server.main:app", "--port", str(port),
+                "--ssl-keyfile", key, "--ssl-certfile", cert, "--log-level", "warning",
+            ], cwd=project_root, env={**os.environ, "SUMMARIZE_BACKEND": "local", "LOG_LEVEL": "WARNING"})
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    requests.get(f"{url}/health", verify=verify, timeout=1)
+                    break
+                except requests.RequestException:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.1)
+
+            # What streamlit_app.py did: module-level requests calls, one connection each
+            def fresh_health():
+                requests.get(f"{url}/health", verify=verify, timeout=10).json()
+
+            def fresh_stream():
+                with requests.post(f"{url}/summarize/stream", json=PAYLOAD, stream=True,
+                                   verify=verify, timeout=(10, 30)) as response:
+                    stream_events(response.iter_lines(decode_unicode=True))
+
+            client = pooled_client(url, verify)
+
+            def pooled_health():
+                client.get("/health", timeout=10).json()
+
+            def pooled_stream():
+                with client.stream("POST", "/summarize/stream", json=PAYLOAD) as response:
+                    stream_events(response.iter_lines())
+
+            # The summary is cached server-side after the first call, so these
+            # times are mostly connection setup and transfer
+            cases = [
+                ("/health", "new connection", fresh_health),
+                ("/health", "pooled", pooled_health),
+                ("/summarize/stream", "new connection", fresh_stream),
+                ("/summarize/stream", "pooled", pooled_stream),
+            ]
+            pooled_health()
+            print(f"{url}, {args.runs} calls each, pooled client on "
+                  f"{client.get('/health').http_version}\n")
+            print(f"{'call':<18} {'client':<15} {'p50 ms':>8} {'p95 ms':>8}")
+            for path, name, call in cases:
+                times = timed(call, args.runs)
+                print(f"{path:<18} {name:<15} {np.percentile(times, 50):>8.2f} {np.percentile(times, 95):>8.2f}")
+            client.close()
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# dev/bench_payloads.py
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+SIZES = {"1KB": 1024, "1MB": 1024 ** 2, "10MB": 10 * 1024 ** 2}
+# "legacy" is /summarize as it was: a pydantic body, the full text echoed
+# and the response encoded by FastAPI with the json module
+MODES = ("legacy", "full", "truncated", "none")
+SERIALIZE_REPEATS = {"1KB": 2000, "1MB": 20, "10MB": 3}
+
+
+def make_text(size: int) -> str:
+    from src.server.main import SAMPLE_DOC
+    return (SAMPLE_DOC + " ") * (size // (len(SAMPLE_DOC) + 1)) + SAMPLE_DOC[:size % (len(SAMPLE_DOC) + 1)]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def add_legacy_route(main) -> None:
+    from fastapi.responses import JSONResponse
+    from pydantic import BaseModel
+
+    from src.server.main import SummarizeRequest, summarize_text, validate_text
+
+    class LegacyResponse(BaseModel):
+        original_text: str
+        summary: str
+        summary_source: str
+
+    @main.app.post("/legacy", response_model=LegacyResponse, response_class=JSONResponse)
+    async def legacy(request: SummarizeRequest):
+        validate_text(request.text)
+        result = await summarize_text(request.text, request.max_length)
+        return {"original_text": request.text, "summary": result.summary, "summary_source": result.source}
+
+
+def measure(size_name: str, mode: str) -> dict:
+    """One request in this (fresh) process: peak RSS it added, and its latency"""
+    import httpx
+
+    from dev.fake_backend import install
+    from src.server import main
+
+    install(main.engine, latency=0)
+    main.engine.cache = None
+    main.engine.chunk_tokens = 10 ** 9  # one completion, however large the input
+    main.engine.preprocessor = None  # its cost depends on the text, not the payload size
+    add_legacy_route(main)
+
+    body = {"text": make_text(SIZES[size_name]), "max_length": 40}
+    path = "/legacy"
+    if mode != "legacy":
+        path = "/summarize"
+        body["echo_original"] = mode
+    content = json.dumps(body).encode("utf-8")
+    del body
+
+    async def post():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+            # Warm up imports and lazy state on a small request first
+            await client.post("/summarize", json={"text": make_text(1024), "echo_original": "none"})
+            gc.collect()
+            before = peak_rss_mb()
+            start = time.perf_counter()
+            response = await client.post(path, content=content, headers={"content-type": "application/json"})
+            latency = time.perf_counter() - start
+            assert response.status_code == 200, response.text[:200]
+            return before, latency, len(response.content)
+
+    before, latency, response_bytes = asyncio.run(post())
+    return {
+        "size": size_name,
+        "mode": mode,
+        "peak_rss_added_mb": round(peak_rss_mb() - before, 1),
+        "latency_ms": round(latency * 1000, 1),
+        "request_bytes": len(content),
+        "response_bytes": response_bytes,
+    }
+
+
+def serialization(size_name: str) -> dict:
+    """Milliseconds to render a full-echo response with each encoder"""
+    from fastapi.responses import JSONResponse
+
+    from src.server.payloads import ORJSON_AVAILABLE, FastJSONResponse
+
+    payload = {"original_text": make_text(SIZES[size_name]), "summary": "A short summary.",
+               "stage_latency_ms": {"validation": 0.1, "upstream": 12.5}}
+    results = {}
+    encoders = [("json", JSONResponse)] + ([("orjson", FastJSONResponse)] if ORJSON_AVAILABLE else [])
+    for name, response_class in encoders:
+        repeats = SERIALIZE_REPEATS[size_name]
+        start = time.perf_counter()
+        for _ in range(repeats):
+            response_class(payload)
+        results[name] = round((time.perf_counter() - start) / repeats * 1000, 3)
+    return results
+
+
+def run_case(size_name: str, mode: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--case", size_name, mode],
+        capture_output=True, text=True, check=True, cwd=project_root,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory and serialization time of /summarize by input size")
+    parser.add_argument("--case", nargs=2, metavar=("SIZE", "MODE"), help=argparse.SUPPRESS)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES))
+    args = parser.parse_args()
+    if args.case:
+        print(json.dumps(measure(*args.case)))
+        return
+
+    print(f"{'size':<6} {'mode':<10} {'peak RSS +MB':>13} {'latency ms':>11} {'response bytes':>15}")
+    for size_name in args.sizes:
+        for mode in MODES:
+            r = run_case(size_name, mode)
+            print(f"{size_name:<6} {mode:<10} {r['peak_rss_added_mb']:>13.1f} {r['latency_ms']:>11.1f} "
+                  f"{r['response_bytes']:>15}")
+    print()
+    print(f"{'size':<6} {'encoder':<8} {'ms per response':>16}")
+    for size_name in args.sizes:
+        for name, ms in serialization(size_name).items():
+            print(f"{size_name:<6} {name:<8} {ms:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
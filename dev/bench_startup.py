@@ -0,0 +1,114 @@
+# dev/bench_startup.py
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dev.benchmark import free_port, make_text, wait_until_up
+
+# "eager" imports openai and requests before the app, as main.py did at
+# import time before backends were loaded lazily
+MODES = {
+    "eager": ("import openai, requests", {}),
+    "lazy": ("", {}),
+    "prewarm": ("", {"SUMMARIZE_PREWARM": "1"}),
+}
+HEAVY_MODULES = ("openai", "requests", "vertexai", "streamlit", "dotenv")
+
+
+def api_env(fake_port: int, extra: dict) -> dict:
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "SUMMARY_CACHE_SIZE": "0",
+        "LOG_LEVEL": "WARNING",
+        **extra,
+    }
+
+
+def import_time(preamble: str, extra: dict) -> dict:
+    """Seconds to import the app in a fresh interpreter, and the heavy modules it pulled in"""
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{preamble}\n"
+        "import src.server.main\n"
+        "seconds = time.perf_counter() - start\n"
+        f"print(json.dumps({{'seconds': seconds, 'modules': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=project_root, env=api_env(0, extra)).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def first_request(preamble: str, extra: dict, fake_port: int) -> dict:
+    """From launching the server: when it first answers, and when a summary first succeeds"""
+    port = free_port()
+    code = f"{preamble}\nimport uvicorn\nuvicorn.run('src.server.main:app', port={port}, log_level='warning')"
+    body = {"text": make_text(0), "max_length": 60, "echo_original": "none"}
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-c", code], cwd=project_root, env=api_env(fake_port, extra))
+    listening = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as http:
+            while time.perf_counter() - start < 60:
+                try:
+                    sent = time.perf_counter()
+                    response = http.post("/summarize", json=body)
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                listening = listening or sent - start
+                if response.status_code == 200 and response.json()["summary_source"] == "openai":
+                    done = time.perf_counter()
+                    return {
+                        "listening_s": listening,
+                        "first_request_ms": (done - sent) * 1000,
+                        "first_success_s": done - start,
+                    }
+            raise RuntimeError("no successful summary within 60 s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first successful request, per startup mode")
+    parser.add_argument("--runs", type=int, default=5, help="runs per mode; medians are reported")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    fake_port = free_port()
+    fake = subprocess.Popen([sys.executable, "dev/fake_openai_server.py", "--port", str(fake_port),
+                             "--latency", "0.05", "--sigma", "0"], cwd=project_root)
+    try:
+        wait_until_up(f"http://127.0.0.1:{fake_port}/health")
+        print(f"{'mode':<8} {'import s':>9} {'listening s':>12} {'1st request ms':>15} {'1st success s':>14}  modules")
+        for mode in args.modes:
+            preamble, extra = MODES[mode]
+            imports = [import_time(preamble, extra) for _ in range(args.runs)]
+            requests = [first_request(preamble, extra, fake_port) for _ in range(args.runs)]
+
+            def median(key, rows):
+                return statistics.median(r[key] for r in rows)
+
+            print(f"{mode:<8} {median('seconds', imports):>9.3f} {median('listening_s', requests):>12.3f} "
+                  f"{median('first_request_ms', requests):>15.1f} {median('first_success_s', requests):>14.3f}  "
+                  f"{','.join(imports[-1]['modules']) or '-'}")
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
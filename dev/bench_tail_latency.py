@@ -0,0 +1,86 @@
+# dev/bench_tail_latency.py
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dev.fake_backend import FakeAsyncClient
+from src.server.backends import LocalBackend, OpenAIBackend
+from src.server.engine import SummarizationEngine
+from src.server.main import SAMPLE_DOC
+
+REQUESTS = 400
+CONCURRENCY = 20
+# 50 ms completions, except 3% that stall for a full second
+LATENCY = 0.05
+SLOW_RATE = 0.03
+SLOW_LATENCY = 1.0
+
+
+def make_engine(**options) -> SummarizationEngine:
+    fake = FakeAsyncClient(LATENCY, slow_rate=SLOW_RATE, slow_latency=SLOW_LATENCY, seed=42)
+    return SummarizationEngine(
+        backends={"openai": OpenAIBackend(fake), "local": LocalBackend()},
+        default_backend="openai",
+        max_concurrency=64,
+        max_in_flight=REQUESTS,
+        **options,
+    )
+
+
+async def run(engine: SummarizationEngine, timeout: float = None) -> np.ndarray:
+    latencies = []
+    queue = list(range(REQUESTS))
+
+    async def worker():
+        while queue:
+            n = queue.pop()
+            deadline = time.monotonic() + timeout if timeout else None
+            start = time.perf_counter()
+            await engine.summarize(f"{SAMPLE_DOC} ({n})", 40, deadline=deadline)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return np.array(latencies) * 1000
+
+
+def report(name: str, latencies: np.ndarray, engine: SummarizationEngine) -> dict:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{name:<22} p50={p50:7.1f} ms  p95={p95:7.1f} ms  p99={p99:7.1f} ms  "
+          f"hedges={engine.hedges_fired} (won {engine.hedges_won})")
+    return {"p50": p50, "p95": p95, "p99": p99}
+
+
+def test_tail_latency():
+    """Deadlines and hedging should cut p99 against a backend with slow outliers"""
+    print(f"TAIL LATENCY ({REQUESTS} requests, {SLOW_RATE:.0%} of calls stall {SLOW_LATENCY * 1000:.0f} ms)")
+
+    # Silence the engine's per-call prints for the benchmark
+    import builtins
+    real_print, builtins.print = builtins.print, lambda *args, **kwargs: None
+    try:
+        plain = make_engine()
+        baseline = asyncio.run(run(plain))
+        deadlined = make_engine()
+        with_deadline = asyncio.run(run(deadlined, timeout=0.3))
+        hedging = make_engine(hedge_backend="openai", hedge_quantile=0.95, hedge_delay=0.1)
+        with_hedging = asyncio.run(run(hedging))
+    finally:
+        builtins.print = real_print
+
+    base = report("baseline", baseline, plain)
+    deadline = report("deadline 300 ms", with_deadline, deadlined)
+    hedged = report("hedged at p95", with_hedging, hedging)
+
+    assert deadline["p99"] < base["p99"] / 2
+    assert hedged["p99"] < base["p99"] / 2
+    return True
+
+
+if __name__ == "__main__":
+    test_tail_latency()
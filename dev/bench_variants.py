@@ -0,0 +1,79 @@
+# dev/bench_variants.py
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dev.benchmark import make_text
+from dev.fake_backend import FakeAsyncClient
+from src.server.backends import LocalBackend, OpenAIBackend
+from src.server.engine import DOCUMENT_SEPARATOR, SummarizationEngine
+
+SCENARIOS = [
+    ("article, 2 lengths", [make_text(0, words=800)], [50, 200]),
+    ("article, 4 lengths", [make_text(0, words=800)], [50, 100, 200, 400]),
+    ("report, 2 lengths", [make_text(1, words=12_000)], [50, 200]),
+    ("5 articles, 2 lengths", [make_text(i, words=800) for i in range(5)], [100, 250]),
+]
+
+
+def fresh_engine(latency: float):
+    """No cache, so every call reaches the fake provider"""
+    fake = FakeAsyncClient(latency=latency)
+    # Summaries as long as the prompt asks for
+    fake.faults.summary_words = None
+    engine = SummarizationEngine(backends={"openai": OpenAIBackend(fake), "local": LocalBackend()},
+                                 default_backend="openai")
+    return engine, fake
+
+
+async def separate(texts, lengths, latency: float) -> dict:
+    """Before: one /summarize per length, concurrently, each sending the joined documents"""
+    engine, fake = fresh_engine(latency)
+    text = DOCUMENT_SEPARATOR.join(texts)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(engine.summarize(text, n) for n in lengths))
+    return usage(results, fake, start)
+
+
+async def one_pass(texts, lengths, latency: float) -> dict:
+    """After: one /summarize/multi"""
+    engine, fake = fresh_engine(latency)
+    start = time.perf_counter()
+    results = await engine.summarize_variants(texts, lengths)
+    return usage(results, fake, start)
+
+
+def usage(results, fake, start: float) -> dict:
+    return {
+        "ms": (time.perf_counter() - start) * 1000,
+        "calls": fake.calls,
+        "prompt": sum(r.prompt_tokens for r in results),
+        "completion": sum(r.completion_tokens for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upstream calls and tokens: one call per length vs /summarize/multi")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake provider latency per call, seconds")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<22} {'mode':<9} {'calls':>6} {'prompt tok':>11} {'compl tok':>10} {'ms':>7}")
+    for name, texts, lengths in SCENARIOS:
+        before = asyncio.run(separate(texts, lengths, args.latency))
+        after = asyncio.run(one_pass(texts, lengths, args.latency))
+        for mode, r in (("separate", before), ("one pass", after)):
+            print(f"{name:<22} {mode:<9} {r['calls']:>6} {r['prompt']:>11} {r['completion']:>10} {r['ms']:>7.0f}")
+        total = lambda r: r["prompt"] + r["completion"]
+        print(f"{'':<22} {'saved':<9} {1 - after['calls'] / before['calls']:>6.0%} "
+              f"{1 - total(after) / total(before):>11.0%} (all tokens)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# dev/bench_workers.py
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dev.benchmark import free_port, make_text, wait_until_up
+
+
+def start_api(port: int, workers: int, cpu_workers: int, state_dir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        # CPU-bound work only: the local backend, no cache hits
+        "SUMMARIZE_BACKEND": "local",
+        "SUMMARY_CACHE_SIZE": "0",
+        "SUMMARIZE_STATE_DIR": state_dir,
+        "SUMMARIZE_CPU_WORKERS": str(cpu_workers),
+        "SUMMARIZE_MAX_IN_FLIGHT": "1000",
+        "LOG_LEVEL": "WARNING",
+    }
+    return subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "src.server.main:app",
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ], cwd=project_root, env=env)
+
+
+async def load(url: str, concurrency: int, duration: float, words: int) -> Dict[str, object]:
+    """Closed-loop /summarize load for duration seconds, while /health is
+    polled to see how long the event loop keeps small requests waiting"""
+    latencies: List[float] = []
+    health: List[float] = []
+    failures = 0
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as http:
+        stop = time.perf_counter() + duration
+        sent = iter(range(10 ** 9))
+
+        async def client():
+            nonlocal failures
+            while time.perf_counter() < stop:
+                n = next(sent)
+                start = time.perf_counter()
+                response = await http.post("/summarize", json={
+                    # Unique texts, so the cache and request coalescing never apply
+                    "text": make_text(n, words), "max_length": 60, "echo_original": "none",
+                })
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    failures += 1
+
+        async def probe():
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                await http.get("/health")
+                health.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        start = time.perf_counter()
+        await asyncio.gather(probe(), *(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        "health_p95_ms": float(np.percentile(health, 95)) * 1000,
+        "failures": failures,
+    }
+
+
+def run(workers: int, cpu_workers: int, args) -> dict:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as state_dir:
+        process = start_api(port, workers, cpu_workers, state_dir)
+        try:
+            wait_until_up(f"http://127.0.0.1:{port}/health")
+            url = f"http://127.0.0.1:{port}"
+            # Warm every worker (and its CPU pool) before measuring
+            asyncio.run(load(url, workers * 2, 1.0, args.words))
+            return asyncio.run(load(url, args.concurrency, args.duration, args.words))
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of CPU-bound summaries from 1 to N worker processes")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=8.0)
+    parser.add_argument("--words", type=int, default=3000, help="words per input (about 6 characters each)")
+    args = parser.parse_args()
+
+    counts = sorted({1, *range(2, args.max_workers + 1, 2), args.max_workers})
+    # uvicorn workers alone, then one server process with a CPU pool of the same size
+    configs = [(f"{n} worker{'s' * (n > 1)}", n, 0) for n in counts]
+    configs += [(f"1 + {n} cpu", 1, n) for n in counts]
+    print(f"{os.cpu_count()} cores, {args.concurrency} concurrent clients, {args.words}-word inputs\n")
+    print(f"{'config':<12} {'req/s':>7} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'/health p95 ms':>15}")
+    baseline = None
+    for name, workers, cpu_workers in configs:
+        r = run(workers, cpu_workers, args)
+        baseline = baseline or r["rps"]
+        print(f"{name:<12} {r['rps']:>7.1f} {r['rps'] / baseline:>7.2f}x {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['health_p95_ms']:>15.1f}" + (f"  ({r['failures']} failed)" if r["failures"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# dev/benchmark.py
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+RESULTS_DIR = project_root / "dev" / "bench_results"
+
+# Fixed profiles, so two result files are always comparable
+PROFILES = [
+    {"name": "summarize-c1", "endpoint": "summarize", "concurrency": 1, "requests": 40},
+    {"name": "summarize-c16", "endpoint": "summarize", "concurrency": 16, "requests": 400},
+    {"name": "summarize-c64", "endpoint": "summarize", "concurrency": 64, "requests": 800},
+    {"name": "summarize-50rps", "endpoint": "summarize", "rps": 50, "duration": 8},
+    {"name": "batch10-c4", "endpoint": "batch", "concurrency": 4, "requests": 40, "batch_size": 10},
+    {"name": "stream-c16", "endpoint": "stream", "concurrency": 16, "requests": 400},
+    {"name": "stream-30rps", "endpoint": "stream", "rps": 30, "duration": 8},
+]
+
+FAKE_LLM = {"latency": 0.2, "sigma": 0.3, "tokens_per_second": 200, "error_rate": 0.0, "seed": 7}
+
+VOCABULARY = (
+    "the council approved a new budget for schools roads and parks after months of debate "
+    "residents raised concerns about rising costs while officials promised more transparency "
+    "researchers found that the policy improved outcomes in several districts over two years "
+    "the report recommends further study and a phased rollout across the region"
+).split()
+
+
+def make_text(n: int, words: int = 250) -> str:
+    """Deterministic, unique input so neither the cache nor coalescing kicks in"""
+    rng = random.Random(n)
+    body = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+    return f"Document {n}. {body}."
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up")
+
+
+class Servers:
+    """The fake LLM and the API, each in its own process"""
+
+    def __init__(self, fake_llm: dict, api_env: Dict[str, str]):
+        self.fake_port = free_port()
+        self.api_port = free_port()
+        self.fake_llm = fake_llm
+        self.api_env = api_env
+        self.processes: List[subprocess.Popen] = []
+
+    def __enter__(self) -> "Servers":
+        self.processes.append(subprocess.Popen([
+            sys.executable, "dev/fake_openai_server.py",
+            "--port", str(self.fake_port),
+            "--latency", str(self.fake_llm["latency"]),
+            "--sigma", str(self.fake_llm["sigma"]),
+            "--tokens-per-second", str(self.fake_llm["tokens_per_second"]),
+            "--error-rate", str(self.fake_llm["error_rate"]),
+            "--seed", str(self.fake_llm["seed"]),
+        ], cwd=project_root))
+        env = {
+            **os.environ,
+            "OPENAI_API_KEY": "benchmark",
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{self.fake_port}/v1",
+            "SUMMARY_CACHE_SIZE": "0",
+            "LOG_LEVEL": "WARNING",
+            **self.api_env,
+        }
+        self.processes.append(subprocess.Popen([
+            sys.executable, "-m", "uvicorn", "src.server.main:app",
+            "--port", str(self.api_port), "--log-level", "warning",
+        ], cwd=project_root, env=env))
+        wait_until_up(f"http://127.0.0.1:{self.fake_port}/health")
+        wait_until_up(f"http://127.0.0.1:{self.api_port}/health")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.wait(timeout=10)
+
+    @property
+    def api_url(self) -> str:
+        return f"http://127.0.0.1:{self.api_port}"
+
+    @property
+    def api_pid(self) -> int:
+        return self.processes[1].pid
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_token: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def started(self) -> None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finished(self, status: int, latency: float, first_token: Optional[float] = None) -> None:
+        self.in_flight -= 1
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        if status == 200:
+            self.latencies.append(latency)
+            if first_token is not None:
+                self.first_token.append(first_token)
+
+
+def sender(http: httpx.AsyncClient, profile: dict, recorder: Recorder) -> Callable:
+    endpoint = profile["endpoint"]
+
+    async def send(n: int, scheduled: float) -> None:
+        # Latency counts from when the request was due, not when it went
+        # out, so a backed-up client can't hide server slowness
+        recorder.started()
+        first_token = None
+        try:
+            if endpoint == "summarize":
+                response = await http.post("/summarize", json={"text": make_text(n), "max_length": 60})
+                status = response.status_code
+            elif endpoint == "batch":
+                size = profile["batch_size"]
+                items = [{"text": make_text(n * size + i), "max_length": 60} for i in range(size)]
+                response = await http.post("/summarize/batch", json={"items": items})
+                status = response.status_code
+            else:
+                async with http.stream(
+                    "POST", "/summarize/stream", json={"text": make_text(n), "max_length": 60}
+                ) as response:
+                    status = response.status_code
+                    async for line in response.aiter_lines():
+                        if first_token is None and line.startswith("event: token"):
+                            first_token = time.perf_counter() - scheduled
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        recorder.finished(status, time.perf_counter() - scheduled, first_token)
+
+    return send
+
+
+async def drive(profile: dict, api_url: str, recorder: Recorder) -> float:
+    """Run one load profile; returns its wall-clock seconds"""
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=api_url, timeout=120, limits=limits) as http:
+        send = sender(http, profile, recorder)
+        start = time.perf_counter()
+        if "rps" in profile:
+            # Open loop: requests are sent on schedule whether or not earlier ones finished
+            total = int(profile["rps"] * profile["duration"])
+            tasks = []
+            for n in range(total):
+                due = start + n / profile["rps"]
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                tasks.append(asyncio.ensure_future(send(n, due)))
+            await asyncio.gather(*tasks)
+        else:
+            # Closed loop: a fixed number of clients, each sending back to back
+            pending = iter(range(profile["requests"]))
+
+            async def client():
+                for n in pending:
+                    await send(n, time.perf_counter())
+
+            await asyncio.gather(*(client() for _ in range(profile["concurrency"])))
+        return time.perf_counter() - start
+
+
+async def sample_rss(pid: int, samples: List[int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        samples.append(rss_bytes(pid))
+        await asyncio.sleep(0.05)
+
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+    return {"p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2),
+            "mean": round(float(np.mean(values)) * 1000, 2)}
+
+
+async def run_profile(profile: dict, servers: Servers) -> dict:
+    recorder = Recorder()
+    baseline = rss_bytes(servers.api_pid)
+    samples: List[int] = []
+    stop = asyncio.Event()
+    sampler = asyncio.ensure_future(sample_rss(servers.api_pid, samples, stop))
+    seconds = await drive(profile, servers.api_url, recorder)
+    stop.set()
+    await sampler
+
+    peak = max(samples + [baseline])
+    items = profile.get("batch_size", 1)
+    completed = sum(recorder.statuses.values())
+    return {
+        **profile,
+        "seconds": round(seconds, 3),
+        "completed": completed,
+        "statuses": recorder.statuses,
+        "throughput_rps": round(completed / seconds, 2),
+        "summaries_per_second": round(len(recorder.latencies) * items / seconds, 2),
+        "max_in_flight": recorder.max_in_flight,
+        "latency_ms": percentiles(recorder.latencies),
+        "time_to_first_token_ms": percentiles(recorder.first_token),
+        "rss_baseline_mb": round(baseline / 2**20, 2),
+        "rss_peak_mb": round(peak / 2**20, 2),
+        # Extra resident memory at peak, spread over the requests in flight then
+        "rss_per_request_kb": round(max(0, peak - baseline) / 1024 / max(1, recorder.max_in_flight), 2),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def scaled(profile: dict, factor: float) -> dict:
+    profile = dict(profile)
+    for field in ("requests", "duration"):
+        if field in profile:
+            profile[field] = max(1, type(profile[field])(profile[field] * factor))
+    return profile
+
+
+def run(profiles: List[dict], api_env: Dict[str, str]) -> dict:
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "fake_llm": FAKE_LLM,
+        "api_env": api_env,
+        "profiles": [],
+    }
+    with Servers(FAKE_LLM, api_env) as servers:
+        # Warm up connections and lazy imports before anything is measured
+        asyncio.run(drive({"endpoint": "summarize", "concurrency": 4, "requests": 20},
+                          servers.api_url, Recorder()))
+        for profile in profiles:
+            result = asyncio.run(run_profile(profile, servers))
+            report["profiles"].append(result)
+            print_result(result)
+    return report
+
+
+def print_result(result: dict) -> None:
+    latency = result["latency_ms"] or {}
+    ttft = result["time_to_first_token_ms"]
+    line = (f"{result['name']:<18} {result['throughput_rps']:8.1f} req/s  "
+            f"p50={latency.get('p50', 0):7.1f}  p95={latency.get('p95', 0):7.1f}  "
+            f"p99={latency.get('p99', 0):7.1f} ms")
+    if ttft:
+        line += f"  ttft p50={ttft['p50']:6.1f} ms"
+    line += f"  rss {result['rss_peak_mb']:.1f} MB ({result['rss_per_request_kb']:.0f} KB/req)"
+    if set(result["statuses"]) != {"200"}:
+        line += f"  statuses={result['statuses']}"
+    print(line)
+
+
+def compare(old_path: str, new_path: str) -> None:
+    """Print per-profile changes between two result files"""
+    old = {p["name"]: p for p in json.loads(Path(old_path).read_text())["profiles"]}
+    new = json.loads(Path(new_path).read_text())
+
+    def change(before: Optional[float], after: Optional[float]) -> str:
+        if not before or after is None:
+            return "     n/a"
+        return f"{(after - before) / before * 100:+7.1f}%"
+
+    print(f"{'profile':<18} {'throughput':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'ttft p50':>9}")
+    for profile in new["profiles"]:
+        before = old.get(profile["name"])
+        if before is None:
+            continue
+        latency, previous = profile["latency_ms"] or {}, before["latency_ms"] or {}
+        ttft, previous_ttft = profile["time_to_first_token_ms"] or {}, before["time_to_first_token_ms"] or {}
+        print(f"{profile['name']:<18} {change(before['throughput_rps'], profile['throughput_rps']):>10} "
+              f"{change(previous.get('p50'), latency.get('p50')):>8} "
+              f"{change(previous.get('p95'), latency.get('p95')):>8} "
+              f"{change(previous.get('p99'), latency.get('p99')):>8} "
+              f"{change(previous_ttft.get('p50'), ttft.get('p50')):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API against a fake OpenAI server")
+    parser.add_argument("--quick", action="store_true", help="run every profile at a tenth of its size")
+    parser.add_argument("--profile", action="append", help="only run the named profile(s)")
+    parser.add_argument("--output", help="result file (default: dev/bench_results/<time>-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra API environment, e.g. SUMMARIZE_MAX_CONCURRENCY=32")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    profiles = [p for p in PROFILES if not args.profile or p["name"] in args.profile]
+    if args.quick:
+        profiles = [scaled(p, 0.1) for p in profiles]
+    # Measure the API itself, not its admission limits
+    api_env = {"SUMMARIZE_MAX_IN_FLIGHT": "4096", "SUMMARIZE_MAX_CONCURRENCY": "256"}
+    api_env.update(dict(item.split("=", 1) for item in args.env))
+
+    report = run(profiles, api_env)
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# dev/conftest.py
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dev.fake_backend import restored
+from src.server import main
+
+
+@pytest.fixture(autouse=True)
+def main_engine():
+    """Undo whatever a test changes on the shared main.engine, so tests run in any order"""
+    with restored(main.engine):
+        yield main.engine
@@ -0,0 +1,59 @@
+# dev/data.py
+import gzip
+import json
+import re
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+# Sections of an XSum *.summary file: [SN]URL[SN], [SN]TITLE[SN], ...
+XSUM_SECTION = re.compile(r"\[SN\](\w[\w-]*)\[SN\]\s*(.*?)\s*(?=\[SN\]\w[\w-]*\[SN\]|\Z)", re.S)
+
+
+class Example(NamedTuple):
+    id: str
+    document: str
+    summary: str
+
+
+def open_text(path: Path):
+    return gzip.open(path, "rt", encoding="utf-8") if path.suffix == ".gz" else open(path, encoding="utf-8")
+
+
+def load_jsonl(path, document_field: str = "document", summary_field: str = "summary",
+               id_field: str = "id", limit: Optional[int] = None) -> Iterator[Example]:
+    """Stream examples from a JSONL file (optionally .gz), one per line.
+
+    The defaults match the Hugging Face XSum export; other datasets name
+    their fields e.g. article/highlights. Lines without an id are numbered.
+    """
+    path = Path(path)
+    count = 0
+    with open_text(path) as lines:
+        for number, line in enumerate(lines):
+            if limit is not None and count >= limit:
+                return
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield Example(str(record.get(id_field, number)), record[document_field], record[summary_field])
+            count += 1
+
+
+def load_xsum_dir(path, limit: Optional[int] = None) -> Iterator[Example]:
+    """Stream examples from the original XSum release: one <id>.summary file
+    per article, with FIRST-SENTENCE as the summary and RESTBODY as the document"""
+    count = 0
+    for file in sorted(Path(path).glob("*.summary")):
+        if limit is not None and count >= limit:
+            return
+        sections = dict(XSUM_SECTION.findall(file.read_text(encoding="utf-8")))
+        if sections.get("RESTBODY") and sections.get("FIRST-SENTENCE"):
+            yield Example(file.stem, sections["RESTBODY"], sections["FIRST-SENTENCE"])
+            count += 1
+
+
+def load_dataset(path, limit: Optional[int] = None, **fields) -> Iterator[Example]:
+    """A directory of XSum files or a JSONL file; fields name the JSONL keys"""
+    if Path(path).is_dir():
+        return load_xsum_dir(path, limit)
+    return load_jsonl(path, limit=limit, **fields)
@@ -0,0 +1,215 @@
+# dev/evaluate.py
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dev.data import Example, load_dataset
+from src.server.rouge import METRICS, score_batch
+
+# USD per million tokens; override for the model being evaluated
+PROMPT_PRICE = 0.5
+COMPLETION_PRICE = 1.5
+
+
+def completed_ids(checkpoint: Path) -> set:
+    """Examples already summarized by an earlier (possibly interrupted) run"""
+    if not checkpoint.exists():
+        return set()
+    done = set()
+    with open(checkpoint, encoding="utf-8") as lines:
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by the interruption
+            if "error" not in record:
+                done.add(record["id"])
+    return done
+
+
+class Evaluation:
+    """Summarize a dataset with bounded concurrency, scoring and checkpointing as it goes.
+
+    Results are scored in batches and appended to a JSONL checkpoint; a
+    rerun with the same checkpoint skips everything already in it.
+    """
+
+    def __init__(self, engine, checkpoint: Path, backend: Optional[str] = None,
+                 max_length: int = 60, concurrency: int = 8, batch_size: int = 64,
+                 prompt_price: float = PROMPT_PRICE, completion_price: float = COMPLETION_PRICE):
+        self.engine = engine
+        self.checkpoint = checkpoint
+        self.backend = backend
+        self.max_length = max_length
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.pending: List[dict] = []
+        self.written = 0
+        self.skipped = 0
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.prompt_price + completion_tokens * self.completion_price) / 1e6
+
+    async def summarize(self, example: Example) -> dict:
+        start = time.perf_counter()
+        try:
+            result = await self.engine.summarize(example.document, self.max_length, self.backend)
+        except Exception as e:
+            return {"id": example.id, "error": f"{type(e).__name__}: {e}"}
+        return {
+            "id": example.id,
+            "summary": result.summary,
+            "reference": example.summary,
+            "source": result.source,
+            "chunks": result.chunks,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "prompt_tokens": result.prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+            "cost_usd": self.cost(result.prompt_tokens, result.completion_tokens),
+        }
+
+    def flush(self) -> None:
+        """Score what's pending in one vectorized pass and append it to the checkpoint"""
+        if not self.pending:
+            return
+        scored = [r for r in self.pending if "error" not in r]
+        if scored:
+            scores = score_batch([r["summary"] for r in scored], [r["reference"] for r in scored])
+            for i, record in enumerate(scored):
+                for metric in METRICS:
+                    precision, recall, f1 = scores[metric][i]
+                    record[metric] = {"precision": round(precision, 4), "recall": round(recall, 4),
+                                      "f1": round(f1, 4)}
+        with open(self.checkpoint, "a", encoding="utf-8") as out:
+            for record in self.pending:
+                out.write(json.dumps(record) + "\n")
+        self.written += len(self.pending)
+        self.pending = []
+
+    async def run(self, examples: Iterable[Example]) -> None:
+        done = completed_ids(self.checkpoint)
+        todo = iter(examples)
+
+        async def worker():
+            for example in todo:
+                if example.id in done:
+                    self.skipped += 1
+                    continue
+                record = await self.summarize(example)
+                self.pending.append(record)
+                if len(self.pending) >= self.batch_size:
+                    self.flush()
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            # Interrupted or not, whatever finished is kept for the next run
+            self.flush()
+
+
+def report(checkpoint: Path) -> dict:
+    """Quality, latency and cost over every example in the checkpoint"""
+    records: Dict[str, dict] = {}
+    with open(checkpoint, encoding="utf-8") as lines:
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            # A later success replaces an earlier failure of the same example
+            if "error" not in record or record["id"] not in records:
+                records[record["id"]] = record
+    scored = [r for r in records.values() if "error" not in r]
+    summary = {"examples": len(records), "errors": len(records) - len(scored)}
+    if not scored:
+        return summary
+
+    latency = np.array([r["latency_ms"] for r in scored])
+    sources: Dict[str, int] = {}
+    for r in scored:
+        sources[r["source"]] = sources.get(r["source"], 0) + 1
+    summary.update({
+        metric: {
+            field: round(float(np.mean([r[metric][field] for r in scored])), 4)
+            for field in ("precision", "recall", "f1")
+        }
+        for metric in METRICS
+    })
+    summary.update({
+        "latency_ms": {
+            "p50": round(float(np.percentile(latency, 50)), 2),
+            "p95": round(float(np.percentile(latency, 95)), 2),
+            "mean": round(float(latency.mean()), 2),
+        },
+        "prompt_tokens_per_doc": round(float(np.mean([r["prompt_tokens"] for r in scored])), 1),
+        "completion_tokens_per_doc": round(float(np.mean([r["completion_tokens"] for r in scored])), 1),
+        "cost_usd_per_doc": round(float(np.mean([r["cost_usd"] for r in scored])), 6),
+        "cost_usd_total": round(float(np.sum([r["cost_usd"] for r in scored])), 4),
+        "sources": sources,
+    })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score generated summaries against a dataset's references")
+    parser.add_argument("dataset", help="JSONL file (optionally .gz) or a directory of XSum .summary files")
+    parser.add_argument("--checkpoint", help="results JSONL; an existing one is resumed "
+                                             "(default: dev/eval_results/<dataset>-<backend>.jsonl)")
+    parser.add_argument("--backend", help="backend to evaluate (default: the API's default backend)")
+    parser.add_argument("--limit", type=int, help="only the first N examples")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-length", type=int, default=60, help="summary length in words")
+    parser.add_argument("--document-field", default="document")
+    parser.add_argument("--summary-field", default="summary")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--prompt-price", type=float, default=PROMPT_PRICE, help="USD per 1M prompt tokens")
+    parser.add_argument("--completion-price", type=float, default=COMPLETION_PRICE,
+                        help="USD per 1M completion tokens")
+    args = parser.parse_args()
+
+    from src.server import main as api
+
+    # Every example should reach the backend rather than an earlier run's cache
+    api.engine.cache = None
+    backend = args.backend or api.engine.default_backend
+    api.engine.max_concurrency = max(api.engine.max_concurrency, args.concurrency)
+    api.engine.max_in_flight = max(api.engine.max_in_flight, args.concurrency)
+
+    checkpoint = Path(args.checkpoint) if args.checkpoint else (
+        project_root / "dev" / "eval_results" / f"{Path(args.dataset).name.split('.')[0]}-{backend}.jsonl"
+    )
+    checkpoint.parent.mkdir(parents=True, exist_ok=True)
+    examples = load_dataset(args.dataset, args.limit, document_field=args.document_field,
+                            summary_field=args.summary_field, id_field=args.id_field)
+
+    evaluation = Evaluation(api.engine, checkpoint, backend, args.max_length, args.concurrency,
+                            prompt_price=args.prompt_price, completion_price=args.completion_price)
+    start = time.perf_counter()
+    try:
+        asyncio.run(evaluation.run(examples))
+    except KeyboardInterrupt:
+        print(f"Interrupted; rerun the same command to resume from {checkpoint}")
+    seconds = time.perf_counter() - start
+
+    results = report(checkpoint)
+    results.update({"backend": backend, "new": evaluation.written, "resumed": evaluation.skipped,
+                    "seconds": round(seconds, 2)})
+    print(json.dumps(results, indent=2))
+    checkpoint.with_suffix(".report.json").write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
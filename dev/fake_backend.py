@@ -0,0 +1,167 @@
+# dev/fake_backend.py
+import asyncio
+import contextlib
+import copy
+import random
+import re
+from types import SimpleNamespace
+
+from src.server.backends import OpenAIBackend
+from src.server.prompts import MIN_CACHED_PREFIX_TOKENS
+from src.server.resilience import RetryPolicy
+
+
+def usage(prompt: str, completion: str, cached: int = 0) -> SimpleNamespace:
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = len(completion) // 4
+    return SimpleNamespace(
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        total_tokens=prompt_tokens + completion_tokens,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=cached),
+    )
+
+
+class FakeStatusError(Exception):
+    """Shaped like openai.APIStatusError: a status_code and a response with headers"""
+
+    def __init__(self, status: int, retry_after: float = None):
+        super().__init__(f"Error code: {status}")
+        self.status_code = status
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status, headers=headers)
+
+
+class FakeCompletions:
+    def __init__(self, latency: float, token_delay: float, slow_rate: float = 0.0,
+                 slow_latency: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.random = random.Random(seed)
+        self.calls = 0
+        # Words of the input echoed back as the summary; None for as many
+        # as the prompt asks for
+        self.summary_words = 20
+        # System prompts seen before count as served from the prompt cache
+        self.prefixes = set()
+        # Fault injection: the next fail_next calls raise, then a fail_rate
+        # share of calls raise; outage makes every call raise
+        self.fail_next = 0
+        self.fail_rate = 0.0
+        self.fail_status = 503
+        self.fail_retry_after = None
+        self.outage = False
+
+    def fault(self):
+        if self.fail_next > 0:
+            self.fail_next -= 1
+        elif not self.outage and not (self.fail_rate and self.random.random() < self.fail_rate):
+            return None
+        if self.fail_status is None:
+            return ConnectionError("Connection reset by peer")
+        return FakeStatusError(self.fail_status, self.fail_retry_after)
+
+    def delay(self) -> float:
+        # A slow_rate share of calls stall for slow_latency instead
+        if self.slow_rate and self.random.random() < self.slow_rate:
+            return self.slow_latency
+        return self.latency
+
+    async def create(self, model, messages, max_tokens=None, temperature=None, stream=False, **kwargs):
+        self.calls += 1
+        error = self.fault()
+        if error is not None:
+            await asyncio.sleep(self.latency / 10)
+            raise error
+        # The text follows the length instruction after a blank line
+        instruction, _, text = messages[-1]["content"].partition("\n\n")
+        words = self.summary_words or int(re.search(r"(\d+) words", instruction).group(1))
+        # Only the start is split, so large inputs cost no more than a real client's copy
+        summary = " ".join(text[:words * 50].split()[:words])
+        finish_reason = "stop"
+        if max_tokens is not None and len(summary) // 4 > max_tokens:
+            summary = summary[:max_tokens * 4].rstrip()
+            finish_reason = "length"
+        prompt = "".join(m["content"] for m in messages)
+        prefix = messages[0]["content"] if len(messages) > 1 else ""
+        # Like OpenAI, only a repeated prefix of 1024 tokens or more is cached
+        cached = len(prefix) // 4
+        if prefix not in self.prefixes or cached < MIN_CACHED_PREFIX_TOKENS:
+            cached = 0
+        self.prefixes.add(prefix)
+        if stream:
+            return self._stream(summary, prompt, cached, finish_reason)
+
+        await asyncio.sleep(self.delay())
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=summary), finish_reason=finish_reason)],
+            usage=usage(prompt, summary, cached),
+        )
+
+    async def _stream(self, summary: str, prompt: str, cached: int = 0, finish_reason: str = "stop"):
+        await asyncio.sleep(self.delay())
+        for word in summary.split(" "):
+            await asyncio.sleep(self.token_delay)
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=word + " "), finish_reason=None)],
+                usage=None,
+            )
+        yield SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=None), finish_reason=finish_reason)],
+            usage=None,
+        )
+        yield SimpleNamespace(choices=[], usage=usage(prompt, summary, cached))
+
+
+class FakeAsyncClient:
+    """Stand-in for AsyncOpenAI that answers after a fixed delay"""
+
+    def __init__(self, latency: float = 0.2, token_delay: float = 0.0, slow_rate: float = 0.0,
+                 slow_latency: float = 0.0, seed: int = 0):
+        self.chat = SimpleNamespace(completions=FakeCompletions(
+            latency, token_delay, slow_rate, slow_latency, seed
+        ))
+
+    @property
+    def calls(self) -> int:
+        return self.chat.completions.calls
+
+    @property
+    def faults(self) -> FakeCompletions:
+        """The completions object, whose fail_* and outage fields inject errors"""
+        return self.chat.completions
+
+
+def install(engine, latency: float = 0.2, token_delay: float = 0.0) -> FakeAsyncClient:
+    """Route the engine's default backend to a fresh fake client"""
+    fake = FakeAsyncClient(latency, token_delay)
+    engine.backends["openai"] = OpenAIBackend(fake)
+    engine.default_backend = "openai"
+    return fake
+
+
+@contextlib.contextmanager
+def serving(main, engine):
+    """Serve main.app from engine inside the block, then put main's own engine back"""
+    original, main.engine = main.engine, engine
+    try:
+        yield engine
+    finally:
+        main.engine = original
+
+
+@contextlib.contextmanager
+def restored(engine):
+    """Put back every engine attribute a test replaces (backends, cache, limits,
+    breakers, retry policy) when the block exits"""
+    saved = {
+        name: copy.copy(value) if isinstance(value, (dict, set, RetryPolicy)) else value
+        for name, value in vars(engine).items()
+    }
+    try:
+        yield engine
+    finally:
+        vars(engine).clear()
+        vars(engine).update(saved)
@@ -0,0 +1,164 @@
+# dev/fake_openai_server.py
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.server.prompts import MIN_CACHED_PREFIX_TOKENS
+
+
+class FakeLLM:
+    """Deterministic stand-in for an OpenAI-compatible chat completions API.
+
+    Time to first token follows a log-normal distribution around
+    latency_median; tokens then arrive at tokens_per_second. An
+    error_rate share of calls fails with error_status. The same seed gives
+    the same sequence of latencies, errors and answers.
+    """
+
+    def __init__(self, latency_median: float = 0.2, latency_sigma: float = 0.3,
+                 tokens_per_second: float = 200, error_rate: float = 0.0,
+                 error_status: int = 503, seed: int = 0):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.calls = 0
+        # System prompts seen before count as served from the prompt cache
+        self.prefixes = set()
+
+    def first_token_delay(self) -> float:
+        if self.latency_sigma <= 0:
+            return self.latency_median
+        return self.latency_median * self.random.lognormvariate(0, self.latency_sigma)
+
+    def answer(self, body: dict) -> list:
+        """The summary as tokens: leading words of the input, capped by max_tokens"""
+        # The text follows the length instruction after a blank line
+        words = body["messages"][-1]["content"].split("\n\n", 1)[-1].split()
+        limit = min(len(words), 40, body.get("max_tokens") or 40)
+        return [word + " " for word in words[:limit]]
+
+    def finish_reason(self, body: dict, tokens: list) -> str:
+        return "length" if body.get("max_tokens") and len(tokens) >= body["max_tokens"] else "stop"
+
+    def usage(self, body: dict, tokens: list) -> dict:
+        messages = body["messages"]
+        prompt = sum(len(m["content"]) for m in messages) // 4
+        prefix = messages[0]["content"] if len(messages) > 1 else ""
+        # Like OpenAI, only a repeated prefix of 1024 tokens or more is cached
+        cached = len(prefix) // 4
+        if prefix not in self.prefixes or cached < MIN_CACHED_PREFIX_TOKENS:
+            cached = 0
+        self.prefixes.add(prefix)
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt + len(tokens),
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+
+def create_app(llm: FakeLLM) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "calls": llm.calls}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        llm.calls += 1
+        # Drawn up front so the sequence doesn't depend on interleaving
+        failed = llm.random.random() < llm.error_rate
+        delay = llm.first_token_delay()
+        if failed:
+            await asyncio.sleep(delay / 4)
+            return JSONResponse(
+                {"error": {"message": "Injected failure", "type": "server_error", "code": None}},
+                status_code=llm.error_status,
+                headers={"retry-after": "0.1"} if llm.error_status == 429 else None,
+            )
+
+        tokens = llm.answer(body)
+        created = int(time.time())
+        completion_id = f"chatcmpl-fake{llm.calls}"
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_tokens(llm, body, tokens, delay, completion_id, created),
+                media_type="text/event-stream",
+            )
+
+        await asyncio.sleep(delay + len(tokens) / llm.tokens_per_second)
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": llm.finish_reason(body, tokens),
+            }],
+            "usage": llm.usage(body, tokens),
+        }
+
+    return app
+
+
+async def stream_tokens(llm: FakeLLM, body: dict, tokens: list, delay: float,
+                        completion_id: str, created: int):
+    def chunk(choices: list, usage: dict = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": body["model"],
+            "choices": choices,
+        }
+        if usage is not None:
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    await asyncio.sleep(delay)
+    for token in tokens:
+        yield chunk([{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+        await asyncio.sleep(1 / llm.tokens_per_second)
+    yield chunk([{"index": 0, "delta": {}, "finish_reason": llm.finish_reason(body, tokens)}])
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield chunk([], llm.usage(body, tokens))
+    yield "data: [DONE]\n\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server for benchmarks")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="median seconds to first token")
+    parser.add_argument("--sigma", type=float, default=0.3, help="log-normal spread of the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    llm = FakeLLM(args.latency, args.sigma, args.tokens_per_second, args.error_rate,
+                  args.error_status, args.seed)
+    uvicorn.run(create_app(llm), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
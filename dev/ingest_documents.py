@@ -0,0 +1,36 @@
+# dev/ingest_documents.py
+import argparse
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dev.data import load_dataset
+from src.server.documents import DocumentStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load a dataset into a document store")
+    parser.add_argument("dataset", help="JSONL file (optionally .gz) or a directory of XSum .summary files")
+    parser.add_argument("store", help="store directory, as set in DOCUMENT_STORE_PATH")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--document-field", default="document")
+    parser.add_argument("--summary-field", default="summary")
+    parser.add_argument("--id-field", default="id")
+    args = parser.parse_args()
+
+    store = DocumentStore(args.store)
+    before = len(store)
+    examples = load_dataset(args.dataset, args.limit, document_field=args.document_field,
+                            summary_field=args.summary_field, id_field=args.id_field)
+    start = time.perf_counter()
+    added = store.ingest(e._asdict() for e in examples)
+    seconds = time.perf_counter() - start
+    print(f"Added {added} documents in {seconds:.1f}s ({added / max(seconds, 1e-9):.0f}/s); "
+          f"the store now holds {len(store)} (indexes {before + 1}-{len(store)})")
+
+
+if __name__ == "__main__":
+    main()
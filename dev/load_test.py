@@ -0,0 +1,79 @@
+# dev/load_test.py
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+# One log line per request would drown out the results
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dev import fake_backend
+from src.server import main
+
+TEXT = main.SAMPLE_DOC
+REQUESTS_PER_LEVEL = 64
+
+
+async def run_level(concurrency: int, latency: float) -> float:
+    """Send REQUESTS_PER_LEVEL requests with `concurrency` workers, return req/s"""
+    fake_backend.install(main.engine, latency)
+    main.engine.max_concurrency = concurrency
+    main.engine._upstream_slots = None
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        queue = list(range(REQUESTS_PER_LEVEL))
+
+        async def worker():
+            while queue:
+                n = queue.pop()
+                response = await http.post("/summarize", json={"text": f"{TEXT} ({n})", "max_length": 50})
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return REQUESTS_PER_LEVEL / elapsed
+
+
+async def check_backpressure(latency: float) -> bool:
+    """Requests beyond the in-flight cap get 429 with Retry-After"""
+    fake_backend.install(main.engine, latency)
+    main.engine.max_in_flight = 4
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        responses = await asyncio.gather(*(
+            http.post("/summarize", json={"text": f"{TEXT} ({n})"}) for n in range(8)
+        ))
+
+    rejected = [r for r in responses if r.status_code == 429]
+    return len(rejected) == 4 and all("retry-after" in r.headers for r in rejected)
+
+
+def test_load(latency: float = 0.05):
+    """Throughput against the fake backend should grow with concurrency"""
+    print("LOAD TEST (fake backend, %.0f ms per completion)" % (latency * 1000))
+    results = {}
+    with fake_backend.restored(main.engine):
+        # Keep the cache out of the way; texts are also made unique per request
+        # so request coalescing doesn't collapse them into one completion
+        main.engine.cache = None
+        for concurrency in (1, 2, 4, 8, 16):
+            results[concurrency] = asyncio.run(run_level(concurrency, latency))
+            print(f"concurrency={concurrency:<3} throughput={results[concurrency]:.1f} req/s")
+        backpressure = asyncio.run(check_backpressure(latency))
+
+    assert results[16] > results[1] * 4, "throughput did not scale with concurrency"
+    assert backpressure, "in-flight cap did not return 429"
+    print("Backpressure: excess requests rejected with 429 + Retry-After")
+
+
+if __name__ == "__main__":
+    test_load(float(sys.argv[1]) if len(sys.argv) > 1 else 0.05)
@@ -0,0 +1,85 @@
+# dev/test_batch.py
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dev.benchmark import make_text
+from dev.fake_backend import FakeAsyncClient, serving
+from src.server import main
+from src.server.backends import LocalBackend, OpenAIBackend
+from src.server.engine import SummarizationEngine
+from src.server.preprocess import Preprocessor
+
+
+class FailingPreprocessor(Preprocessor):
+    """Fails on texts containing a marker, like a preprocessing bug would"""
+
+    def process(self, text):
+        if "FAIL" in text:
+            raise RuntimeError("preprocessing broke")
+        return super().process(text)
+
+
+async def post_batch(items):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        start = time.perf_counter()
+        response = await client.post("/summarize/batch", json={"items": items})
+        return response, time.perf_counter() - start
+
+
+def test_items_fail_and_time_out_on_their_own():
+    """One item's timeout_ms and another's preprocessing error affect only those items;
+    duplicates still make one upstream call"""
+    fake = FakeAsyncClient(latency=0.3)
+    engine = SummarizationEngine(backends={"openai": OpenAIBackend(fake), "local": LocalBackend()},
+                                 default_backend="openai", preprocessor=FailingPreprocessor())
+    text = make_text(1)
+    items = [
+        {"text": text, "max_length": 40},
+        {"text": make_text(2), "max_length": 40, "timeout_ms": 50},
+        {"text": make_text(3) + " FAIL", "max_length": 40},
+        {"text": text, "max_length": 40},
+    ]
+    with serving(main, engine):
+        response, seconds = asyncio.run(post_batch(items))
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status_code"] for r in results] == [200, 200, 500, 200]
+    # Past its own deadline the item falls back instead of waiting out the upstream call
+    assert results[1]["summary_source"] == "fallback" and "Timeout" in results[1]["fallback_reason"]
+    assert "preprocessing broke" in results[2]["error"]
+    assert results[0]["summary_source"] == "openai" and results[3]["summary"] == results[0]["summary"]
+    assert fake.calls == 2, f"expected the duplicate to share a call, got {fake.calls} calls"
+    print(f"batch of 4 in {seconds * 1000:.0f} ms: item timeout -> fallback, preprocessing error -> 500, "
+          f"duplicate shared its call")
+
+
+
+def test_duplicates_keep_their_own_deadlines():
+    """A duplicate with no timeout gets the upstream answer even when a copy
+    with a tight timeout_ms came first"""
+    fake = FakeAsyncClient(latency=0.3)
+    engine = SummarizationEngine(backends={"openai": OpenAIBackend(fake), "local": LocalBackend()},
+                                 default_backend="openai")
+    text = make_text(4)
+    items = [{"text": text, "max_length": 40, "timeout_ms": 50}, {"text": text, "max_length": 40}]
+    with serving(main, engine):
+        response, seconds = asyncio.run(post_batch(items))
+    assert response.status_code == 200
+    tight, patient = response.json()["results"]
+    assert tight["status_code"] == 504, tight
+    assert patient["status_code"] == 200 and patient["summary_source"] == "openai"
+    assert fake.calls == 1
+    print(f"duplicates with 50 ms and no timeout: 504 and an upstream answer from 1 call, {seconds * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    test_items_fail_and_time_out_on_their_own()
+    test_duplicates_keep_their_own_deadlines()
@@ -0,0 +1,74 @@
+# dev/test_documents.py
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from src.server import main
+from src.server.documents import DocumentStore
+
+
+def test_summaries_are_keyed_by_prompt_version():
+    """A summary stored under one prompt version is not served for another"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = DocumentStore(directory)
+        store.ingest([{"document": "First document."}, {"document": "Second document.", "id": "b"}])
+        assert [d.id for d in store.documents()] == ["1", "b"]
+
+        store.save_summary(0, 40, "openai:gpt-3.5-turbo", "summary@1", "A summary.", "openai")
+        assert store.summary(0, 40, "openai:gpt-3.5-turbo", "summary@1")["summary"] == "A summary."
+        assert store.summary(0, 40, "openai:gpt-3.5-turbo", "summary@2") is None
+        store.close()
+    print("stored summaries miss for a new prompt version; default ids count from 1")
+
+
+
+def test_stores_sharing_a_directory_keep_every_document():
+    """Two stores on one directory, as two workers would have, append without losing records"""
+    with tempfile.TemporaryDirectory() as directory:
+        first, second = DocumentStore(directory), DocumentStore(directory)
+        first.ingest([{"document": "From the first worker."}])
+        second.ingest([{"document": "From the second worker."}])
+        first.ingest([{"document": "The first worker again."}])
+        # Each sees the other's documents without reopening
+        assert len(second) == 3 and second.get(2).document == "The first worker again."
+        first.close()
+        second.close()
+
+        reopened = DocumentStore(directory)
+        assert [d.id for d in reopened.documents()] == ["1", "2", "3"]
+        reopened.close()
+    print("2 stores on one directory: 3 ingests, 3 documents kept, ids 1..3")
+
+
+def test_uploads_are_bounded_and_validated():
+    """POST /documents refuses oversized bodies and lines, and lines that aren't objects"""
+    async def post(body):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await client.post("/documents", content=body)
+
+    total = len(main.document_store)
+    not_objects = [asyncio.run(post(line)) for line in (b'[1]\n', b'"x"\n', b'{"document": "ok"}')]
+    assert [r.status_code for r in not_objects[:2]] == [400, 400], not_objects[0].text
+    long_line = asyncio.run(post(b"x" * (main.document_max_line_bytes + 1)))
+    max_body_bytes, main.max_body_bytes = main.max_body_bytes, 1000
+    try:
+        big_body = asyncio.run(post(b'{"document": "a"}\n' * 100))
+    finally:
+        main.max_body_bytes = max_body_bytes
+    assert long_line.status_code == 413 and big_body.status_code == 413
+    # The last line without a newline still counts as a document
+    assert not_objects[2].status_code == 201 and len(main.document_store) == total + 1
+    print("non-object lines -> 400, long lines and large bodies -> 413")
+
+if __name__ == "__main__":
+    test_summaries_are_keyed_by_prompt_version()
+    test_stores_sharing_a_directory_keep_every_document()
+    test_uploads_are_bounded_and_validated()
@@ -0,0 +1,156 @@
+# dev/test_ratelimit.py
+import asyncio
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dev import fake_backend
+from src.server import main
+from src.server.ratelimit import RateLimiter, SQLiteBuckets
+
+# 600 requests/minute: once the minute's burst is spent, one call every 100 ms
+RPM = 600
+
+
+def drain(limiter: RateLimiter, backend: str = "openai") -> None:
+    """Spend the burst allowance so later calls are paced at the refill rate"""
+    costs = limiter.costs(backend, 0)
+    costs = {name: (capacity, capacity, rate) for name, (_, capacity, rate) in costs.items()}
+    assert limiter.buckets.take(costs) == 0
+
+
+def test_waiting_tenants_are_served_round_robin():
+    """A tenant arriving behind another's burst is not stuck behind all of it"""
+    limiter = RateLimiter({"openai": (RPM, None)})
+    drain(limiter)
+    waits = {"a": [], "b": []}
+
+    async def call(tenant: str):
+        waits[tenant].append(await limiter.acquire("openai", 100, tenant=tenant))
+
+    async def scenario():
+        burst = [asyncio.ensure_future(call("a")) for _ in range(20)]
+        await asyncio.sleep(0.05)
+        await asyncio.gather(*burst, *(call("b") for _ in range(3)))
+
+    asyncio.run(scenario())
+
+    assert max(waits["b"]) < np.median(waits["a"]), waits
+    print(f"tenant b max wait {max(waits['b']) * 1000:.0f} ms vs tenant a median "
+          f"{np.median(waits['a']) * 1000:.0f} ms, max {max(waits['a']) * 1000:.0f} ms")
+
+
+def test_token_limit_refunds_unused_reservation():
+    """Calls reserve their worst case and settle to what they used"""
+    limiter = RateLimiter({"openai": (None, 6000)})
+    limiter.buckets.take(limiter.costs("openai", 6000))
+    asyncio.run(limiter.settle("openai", reserved=6000, used=1000))
+
+    wait = limiter.buckets.take(limiter.costs("openai", 5000))
+    assert wait == 0, f"refund was not applied, would wait {wait:.2f}s"
+    print("6000-token reservation that used 1000 left room for 5000 more")
+
+
+def test_sqlite_buckets_are_shared_between_workers():
+    """Two limiters on one SQLite file together stay within one limit"""
+    path = str(Path(tempfile.mkdtemp()) / "ratelimit.db")
+    workers = [RateLimiter({"openai": (RPM, None)}, SQLiteBuckets(path)) for _ in range(2)]
+    drain(workers[0])
+
+    async def scenario():
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            worker.acquire("openai", 100, tenant="t") for worker in workers for _ in range(10)
+        ))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(scenario())
+
+    # 20 calls at 10/s take about 2s however they are split between workers
+    assert elapsed >= 1.8, f"20 calls took {elapsed:.2f}s, limit not shared"
+    print(f"2 workers x 10 calls through shared buckets took {elapsed:.2f}s")
+
+
+
+def test_locked_buckets_do_not_block_the_loop():
+    """While another worker holds the SQLite file locked, acquire() waits
+    without stalling the event loop, and goes through once it is released"""
+    path = str(Path(tempfile.mkdtemp()) / "ratelimit.db")
+    limiter = RateLimiter({"openai": (RPM, None)}, SQLiteBuckets(path, timeout=0.2))
+    other = sqlite3.connect(path, isolation_level=None)
+
+    async def scenario():
+        gaps = []
+
+        async def ticker():
+            last = time.perf_counter()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        ticking = asyncio.ensure_future(ticker())
+        other.execute("BEGIN IMMEDIATE")
+        asyncio.get_running_loop().call_later(0.5, other.execute, "COMMIT")
+        start = time.perf_counter()
+        await limiter.acquire("openai", 100, tenant="t")
+        waited = time.perf_counter() - start
+        ticking.cancel()
+        return waited, max(gaps)
+
+    waited, worst_gap = asyncio.run(scenario())
+    other.close()
+    assert waited >= 0.45, f"admitted after {waited:.2f}s while the buckets were locked"
+    assert worst_gap < 0.1, f"event loop stalled for {worst_gap * 1000:.0f} ms"
+    print(f"buckets locked for 0.5s: admitted after {waited:.2f}s, longest loop stall {worst_gap * 1000:.0f} ms")
+
+async def fire_requests(n: int):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        async def post(i: int):
+            return await http.post(
+                "/summarize",
+                json={"text": f"{main.SAMPLE_DOC} ({i})", "max_length": 40},
+                headers={"X-Tenant-Id": f"tenant-{i % 2}"},
+            )
+
+        requests = [asyncio.ensure_future(post(i)) for i in range(n)]
+        await asyncio.sleep(0.3)
+        during = (await http.get("/health")).json()["engine"]["rate_limit"]
+        responses = await asyncio.gather(*requests)
+        after = (await http.get("/health")).json()["engine"]["rate_limit"]
+    return responses, during, after
+
+
+def test_requests_queue_instead_of_failing():
+    """Over the limit, API requests wait their turn rather than getting 429 or a fallback"""
+    with fake_backend.restored(main.engine):
+        fake_backend.install(main.engine, latency=0.01)
+        main.engine.cache = None
+        main.engine.rate_limiter = RateLimiter({"openai": (RPM, None)})
+        drain(main.engine.rate_limiter)
+        responses, during, after = asyncio.run(fire_requests(12))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.json()["summary_source"] == "openai" for r in responses)
+    assert during["queue_depth"] > 0 and set(during["queued"]["openai"]) == {"tenant-0", "tenant-1"}
+    assert after["queue_depth"] == 0 and after["waited"] == 12
+    print(f"12 requests over the limit all answered; queue depth mid-run {during['queue_depth']}, "
+          f"max wait {after['max_wait_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    test_waiting_tenants_are_served_round_robin()
+    test_token_limit_refunds_unused_reservation()
+    test_sqlite_buckets_are_shared_between_workers()
+    test_locked_buckets_do_not_block_the_loop()
+    test_requests_queue_instead_of_failing()
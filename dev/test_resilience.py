@@ -0,0 +1,229 @@
+# dev/test_resilience.py
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from dev import fake_backend
+from dev.fake_backend import FakeAsyncClient
+from src.server import main
+from src.server.backends import Backend, LocalBackend, OpenAIBackend
+from src.server.engine import SummarizationEngine
+from src.server.main import SAMPLE_DOC
+from src.server.resilience import CLOSED, OPEN, CircuitBreaker, CircuitOpen
+
+
+def make_engine(fake: FakeAsyncClient, **options) -> SummarizationEngine:
+    options = {"retry_base_delay": 0.01, "retry_max_delay": 0.5, **options}
+    return SummarizationEngine(
+        backends={"openai": OpenAIBackend(fake), "local": LocalBackend()},
+        default_backend="openai",
+        **options,
+    )
+
+
+def test_transient_errors_are_retried():
+    """Two 503s then success: three upstream calls, answer from the backend"""
+    fake = FakeAsyncClient(latency=0.01)
+    fake.faults.fail_next = 2
+    engine = make_engine(fake)
+
+    result = asyncio.run(engine.summarize(SAMPLE_DOC, 40))
+
+    assert result.source == "openai", result.fallback_reason
+    assert fake.calls == 3 and engine.retries == 2
+    print(f"2 transient 503s -> {fake.calls} calls, source={result.source}")
+
+
+def test_retry_after_is_respected():
+    """A 429 with Retry-After waits that long before the next attempt"""
+    fake = FakeAsyncClient(latency=0.01)
+    fake.faults.fail_next = 1
+    fake.faults.fail_status = 429
+    fake.faults.fail_retry_after = 0.3
+    engine = make_engine(fake)
+
+    start = time.perf_counter()
+    result = asyncio.run(engine.summarize(SAMPLE_DOC, 40))
+    waited = time.perf_counter() - start
+
+    assert result.source == "openai"
+    assert waited >= 0.3, f"retried after {waited:.2f}s"
+    print(f"429 with Retry-After 0.3 -> retried after {waited:.2f}s")
+
+
+def test_client_errors_are_not_retried():
+    """A 400 falls back straight away and doesn't count against the breaker"""
+    fake = FakeAsyncClient(latency=0.01)
+    fake.faults.fail_next = 1
+    fake.faults.fail_status = 400
+    engine = make_engine(fake, breaker_threshold=1)
+
+    result = asyncio.run(engine.summarize(SAMPLE_DOC, 40))
+
+    assert fake.calls == 1
+    assert result.source == "fallback" and result.fallback_reason == "openai: FakeStatusError"
+    assert engine.breaker(engine.backend("openai")).state == CLOSED
+    print(f"400 -> {fake.calls} call, {result.fallback_reason}")
+
+
+def test_breaker_fails_fast_during_outage_and_recovers():
+    """After an outage trips the breaker, calls skip the backend until a probe succeeds"""
+    fake = FakeAsyncClient(latency=0.05)
+    fake.faults.outage = True
+    fake.faults.fail_status = None
+    engine = make_engine(fake, retry_attempts=2, breaker_threshold=4, breaker_reset_timeout=0.5)
+    breaker = engine.breaker(engine.backend("openai"))
+
+    async def scenario():
+        for n in range(2):
+            await engine.summarize(f"{SAMPLE_DOC} ({n})", 40)
+        tripped_calls = fake.calls
+
+        start = time.perf_counter()
+        fast = await engine.summarize(f"{SAMPLE_DOC} (fast)", 40)
+        fast_ms = (time.perf_counter() - start) * 1000
+
+        fake.faults.outage = False
+        await asyncio.sleep(0.5)
+        probe = await engine.summarize(f"{SAMPLE_DOC} (probe)", 40)
+        return tripped_calls, fast, fast_ms, probe
+
+    tripped_calls, fast, fast_ms, probe = asyncio.run(scenario())
+
+    assert tripped_calls == 4
+    assert fast.fallback_reason == "openai: CircuitOpen"
+    assert fake.calls == 5, "an open breaker must not reach the backend"
+    assert probe.source == "openai" and breaker.state == CLOSED
+    assert breaker.times_opened == 1 and breaker.rejected == 1
+    print(f"outage: breaker opened after {tripped_calls} failures, "
+          f"fast fallback in {fast_ms:.1f} ms, probe closed it again")
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("b", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    breaker.before_call()
+    try:
+        breaker.before_call()
+        raise AssertionError("second concurrent probe was let through")
+    except CircuitOpen:
+        pass
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    print("half-open admits a single probe; a failed probe re-opens")
+
+
+class StallingBackend(Backend):
+    """Streams one token, then hangs"""
+
+    name = "stalling"
+
+    def __init__(self):
+        self.closed = False
+
+    async def stream(self, text, max_length, max_tokens=None):
+        try:
+            yield "The council "
+            await asyncio.sleep(60)
+        finally:
+            self.closed = True
+
+
+def test_stalled_stream_ends_at_deadline():
+    """A stream that stops mid-way ends at the deadline with what it had, and frees its slot"""
+    backend = StallingBackend()
+    engine = SummarizationEngine(backends={"stalling": backend, "local": LocalBackend()},
+                                 default_backend="stalling")
+
+    async def run():
+        return [event async for event in engine.stream(SAMPLE_DOC, 40, deadline=time.monotonic() + 0.3)]
+
+    start = time.perf_counter()
+    events = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    done = events[-1]
+    assert elapsed < 1.0, f"stream ran {elapsed:.2f}s past a 0.3s deadline"
+    assert done["summary_source"] == "fallback" and "TimeoutError" in done["fallback_reason"]
+    assert [e["text"] for e in events if e["event"] == "token"] == ["The council "]
+    assert backend.closed and engine.in_flight == 0
+    print(f"stalled stream ended after {elapsed * 1000:.0f} ms with its partial text")
+
+
+
+class BrokenStreamBackend(Backend):
+    """Fails once the stream has started, before its first token"""
+
+    name = "broken"
+
+    async def stream(self, text, max_length, max_tokens=None):
+        raise RuntimeError("upstream connection reset")
+        yield
+
+
+class BrokenPreprocessor:
+    def process(self, text):
+        raise ValueError("preprocessing broke")
+
+
+def test_stream_errors_are_reported():
+    """Failing before the first event is an HTTP error; failing after it with
+    no fallback ends the stream with an error event instead of dropping it"""
+    async def post():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as http:
+            return await http.post("/summarize/stream", json={"text": SAMPLE_DOC, "max_length": 40})
+
+    broken = SummarizationEngine(backends={"broken": BrokenStreamBackend()}, default_backend="broken",
+                                 fallback_backend=None)
+    with fake_backend.serving(main, broken):
+        mid_stream = asyncio.run(post())
+    unprocessable = make_engine(FakeAsyncClient(latency=0), preprocessor=BrokenPreprocessor())
+    with fake_backend.serving(main, unprocessable):
+        before_stream = asyncio.run(post())
+
+    assert mid_stream.status_code == 200
+    assert mid_stream.text.rstrip().splitlines()[-2:] == [
+        "event: error", 'data: {"status_code": 500, "detail": "Internal server error: upstream connection reset"}'
+    ], mid_stream.text
+    assert before_stream.status_code == 500 and "preprocessing broke" in before_stream.json()["detail"]
+    print("preprocessing error -> 500 before streaming; upstream failure after it -> event: error")
+
+async def health_during_outage():
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        summary = await http.post("/summarize", json={"text": SAMPLE_DOC, "max_length": 40})
+        health = await http.get("/health")
+    return summary, health
+
+
+def test_breaker_state_on_health():
+    """An outage opens the breaker of the engine the app serves from, and /health says so"""
+    fake = FakeAsyncClient(latency=0.01)
+    fake.faults.outage = True
+    # Its own engine, so no breaker built by an earlier test with another threshold applies
+    with fake_backend.serving(main, make_engine(fake, breaker_threshold=2)):
+        summary, health = asyncio.run(health_during_outage())
+
+    assert summary.status_code == 200 and summary.json()["summary_source"] == "fallback"
+    body = health.json()
+    assert body["status"] == "degraded"
+    assert body["engine"]["breakers"]["openai"]["state"] == OPEN
+    print(f"/health: status={body['status']}, openai breaker={body['engine']['breakers']['openai']}")
+
+
+if __name__ == "__main__":
+    test_transient_errors_are_retried()
+    test_retry_after_is_respected()
+    test_client_errors_are_not_retried()
+    test_breaker_fails_fast_during_outage_and_recovers()
+    test_half_open_lets_one_probe_through()
+    test_stalled_stream_ends_at_deadline()
+    test_stream_errors_are_reported()
+    test_breaker_state_on_health()
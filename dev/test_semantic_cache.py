@@ -0,0 +1,152 @@
+# dev/test_semantic_cache.py
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dev import fake_backend
+from src.server import main
+from src.server.semantic_cache import SemanticCache
+
+HEADER = "BREAKING | Subscribe to our newsletter for daily updates.\n\n"
+FOOTER = "\n\nOriginally published by Example Media. utm_source=feed&utm_campaign=daily. All rights reserved."
+
+
+def article(seed: int, sentences: int = 30) -> str:
+    """A distinct pseudo-article: shared function words, seed-specific content words"""
+    rng = random.Random(seed)
+    content = [f"{rng.choice('bcdfgklmnprst')}{rng.choice('aeiou')}{rng.choice('lmnrst')}{seed}{i}" for i in range(60)]
+    glue = ["the", "of", "and", "to", "in", "a", "said", "on", "for", "with"]
+    return " ".join(
+        " ".join(rng.choice(content if rng.random() < 0.6 else glue) for _ in range(14)).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def test_near_duplicates_hit_and_unrelated_texts_miss():
+    """The same article with a new header and footer hits; other articles and other lengths miss"""
+    cache = SemanticCache(threshold=0.85)
+    for seed in range(200):
+        hit, vector = cache.lookup(article(seed), "m|v|40")
+        assert hit is None
+        cache.add(vector, "m|v|40", f"summary {seed}")
+
+    near = [cache.lookup(HEADER + article(seed) + FOOTER, "m|v|40")[0] for seed in range(200)]
+    assert all(h is not None and h.summary == f"summary {seed}" for seed, h in enumerate(near))
+    unrelated = [cache.lookup(article(seed), "m|v|40")[0] for seed in range(200, 400)]
+    assert all(h is None for h in unrelated)
+    assert cache.lookup(article(0), "m|v|80")[0] is None
+
+    stats = cache.stats()
+    similarity = min(h.similarity for h in near)
+    print(f"near duplicates: 200/200 hits (min similarity {similarity:.3f}), unrelated: 0/200; "
+          f"hit rate {stats['hit_rate']}, mean lookup {stats['mean_lookup_ms']} ms")
+
+
+def test_index_is_bounded_and_survives_a_restart():
+    """Past max_entries the least recently used entries go; save/load keeps the rest"""
+    cache = SemanticCache(max_entries=50)
+    for seed in range(80):
+        cache.add(cache.embed(article(seed)), "ns", f"summary {seed}")
+    assert len(cache) == 50 and cache.stats()["evictions"] == 30
+    assert cache.lookup(article(10), "ns")[0] is None
+    assert cache.lookup(article(79), "ns")[0].summary == "summary 79"
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "semantic.npz")
+        cache.save(path)
+        restored = SemanticCache(max_entries=50)
+        assert restored.load(path) == 50
+        assert restored.lookup(HEADER + article(79) + FOOTER, "ns")[0].summary == "summary 79"
+        # Loading keeps least-recently-used order, so the next eviction is the oldest entry
+        restored.add(restored.embed(article(999)), "ns", "new")
+        assert restored.lookup(article(30), "ns")[0] is None
+    print(f"80 added to a 50-entry index -> {len(cache)} kept, restored {len(restored)} from disk")
+
+
+def test_audits_catch_false_hits():
+    """A sampled hit whose fresh summary disagrees is counted and dropped from the index"""
+    text = article(1)
+    poisoned = "An unrelated summary about something else."
+
+    async def run():
+        first = await main.engine.summarize(text, 40)
+        # Poison the entry, as if a different article had been summarized under this vector
+        entry = next(iter(cache._entries))
+        namespace, _, created_at, signatures = cache._entries[entry]
+        cache._entries[entry] = (namespace, poisoned, created_at, signatures)
+        hit = await main.engine.summarize(HEADER + text + FOOTER, 40)
+        await asyncio.gather(*main.engine._audits)
+        again = await main.engine.summarize(HEADER + text + FOOTER, 40)
+        await asyncio.gather(*main.engine._audits)
+        return first, hit, again
+
+    with fake_backend.restored(main.engine):
+        fake = fake_backend.install(main.engine, latency=0)
+        main.engine.cache = None
+        main.engine.semantic_cache = cache = SemanticCache(threshold=0.85, audit_rate=1.0)
+        first, hit, again = asyncio.run(run())
+    assert first.source == "openai" and hit.source == "semantic_cache"
+    stats = cache.stats()
+    assert stats["audits"] == 2 and stats["false_hits"] == 1
+    # The fresh summary replaced the bad entry, and the next audit agrees with it
+    assert hit.summary == poisoned
+    assert again.source == "semantic_cache" and again.summary != poisoned
+    print(f"audits: {stats['audits']}, false hits: {stats['false_hits']} "
+          f"(rate {stats['false_hit_rate']}), upstream calls {fake.calls}")
+
+
+def test_audits_are_dropped_when_saturated():
+    """At the in-flight cap a hit is still served, but its audit never reaches the backend"""
+    text = article(2)
+
+    async def run():
+        await main.engine.summarize(text, 40)
+        calls = fake.calls
+        main.engine.max_in_flight = 0
+        hit = await main.engine.summarize(HEADER + text + FOOTER, 40)
+        await asyncio.gather(*main.engine._audits)
+        return hit, fake.calls - calls
+
+    with fake_backend.restored(main.engine):
+        fake = fake_backend.install(main.engine, latency=0)
+        main.engine.cache = None
+        main.engine.semantic_cache = cache = SemanticCache(threshold=0.85, audit_rate=1.0)
+        hit, audit_calls = asyncio.run(run())
+        dropped = main.engine.stats()["audits_dropped"]
+    assert hit.source == "semantic_cache" and audit_calls == 0
+    assert dropped == 1 and cache.stats()["audits"] == 0
+    print(f"saturated: hit served, audit dropped ({dropped}), no extra upstream calls")
+
+
+def test_lookup_latency():
+    """Lookups against a full 10,000-entry index stay in the low milliseconds"""
+    cache = SemanticCache(max_entries=10_000)
+    vectors = np.random.default_rng(0).standard_normal((10_000, cache.dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    for i, vector in enumerate(vectors):
+        cache.add(vector, "ns", str(i))
+    text = article(5, sentences=60)
+    start = time.perf_counter()
+    for _ in range(200):
+        cache.lookup(text, "ns")
+    ms = (time.perf_counter() - start) / 200 * 1000
+    assert ms < 20, f"lookup took {ms:.2f} ms"
+    print(f"lookup (embedding {len(text)} chars + search of 10,000 entries): {ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    test_near_duplicates_hit_and_unrelated_texts_miss()
+    test_index_is_bounded_and_survives_a_restart()
+    test_audits_catch_false_hits()
+    test_audits_are_dropped_when_saturated()
+    test_lookup_latency()
@@ -0,0 +1,73 @@
+# dev/test_singleflight.py
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+# One log line per request would drown out the results
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dev import fake_backend
+from src.server import main
+from src.server.singleflight import SingleFlight
+
+N = 50
+
+
+async def fire_identical_requests(n: int):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        return await asyncio.gather(*(
+            http.post("/summarize", json={"text": main.SAMPLE_DOC, "max_length": 40})
+            for _ in range(n)
+        ))
+
+
+def test_identical_requests_share_one_upstream_call():
+    """N concurrent identical requests make exactly one upstream call"""
+    with fake_backend.restored(main.engine):
+        fake = fake_backend.install(main.engine, latency=0.2)
+        main.engine.cache = None
+        responses = asyncio.run(fire_identical_requests(N))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len({r.json()["summary"] for r in responses}) == 1
+    assert fake.calls == 1, f"expected 1 upstream call, got {fake.calls}"
+    print(f"{N} identical requests -> {fake.calls} upstream call")
+
+
+def test_errors_reach_all_waiters_without_poisoning():
+    """A failure is delivered to every waiter, and the next call retries"""
+    flight = SingleFlight()
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.05)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream exploded")
+        return "ok"
+
+    async def scenario():
+        first = await asyncio.gather(
+            *(flight.run("k", flaky) for _ in range(10)), return_exceptions=True
+        )
+        second = await flight.run("k", flaky)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert all(isinstance(r, RuntimeError) for r in first)
+    assert second == "ok"
+    assert len(attempts) == 2
+    assert len(flight) == 0
+    print("Error reached all 10 waiters; retry succeeded")
+
+
+if __name__ == "__main__":
+    test_identical_requests_share_one_upstream_call()
+    test_errors_reach_all_waiters_without_poisoning()
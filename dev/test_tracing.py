@@ -0,0 +1,101 @@
+# dev/test_tracing.py
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from dev import fake_backend
+from src.server import main
+from src.server.cache import SummaryCache
+from src.server.tracing import configure_tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+TRACEPARENT = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+exporter = InMemorySpanExporter()
+configure_tracing(exporter)
+
+
+async def post(json: dict, headers: dict = None):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        return await http.post("/summarize", json=json, headers=headers or {})
+
+
+def spans_by_name():
+    spans = {}
+    for finished in exporter.get_finished_spans():
+        spans.setdefault(finished.name, []).append(finished)
+    return spans
+
+
+def test_request_spans_continue_the_callers_trace():
+    """A traced request yields server, stage and upstream spans in the caller's trace"""
+    with fake_backend.restored(main.engine):
+        fake = fake_backend.install(main.engine, latency=0.01)
+        fake.faults.fail_next = 1
+        main.engine.retry_policy.base_delay = 0.01
+        exporter.clear()
+        response = asyncio.run(post({"text": main.SAMPLE_DOC, "max_length": 40}, {"traceparent": TRACEPARENT}))
+    assert response.status_code == 200
+    spans = spans_by_name()
+
+    server = spans["POST /summarize"][0]
+    assert format(server.context.trace_id, "032x") == TRACE_ID
+    assert all(format(s.context.trace_id, "032x") == TRACE_ID for s in exporter.get_finished_spans())
+    for name in ("validation", "preprocessing", "summarize", "cache_lookup", "upstream", "post_processing"):
+        assert name in spans, f"missing {name} span, got {sorted(spans)}"
+
+    upstream = spans["upstream"][0].attributes
+    assert upstream["model"] == "openai:gpt-3.5-turbo"
+    assert upstream["retries"] == 1
+    assert upstream["tokens.prompt"] > 0 and upstream["tokens.completion"] > 0
+    assert spans["summarize"][0].attributes["cache.hit"] is False
+    print(f"traced request -> {sorted(spans)}; upstream {dict(upstream)}")
+
+
+def test_long_documents_get_a_span_per_chunk():
+    with fake_backend.restored(main.engine):
+        fake_backend.install(main.engine, latency=0.01)
+        main.engine.chunk_tokens = 200
+        # The repeated copies would otherwise be pruned as duplicates
+        main.engine.preprocessor = None
+        exporter.clear()
+        response = asyncio.run(post({"text": " ".join([main.SAMPLE_DOC] * 12), "max_length": 40}))
+    assert response.status_code == 200
+    spans = spans_by_name()
+    assert "preprocessing" not in spans
+
+    chunks = response.json()["chunks"]
+    assert len(spans["chunk"]) >= chunks > 1
+    assert spans["map"][0].attributes["chunks"] == chunks
+    assert "reduce.final" in spans
+    print(f"{chunks}-chunk document -> {len(spans['chunk'])} chunk spans, "
+          f"{len(spans['upstream'])} upstream spans")
+
+
+def test_cache_hits_are_marked():
+    """A repeated request is answered from the cache and its summarize span says so"""
+    with fake_backend.restored(main.engine):
+        fake_backend.install(main.engine, latency=0.01)
+        main.engine.cache = SummaryCache()
+        asyncio.run(post({"text": main.SAMPLE_DOC, "max_length": 40}))
+        exporter.clear()
+        asyncio.run(post({"text": main.SAMPLE_DOC, "max_length": 40}))
+    summarize = spans_by_name()["summarize"][0].attributes
+    assert summarize["cache.hit"] is True and summarize["summary.source"] == "cache"
+    print("repeated request -> summarize span with cache.hit=True")
+
+
+if __name__ == "__main__":
+    test_request_spans_continue_the_callers_trace()
+    test_long_documents_get_a_span_per_chunk()
+    test_cache_hits_are_marked()
@@ -0,0 +1,113 @@
+# dev/test_variants.py
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import httpx
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dev.benchmark import make_text
+from dev.fake_backend import FakeAsyncClient, serving
+from src.server import main
+from src.server.backends import LocalBackend, OpenAIBackend
+from src.server.cache import SummaryCache
+from src.server.engine import DOCUMENT_SEPARATOR, SummarizationEngine
+
+
+def fake_engine(cache=None):
+    fake = FakeAsyncClient(latency=0)
+    # Summaries as long as the prompt asks for
+    fake.faults.summary_words = None
+    engine = SummarizationEngine(backends={"openai": OpenAIBackend(fake), "local": LocalBackend()},
+                                 default_backend="openai", cache=cache, chunk_tokens=1000)
+    return engine, fake
+
+
+def test_variants_share_one_pass():
+    """Three lengths of a long text: one map pass and one summary from the text,
+    the shorter two reduced from it; the longest matches a plain summary"""
+    text = make_text(1, words=3000)
+    engine, fake = fake_engine()
+    variants = asyncio.run(engine.summarize_variants([text], [50, 200, 100]))
+    one_pass = fake.calls
+
+    separate, fake = fake_engine()
+    alone = [asyncio.run(separate.summarize(text, n)) for n in (50, 200, 100)]
+    chunks = alone[0].chunks
+    assert chunks > 1 and variants[1].chunks == chunks
+    # Each separate call repeats the map (and any reduce rounds); together it runs once
+    assert one_pass == fake.calls // 3 + 2
+    assert variants[1].summary == alone[1].summary
+    assert [len(v.summary.split()) for v in variants] == [50, 200, 100]
+    tokens = sum(v.prompt_tokens + v.completion_tokens for v in variants)
+    alone_tokens = sum(r.prompt_tokens + r.completion_tokens for r in alone)
+    assert tokens < alone_tokens / 2
+    print(f"{chunks} chunks, 3 lengths: {one_pass} calls and {tokens} tokens vs {fake.calls} and {alone_tokens}")
+
+
+def test_documents_are_summarized_together():
+    """Several documents make one summary of all of them, cached as their joined text"""
+    documents = [make_text(i, words=120) for i in range(3)]
+    engine, fake = fake_engine(SummaryCache())
+    variants = asyncio.run(engine.summarize_variants(documents, [40, 400, 500]))
+    # The 500-word summary of all three documents is all 360 of their words, so
+    # it already fits 400 and is reused at no cost; 40 words is reduced from it
+    assert fake.calls == 2 and variants[1].summary == variants[2].summary
+    assert variants[1].prompt_tokens == 0 and len(variants[0].summary.split()) == 40
+
+    joined = DOCUMENT_SEPARATOR.join(documents)
+    hit = asyncio.run(engine.summarize(joined, 40))
+    assert hit.source == "cache" and hit.summary == variants[0].summary
+    again = asyncio.run(engine.summarize_variants(documents, [500, 40, 400]))
+    assert fake.calls == 2 and {v.source for v in again} == {"cache"}
+    print("3 documents at 3 lengths: 2 upstream calls; every variant cached for the joined text")
+
+
+def test_multi_endpoint():
+    """POST /summarize/multi answers each distinct length once, in order, with totals over them"""
+    async def post(body):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return await client.post("/summarize/multi", json=body)
+
+    engine, fake = fake_engine()
+    documents = [make_text(i, words=150) for i in range(2)]
+    with serving(main, engine):
+        response = asyncio.run(post({"texts": documents, "max_lengths": [30, 60, 30]}))
+        empty = asyncio.run(post({"texts": [], "max_lengths": [30]}))
+        zero = asyncio.run(post({"texts": documents, "max_lengths": [0]}))
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [v["max_length"] for v in body["variants"]] == [30, 60]
+    assert body["documents"] == 2 and fake.calls == 2
+    assert body["prompt_tokens"] == sum(v["prompt_tokens"] for v in body["variants"]) > 0
+    assert empty.status_code == 400 and zero.status_code == 422
+    print(f"/summarize/multi: {len(body['variants'])} variants, {body['prompt_tokens']} prompt tokens")
+
+
+def test_lengths_are_bounded():
+    """Every endpoint that takes a summary length refuses 0, negatives and huge ones"""
+    async def statuses(max_length):
+        body = {"text": main.SAMPLE_DOC, "max_length": max_length}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            return [
+                (await client.post("/summarize", json=body)).status_code,
+                (await client.post("/summarize/stream", json=body)).status_code,
+                (await client.post("/jobs", json=body)).status_code,
+                (await client.post("/summarize/batch", json={"items": [body]})).status_code,
+                (await client.get("/summarize/1", params={"max_length": max_length})).status_code,
+            ]
+
+    for max_length in (0, -5, main.MAX_SUMMARY_WORDS + 1):
+        assert asyncio.run(statuses(max_length)) == [422] * 5, max_length
+    print(f"max_length outside 1..{main.MAX_SUMMARY_WORDS} -> 422 on every endpoint")
+
+
+if __name__ == "__main__":
+    test_variants_share_one_pass()
+    test_documents_are_summarized_together()
+    test_multi_endpoint()
+    test_lengths_are_bounded()
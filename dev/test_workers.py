@@ -0,0 +1,223 @@
+# dev/test_workers.py
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from dev.benchmark import make_text
+from src.server import extractive
+from src.server.backends import LocalBackend
+from src.server.cache import SQLiteStore, SummaryCache
+from src.server.cpu import CPUPool
+from src.server.engine import SummarizationEngine
+from src.server.jobs import QUEUED, RUNNING, SUCCEEDED, JobQueue, JobStore, UnsafeCallback
+from src.server.preprocess import Preprocessor
+
+
+def test_cpu_pool_matches_inline():
+    """Preprocessing and local summaries from the pool equal the inline ones,
+    and the server's preprocessor stats count the pooled work"""
+    preprocessor = Preprocessor()
+    pool = CPUPool(2, preprocessor, min_chars=5_000)
+    engine = SummarizationEngine(backends={"local": LocalBackend(pool)}, default_backend="local",
+                                 preprocessor=preprocessor, cpu_pool=pool)
+    # Repeated once, which preprocessing drops; what is left fits one chunk
+    text = make_text(1, words=1500) + " " + make_text(1, words=1500)
+
+    async def run():
+        await pool.start()
+        return await engine.summarize(text, 60), await engine.summarize(make_text(2), 60)
+
+    try:
+        pooled, small = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    inline = Preprocessor().process(text)
+    assert pooled.summary == extractive.summarize(inline.text, 60)
+    assert pooled.input_tokens_saved == inline.tokens_saved > 0
+    # Two workers warmed up, then the large text's preprocessing and summary;
+    # the small text stays in the server process
+    assert pool.stats()["tasks"] == 4 and pooled.chunks == 1 and small.source == "local"
+    assert preprocessor.stats()["processed"] == 2
+    print(f"pooled summary matches inline; {inline.tokens_saved} tokens saved, {pool.stats()['tasks']} pool tasks")
+
+
+class CountingEngine:
+    def __init__(self):
+        self.calls = []
+
+    async def summarize(self, text, max_length, backend=None, progress=None):
+        from src.server.engine import SummaryResult
+        self.calls.append(text)
+        await asyncio.sleep(0.01)
+        return SummaryResult(summary=text[:20], source="local")
+
+
+def test_shared_job_store_runs_each_job_once():
+    """Two job queues on one SQLite file, as two worker processes would have,
+    run every job exactly once between them"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "jobs.db")
+        engines = [CountingEngine(), CountingEngine()]
+        queues = [JobQueue(engine, JobStore(path), workers=2) for engine in engines]
+
+        async def run():
+            # Queued while no worker is up, so both pick them up on start
+            ids = [queues[0].store.create(f"job {i}", 40, 0, None)["id"] for i in range(20)]
+            for queue in queues:
+                await queue.start()
+            ids += [queues[i % 2].submit(f"late job {i}", 40)["id"] for i in range(10)]
+            while any(queues[0].store.get(i)["status"] != SUCCEEDED for i in ids):
+                await asyncio.sleep(0.01)
+            for queue in queues:
+                await queue.stop()
+            return ids
+
+        ids = asyncio.run(run())
+        texts = engines[0].calls + engines[1].calls
+        assert len(texts) == len(set(texts)) == len(ids)
+        print(f"{len(ids)} jobs over two queues: {len(engines[0].calls)} + {len(engines[1].calls)} runs, none twice")
+
+
+def test_jobs_run_in_any_worker():
+    """A job accepted by a process with no free workers is run by another
+    process polling the same store; submitting before start() is fine too"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "jobs.db")
+        engine = CountingEngine()
+        accepting = JobQueue(CountingEngine(), JobStore(path), workers=0, poll_interval=0.05)
+        running = JobQueue(engine, JobStore(path), workers=1, poll_interval=0.05)
+        early = accepting.submit("submitted before start", 40)["id"]
+
+        async def run():
+            await accepting.start()
+            await running.start()
+            late = accepting.submit("submitted after start", 40)["id"]
+            while any(running.store.get(i)["status"] != SUCCEEDED for i in (early, late)):
+                await asyncio.sleep(0.01)
+            await accepting.stop()
+            await running.stop()
+
+        asyncio.run(run())
+        assert sorted(engine.calls) == ["submitted after start", "submitted before start"]
+    print("jobs accepted by one queue ran in another through the shared store")
+
+
+def test_stale_running_jobs_are_requeued():
+    """A job left running by a process that stopped heartbeating runs again;
+    one whose process is alive is left alone"""
+    store = JobStore(":memory:")
+    dead = store.create("left running by a dead worker", 40, 0, None)["id"]
+    alive = store.create("running in a live worker", 40, 0, None)["id"]
+    assert store.claim(dead) and store.claim(alive) and not store.claim(alive)
+    store.update(dead, heartbeat_at=time.time() - 60)
+    assert store.requeue_stale(time.time() - 30) == [{"id": dead, "priority": 0}]
+    assert store.get(dead)["status"] == QUEUED and store.get(alive)["status"] == RUNNING
+    # Status reads leave the text, which can be large, in the database
+    assert "text" not in store.get(dead) and store.text(dead) == "left running by a dead worker"
+
+    engine = CountingEngine()
+    queue = JobQueue(engine, store, workers=1, heartbeat_interval=0.05)
+
+    async def run():
+        store.update(alive, heartbeat_at=time.time() - 60)
+        await queue.start()
+        while store.get(alive)["status"] != SUCCEEDED or store.get(dead)["status"] != SUCCEEDED:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert sorted(engine.calls) == sorted(["left running by a dead worker", "running in a live worker"])
+    print("stale running job requeued; claims are exclusive")
+
+
+
+
+class LockedStore(JobStore):
+    """Fails its first few claims, like a store another process holds locked"""
+
+    def __init__(self, failures: int):
+        super().__init__(":memory:")
+        self.failures = failures
+
+    def claim(self, job_id):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return super().claim(job_id)
+
+
+def test_workers_survive_store_errors():
+    """A store error backs the worker off and retries the job instead of ending the worker"""
+    engine = CountingEngine()
+    queue = JobQueue(engine, LockedStore(failures=3), workers=1, error_backoff=0.01)
+
+    async def run():
+        await queue.start()
+        ids = [queue.submit(f"job {i}", 40)["id"] for i in range(3)]
+        while any(queue.store.get(i)["status"] != SUCCEEDED for i in ids):
+            await asyncio.sleep(0.01)
+        alive = not queue._tasks[0].done()
+        await queue.stop()
+        return alive
+
+    assert asyncio.run(run()) and sorted(engine.calls) == ["job 0", "job 1", "job 2"]
+    print("3 failed claims: the one worker backed off, retried and ran all 3 jobs")
+
+def test_callbacks_only_reach_public_hosts():
+    """Callback URLs to internal addresses are refused when submitted, or when
+    their name resolves to one; an allowlist admits only its hosts"""
+    queue = JobQueue(CountingEngine(), JobStore(":memory:"), workers=1)
+    for url in ("http://example.com/hook", "https://169.254.169.254/computeMetadata/v1/",
+                "https://127.0.0.1/hook", "https://[::ffff:10.0.0.1]/hook"):
+        try:
+            queue.submit("text", 40, callback_url=url)
+            raise AssertionError(f"{url} was accepted")
+        except UnsafeCallback:
+            pass
+
+    async def run():
+        await queue.start()
+        job = queue.submit("text", 40, callback_url="https://localhost/hook")["id"]
+        while queue.store.get(job)["callback_status"] is None:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue.store.get(job)
+
+    job = asyncio.run(run())
+    assert job["status"] == SUCCEEDED and job["callback_status"].startswith("refused:"), job["callback_status"]
+
+    allowlisted = JobQueue(CountingEngine(), JobStore(":memory:"), callback_hosts={"hooks.example.com"})
+    allowlisted.submit("text", 40, callback_url="https://hooks.example.com/done")
+    try:
+        allowlisted.submit("text", 40, callback_url="https://example.com/done")
+        raise AssertionError("a host off the allowlist was accepted")
+    except UnsafeCallback:
+        pass
+    print(f"internal callback URLs refused; localhost by name -> {job['callback_status']}")
+
+def test_summary_cache_is_shared():
+    """A summary cached by one worker's cache is a hit in another's"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "summaries.db")
+        first, second = SummaryCache(store=SQLiteStore(path)), SummaryCache(store=SQLiteStore(path))
+        first.set("key", "a summary")
+        assert second.get("key") == "a summary" and second.hits == 1
+    print("summary cached in one process is a hit in another")
+
+
+if __name__ == "__main__":
+    test_cpu_pool_matches_inline()
+    test_shared_job_store_runs_each_job_once()
+    test_jobs_run_in_any_worker()
+    test_stale_running_jobs_are_requeued()
+    test_workers_survive_store_errors()
+    test_callbacks_only_reach_public_hosts()
+    test_summary_cache_is_shared()
@@ -0,0 +1,218 @@
+# src/server/backends.py
+from typing import AsyncIterator, Optional, Union
+
+from src.server import extractive
+from src.server.chunking import estimate_tokens
+from src.server.engine import SummaryResult
+from src.server.prompts import PromptTemplate, get_prompt
+
+
+def cached_tokens(usage) -> int:
+    """Prompt tokens the provider served from its prompt cache"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", 0) or 0
+
+
+class Backend:
+    """A summarization provider. complete() raises on failure; the engine
+    decides what to fall back to."""
+
+    name = "backend"
+    remote = True
+    prompt: Optional[PromptTemplate] = get_prompt(None)
+
+    @property
+    def model_id(self) -> str:
+        return self.name
+
+    @property
+    def prompt_version(self) -> Optional[str]:
+        return self.prompt.id if self.prompt is not None else None
+
+    def warm(self) -> None:
+        """Do the one-time setup (imports, clients) its first request would otherwise wait for"""
+
+    def max_output_tokens(self, max_length: int) -> int:
+        """Completion budget when the engine doesn't pass a calibrated one"""
+        return max_length * 2
+
+    def token_cost(self, text: str, max_length: int, max_tokens: Optional[int] = None) -> int:
+        """Tokens a call may count against the provider's limits: prompt plus max output"""
+        overhead = self.prompt.overhead(max_length) if self.prompt is not None else ""
+        return estimate_tokens(overhead) + estimate_tokens(text) + (max_tokens or self.max_output_tokens(max_length))
+
+    async def complete(self, text: str, max_length: int, max_tokens: Optional[int] = None) -> SummaryResult:
+        raise NotImplementedError
+
+    async def stream(self, text: str, max_length: int,
+                     max_tokens: Optional[int] = None) -> AsyncIterator[Union[str, SummaryResult]]:
+        """Yield text deltas, then the finished SummaryResult"""
+        result = await self.complete(text, max_length, max_tokens)
+        yield result.summary
+        yield result
+
+
+class OpenAIBackend(Backend):
+    """OpenAI chat completions, through the given client or, when only an
+    api_key is given, one built on first use"""
+
+    name = "openai"
+
+    def __init__(self, client=None, model: str = "gpt-3.5-turbo", prompt: Optional[PromptTemplate] = None,
+                 api_key: Optional[str] = None):
+        self.client = client
+        self.api_key = api_key
+        self.model = model
+        self.prompt = prompt or get_prompt(None)
+        self.load_error: Optional[str] = None
+
+    @property
+    def model_id(self) -> str:
+        return f"openai:{self.model}"
+
+    def _load(self):
+        # The openai package takes most of a second to import; only import it
+        # once the backend is used
+        if self.client is None:
+            try:
+                from openai import AsyncOpenAI
+
+                # One shared async client so all requests reuse its connection pool;
+                # retries are left to the engine, which backs off and trips breakers
+                self.client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+            except Exception as e:
+                self.load_error = str(e)
+                raise
+            self.load_error = None
+        return self.client
+
+    def warm(self) -> None:
+        # The client imports its resource modules on first access, too
+        self._load().chat.completions
+
+    def _request(self, text: str, max_length: int, max_tokens: Optional[int]) -> dict:
+        return dict(
+            model=self.model,
+            messages=self.prompt.messages(text, max_length),
+            max_tokens=max_tokens or self.max_output_tokens(max_length),
+            temperature=0.3
+        )
+
+    async def complete(self, text: str, max_length: int, max_tokens: Optional[int] = None) -> SummaryResult:
+        response = await self._load().chat.completions.create(**self._request(text, max_length, max_tokens))
+        usage = getattr(response, "usage", None)
+        choice = response.choices[0]
+        return SummaryResult(
+            summary=choice.message.content.strip(),
+            source=self.name,
+            truncated=choice.finish_reason == "length",
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cached_prompt_tokens=cached_tokens(usage),
+            prompt_version=self.prompt.id,
+        )
+
+    async def stream(self, text: str, max_length: int,
+                     max_tokens: Optional[int] = None) -> AsyncIterator[Union[str, SummaryResult]]:
+        response = await self._load().chat.completions.create(
+            **self._request(text, max_length, max_tokens),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        parts = []
+        usage = None
+        finish_reason = None
+        async for chunk in response:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+
+        yield SummaryResult(
+            summary="".join(parts).strip(),
+            source=self.name,
+            truncated=finish_reason == "length",
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            cached_prompt_tokens=cached_tokens(usage),
+            prompt_version=self.prompt.id,
+        )
+
+
+class VertexBackend(Backend):
+    """Gemini on Vertex AI, as exercised in dev/test_vertex_ai.py"""
+
+    name = "vertex"
+
+    def __init__(self, project: str, location: str = "us-central1", model: str = "gemini-2.5-flash",
+                 prompt: Optional[PromptTemplate] = None):
+        self.project = project
+        self.location = location
+        self.model = model
+        self.prompt = prompt or get_prompt(None)
+        self._model = None
+
+    @property
+    def model_id(self) -> str:
+        return f"vertex:{self.model}"
+
+    def _load(self):
+        # The Vertex SDK is heavy; only import it once the backend is used
+        if self._model is None:
+            import vertexai
+            from vertexai.generative_models import GenerativeModel
+
+            vertexai.init(project=self.project, location=self.location)
+            self._model = GenerativeModel(self.model)
+        return self._model
+
+    def warm(self) -> None:
+        self._load()
+
+    async def complete(self, text: str, max_length: int, max_tokens: Optional[int] = None) -> SummaryResult:
+        response = await self._load().generate_content_async(
+            self.prompt.prompt(text, max_length),
+            generation_config={
+                "max_output_tokens": max_tokens or self.max_output_tokens(max_length),
+                "temperature": 0.3,
+            },
+        )
+        usage = getattr(response, "usage_metadata", None)
+        finish_reason = getattr(response.candidates[0], "finish_reason", None) if response.candidates else None
+        return SummaryResult(
+            summary=response.text.strip(),
+            source=self.name,
+            truncated=getattr(finish_reason, "name", None) == "MAX_TOKENS",
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            completion_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+            cached_prompt_tokens=getattr(usage, "cached_content_token_count", 0) or 0,
+            prompt_version=self.prompt.id,
+        )
+
+
+class LocalBackend(Backend):
+    """CPU-only extractive summarizer; always available, answers in milliseconds.
+    Large texts are summarized in cpu_pool's worker processes when one is given."""
+
+    name = "local"
+    remote = False
+    prompt = None
+
+    def __init__(self, cpu_pool=None):
+        self.cpu_pool = cpu_pool
+
+    @property
+    def model_id(self) -> str:
+        return "local:textrank"
+
+    async def complete(self, text: str, max_length: int, max_tokens: Optional[int] = None) -> SummaryResult:
+        if self.cpu_pool is not None and self.cpu_pool.offloads(text):
+            summary = await self.cpu_pool.summarize(text, max_length)
+        else:
+            summary = extractive.summarize(text, max_length)
+        return SummaryResult(summary=summary, source=self.name)
@@ -0,0 +1,142 @@
+# src/server/cache.py
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+SPACE = re.compile(r"\s")
+# Characters normalized and hashed at a time
+HASH_BLOCK = 1 << 16
+
+
+def cache_key(text: str, max_length: int, model: str, prompt_version: str) -> str:
+    """Hash of the whitespace-normalized text and the generation settings,
+    including the prompt template version"""
+    digest = hashlib.sha256()
+    # Hash block by block, each cut at whitespace, instead of building a
+    # normalized second copy of what may be a multi-megabyte document
+    separator = b""
+    start = 0
+    while start < len(text):
+        space = SPACE.search(text, start + HASH_BLOCK) if start + HASH_BLOCK < len(text) else None
+        end = space.start() if space else len(text)
+        words = text[start:end].split()
+        if words:
+            digest.update(separator)
+            digest.update(" ".join(words).encode("utf-8"))
+            separator = b" "
+        start = end
+    for part in (str(max_length), model, prompt_version):
+        digest.update(b"\x00")
+        digest.update(part.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SQLiteStore:
+    """On-disk summary store that survives container restarts"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, expires_at FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, summary: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, expires_at) VALUES (?, ?, ?)",
+                (key, summary, expires_at),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM summaries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SummaryCache:
+    """In-memory LRU with TTL, optionally backed by a persistent store"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400, store=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            summary, expires_at = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return summary
+            del self._entries[key]
+            self.expirations += 1
+
+        if self.store is not None:
+            stored = self.store.get(key)
+            if stored is not None:
+                summary, expires_at = stored
+                if expires_at > now:
+                    self._remember(key, summary, expires_at)
+                    self.hits += 1
+                    return summary
+                self.store.delete(key)
+                self.expirations += 1
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, summary: str) -> None:
+        expires_at = time.time() + self.ttl
+        self._remember(key, summary, expires_at)
+        if self.store is not None:
+            self.store.set(key, summary, expires_at)
+
+    def _remember(self, key: str, summary: str, expires_at: float) -> None:
+        self._entries[key] = (summary, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self.store is not None,
+        }
@@ -0,0 +1,69 @@
+# src/server/chunking.py
+import re
+from typing import Iterator, List
+
+# A sentence runs to terminal punctuation followed by whitespace, a blank
+# line (paragraph break) or the end of the text
+SENTENCE = re.compile(r"\S.*?(?:[.!?]+[\"'”’)\]]*(?=\s|$)|\n\s*\n|$)", re.S)
+WORD = re.compile(r"\S+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English)"""
+    return (len(text) + 3) // 4
+
+
+def iter_sentences(text: str, max_tokens: int) -> Iterator[str]:
+    """Yield sentences lazily, hard-splitting any longer than max_tokens"""
+    for match in SENTENCE.finditer(text):
+        sentence = match.group().strip()
+        if not sentence:
+            continue
+        if estimate_tokens(sentence) <= max_tokens:
+            yield sentence
+            continue
+
+        window: List[str] = []
+        size = 0
+        for word in WORD.finditer(sentence):
+            tokens = estimate_tokens(word.group()) + 1
+            if window and size + tokens > max_tokens:
+                yield " ".join(window)
+                window, size = [], 0
+            window.append(word.group())
+            size += tokens
+        if window:
+            yield " ".join(window)
+
+
+def split_text(text: str, chunk_tokens: int, overlap_tokens: int = 0) -> Iterator[str]:
+    """Yield chunks of whole sentences, each within chunk_tokens.
+
+    Consecutive chunks share up to overlap_tokens of trailing sentences so
+    context that straddles a boundary is seen by both. Only the current
+    chunk is held in memory, never the full list of sentences.
+    """
+    current: List[str] = []
+    size = 0
+    for sentence in iter_sentences(text, chunk_tokens):
+        tokens = estimate_tokens(sentence) + 1
+        if current and size + tokens > chunk_tokens:
+            yield " ".join(current)
+
+            carry: List[str] = []
+            carried = 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous) + 1
+                if carried + previous_tokens > overlap_tokens:
+                    break
+                carry.insert(0, previous)
+                carried += previous_tokens
+            current, size = carry, carried
+            if size + tokens > chunk_tokens:
+                current, size = [], 0
+
+        current.append(sentence)
+        size += tokens
+
+    if current:
+        yield " ".join(current)
@@ -0,0 +1,83 @@
+# src/server/cpu.py
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from src.server import extractive
+from src.server.preprocess import Preprocessed, Preprocessor
+
+# Each worker process's copy of the server's preprocessor
+_preprocessor: Optional[Preprocessor] = None
+
+
+def _init(preprocessor: Optional[Preprocessor]) -> None:
+    global _preprocessor
+    _preprocessor = preprocessor
+
+
+def _preprocess(text: str) -> Preprocessed:
+    return _preprocessor.clean(text)
+
+
+def _ready() -> None:
+    pass
+
+
+class CPUPool:
+    """CPU-bound steps (preprocessing, the local extractive summarizer) run
+    in worker processes, on other cores, instead of holding the event loop.
+
+    Texts under min_chars take less time to handle in place than to send to
+    another process and back, so offloads() is false for them.
+    """
+
+    def __init__(self, workers: int, preprocessor: Optional[Preprocessor] = None, min_chars: int = 10_000):
+        self.workers = workers
+        self.min_chars = min_chars
+        # spawn, not fork: by the time work arrives the server has threads,
+        # whose locks a forked child could inherit held
+        self._executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init, initargs=(preprocessor,),
+        )
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.tasks = 0
+
+    def offloads(self, text: str) -> bool:
+        return len(text) >= self.min_chars
+
+    async def run(self, function, *args):
+        """function(*args) in a worker process; function and arguments must pickle"""
+        with self._lock:
+            self.in_flight += 1
+            self.tasks += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def preprocess(self, text: str) -> Preprocessed:
+        """Preprocessor.clean(text); the caller records the outcome"""
+        return await self.run(_preprocess, text)
+
+    async def summarize(self, text: str, max_length: int) -> str:
+        return await self.run(extractive.summarize, text, max_length)
+
+    async def start(self) -> None:
+        """Start the worker processes now rather than on the first requests"""
+        await asyncio.gather(*(self.run(_ready) for _ in range(self.workers)))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "min_chars": self.min_chars,
+            "in_flight": self.in_flight,
+            "tasks": self.tasks,
+        }
@@ -0,0 +1,203 @@
+# src/server/documents.py
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process per store
+    fcntl = None
+
+# Each index entry is the end offset of one document's line in the data file
+OFFSET = struct.Struct("<Q")
+
+
+class Document(NamedTuple):
+    index: int
+    id: str
+    document: str
+    summary: Optional[str]
+
+
+class DocumentStore:
+    """A corpus on disk: documents as JSON lines, found by position through a
+    fixed-width offset index, with generated summaries kept in SQLite.
+
+    Both files are memory-mapped, so fetching document i reads two offsets
+    and one line no matter how large the corpus is, and the OS page cache,
+    not the process, holds whatever is hot. Several processes may share one
+    directory: appends hold an exclusive lock on the index file, and each
+    process picks up the others' documents when it sees the index grow.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.directory / "documents.jsonl"
+        self.index_path = self.directory / "documents.idx"
+        self._lock = threading.Lock()
+        self._data: Optional[mmap.mmap] = None
+        self._index: Optional[mmap.mmap] = None
+        self._count = 0
+        self._conn = sqlite3.connect(str(self.directory / "summaries.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " document INTEGER NOT NULL,"
+            " max_length INTEGER NOT NULL,"
+            " model TEXT NOT NULL,"
+            " prompt_version TEXT NOT NULL,"
+            " summary TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (document, max_length, model, prompt_version))"
+        )
+        self._conn.commit()
+        self.data_path.touch()
+        self.index_path.touch()
+        self._remap()
+
+    def _remap(self) -> None:
+        for mapped in (self._data, self._index):
+            if mapped is not None:
+                mapped.close()
+        # A partial trailing entry (a crash mid-ingest) is ignored
+        self._count = self.index_path.stat().st_size // OFFSET.size
+        self._index = self._map(self.index_path)
+        self._data = self._map(self.data_path)
+
+    @staticmethod
+    def _map(path: Path) -> Optional[mmap.mmap]:
+        if path.stat().st_size == 0:
+            return None  # mmap can't map an empty file
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _refresh(self) -> None:
+        """Remap if another process has appended since; call with _lock held"""
+        if self.index_path.stat().st_size // OFFSET.size != self._count:
+            self._remap()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._count
+
+    def _end(self, index: int) -> int:
+        return OFFSET.unpack_from(self._index, index * OFFSET.size)[0] if index >= 0 else 0
+
+    def get(self, index: int) -> Optional[Document]:
+        """Document at a 0-based position, or None past the end (the API counts from 1)"""
+        with self._lock:
+            if index >= self._count:
+                self._refresh()
+            if not 0 <= index < self._count:
+                return None
+            line = self._data[self._end(index - 1):self._end(index)]
+        record = json.loads(line)
+        return Document(index, record["id"], record["document"], record.get("summary"))
+
+    def ingest(self, records: Iterable[dict], only_if_empty: bool = False) -> int:
+        """Append {"document", "summary"?, "id"?} records; returns how many were added.
+
+        A record without an id gets its API index, its position counting from 1.
+        With only_if_empty, nothing is added to a store that has documents, so
+        workers starting together seed a shared store once.
+        """
+        added = 0
+        with self._lock, open(self.index_path, "r+b") as index:
+            if fcntl is not None:
+                # Released when the index file closes
+                fcntl.flock(index.fileno(), fcntl.LOCK_EX)
+            try:
+                # Another process may have appended since this one last looked
+                self._remap()
+                if only_if_empty and self._count:
+                    return 0
+                end = self._end(self._count - 1)
+                with open(self.data_path, "r+b") as data:
+                    # Under the lock, anything past the last indexed document or
+                    # a partial index entry can only be left over from a crash
+                    data.truncate(end)
+                    data.seek(end)
+                    index.truncate(self._count * OFFSET.size)
+                    index.seek(self._count * OFFSET.size)
+                    for record in records:
+                        if not record.get("document"):
+                            raise ValueError(f"record {added} has no document")
+                        line = json.dumps({
+                            "id": str(record.get("id", self._count + added + 1)),
+                            "document": record["document"],
+                            "summary": record.get("summary"),
+                        }).encode("utf-8") + b"\n"
+                        data.write(line)
+                        end += len(line)
+                        index.write(OFFSET.pack(end))
+                        added += 1
+                    # Data reaches disk before the index entries that point into it
+                    data.flush()
+                    os.fsync(data.fileno())
+                    index.flush()
+                    os.fsync(index.fileno())
+            finally:
+                # Records before a bad one stay ingested
+                self._remap()
+        return added
+
+    def documents(self, offset: int = 0, limit: int = 20) -> List[Document]:
+        return [d for d in (self.get(i) for i in range(offset, min(offset + limit, len(self)))) if d]
+
+    def summary(self, index: int, max_length: int, model: str, prompt_version: str) -> Optional[dict]:
+        """The stored summary made under exactly this model and prompt version, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, source, created_at FROM summaries"
+                " WHERE document = ? AND max_length = ? AND model = ? AND prompt_version = ?",
+                (index, max_length, model, prompt_version),
+            ).fetchone()
+        return {"summary": row[0], "source": row[1], "created_at": row[2]} if row else None
+
+    def save_summary(self, index: int, max_length: int, model: str, prompt_version: str,
+                     summary: str, source: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries"
+                " (document, max_length, model, prompt_version, summary, source, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (index, max_length, model, prompt_version, summary, source, time.time()),
+            )
+            self._conn.commit()
+
+    def summaries(self, offset: int = 0, limit: int = 20) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT document, max_length, model, prompt_version, summary, source, created_at FROM summaries"
+                " ORDER BY document, max_length, model, prompt_version LIMIT ? OFFSET ?",
+                (limit, offset),
+            ).fetchall()
+        columns = ("document", "max_length", "model", "prompt_version", "summary", "source", "created_at")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def summary_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            "documents": len(self),
+            "summaries": self.summary_count(),
+            "data_bytes": self.data_path.stat().st_size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for mapped in (self._data, self._index):
+                if mapped is not None:
+                    mapped.close()
+            self._conn.close()
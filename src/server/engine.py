@@ -0,0 +1,962 @@
+# src/server/engine.py
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.server.cache import cache_key
+from src.server.chunking import estimate_tokens, split_text
+from src.server.hedging import LatencyTracker, hedged
+from src.server.metrics import (
+    PROMPT_TOKENS, STAGE_SECONDS, SUMMARIES, UPSTREAM_ERRORS, UPSTREAM_RETRIES, UPSTREAM_TOKENS
+)
+from src.server.resilience import OPEN, CircuitBreaker, RetryPolicy, is_retryable
+from src.server.rouge import score as rouge_score
+from src.server.singleflight import SingleFlight
+from src.server.sizing import TRUNCATIONS, OutputSizer, trim_to_sentence, trims_cleanly
+from src.server.tracing import current_span, span, stage
+
+log = logging.getLogger(__name__)
+
+# Inputs longer than this are preprocessed and embedded off the event loop
+OFFLOAD_CHARS = 100_000
+
+# Documents summarized together are joined as paragraphs of one text
+DOCUMENT_SEPARATOR = "\n\n"
+
+class EngineBusy(Exception):
+    """Raised when the engine is already at its in-flight cap"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Summarizer is at capacity, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before it gets an answer"""
+
+    def __init__(self):
+        super().__init__("Request deadline exceeded")
+
+
+class UnknownBackend(ValueError):
+    """Raised when a request names a backend that is not configured"""
+
+    def __init__(self, name: str, available: Iterable[str]):
+        super().__init__(f"Unknown backend '{name}', choose one of: {', '.join(sorted(available))}")
+        self.name = name
+
+
+# Called with (chunks_done, chunks_total) as a long document is mapped
+Progress = Optional[Callable[[int, int], None]]
+
+
+@dataclass
+class SummaryResult:
+    summary: str
+    source: str
+    chunks: int = 1
+    depth: int = 0
+    stage_latency_ms: Dict[str, float] = field(default_factory=dict)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # Prompt tokens the provider served from its prompt cache
+    cached_prompt_tokens: int = 0
+    # Estimated input tokens preprocessing removed before the backend saw the text
+    input_tokens_saved: int = 0
+    prompt_version: Optional[str] = None
+    # The completion hit its max_tokens budget
+    truncated: bool = False
+    fallback_reason: Optional[str] = None
+
+
+def worst_source(results: Iterable[SummaryResult]) -> str:
+    """If any part of a summary came from the fallback, so did the whole"""
+    sources = [r.source for r in results]
+    return "fallback" if "fallback" in sources else sources[-1]
+
+
+def first_fallback_reason(results: Iterable[SummaryResult]) -> Optional[str]:
+    return next((r.fallback_reason for r in results if r.fallback_reason), None)
+
+
+class SummarizationEngine:
+    """Async summarization over pluggable backends with bounded concurrency"""
+
+    def __init__(
+        self,
+        backends: dict,
+        default_backend: str = "local",
+        fallback_backend: Optional[str] = "local",
+        latency_budget: Optional[float] = None,
+        max_concurrency: int = 8,
+        max_in_flight: int = 32,
+        retry_after: int = 1,
+        cache=None,
+        chunk_tokens: int = 3000,
+        chunk_overlap_tokens: int = 200,
+        chunk_summary_words: int = 120,
+        chunk_concurrency: int = 4,
+        max_reduce_depth: int = 8,
+        hedge_backend: Optional[str] = None,
+        hedge_quantile: float = 0.95,
+        hedge_delay: float = 1.0,
+        deadline_grace: float = 0.25,
+        retry_attempts: int = 3,
+        retry_base_delay: float = 0.2,
+        retry_max_delay: float = 5.0,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        rate_limiter=None,
+        output_sizer=None,
+        preprocessor=None,
+        semantic_cache=None,
+        cpu_pool=None,
+    ):
+        self.backends = backends
+        self.default_backend = default_backend
+        self.fallback_backend = fallback_backend
+        self.latency_budget = latency_budget
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap_tokens = chunk_overlap_tokens
+        self.chunk_summary_words = chunk_summary_words
+        self.chunk_concurrency = chunk_concurrency
+        self.max_reduce_depth = max_reduce_depth
+        self.hedge_backend = hedge_backend
+        self.hedge_quantile = hedge_quantile
+        self.hedge_delay = hedge_delay
+        self.deadline_grace = deadline_grace
+        self.retry_policy = RetryPolicy(retry_attempts, retry_base_delay, retry_max_delay)
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset_timeout = breaker_reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retries = 0
+        self.rate_limiter = rate_limiter
+        self.output_sizer = output_sizer or OutputSizer()
+        self.preprocessor = preprocessor
+        self.semantic_cache = semantic_cache
+        # Worker processes for preprocessing large texts, if any
+        self.cpu_pool = cpu_pool
+        self._audits = set()
+        self.audits_dropped = 0
+        self.latency = LatencyTracker()
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.in_flight = 0
+        self.upstream_in_flight = 0
+        self.inflight_calls = SingleFlight()
+        self._upstream_slots = None
+
+    @property
+    def upstream_slots(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the server's running loop
+        if self._upstream_slots is None:
+            self._upstream_slots = asyncio.Semaphore(self.max_concurrency)
+        return self._upstream_slots
+
+    @contextlib.asynccontextmanager
+    async def _slot(self, backend):
+        # Only remote calls count against the upstream concurrency limit
+        if backend.remote:
+            async with self.upstream_slots:
+                self.upstream_in_flight += 1
+                try:
+                    yield
+                finally:
+                    self.upstream_in_flight -= 1
+        else:
+            yield
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "max_concurrency": self.max_concurrency,
+            "coalesced": self.inflight_calls.coalesced,
+            "backends": sorted(self.backends),
+            "default_backend": self.default_backend,
+            "fallback_backend": self.fallback_backend,
+            "hedge_backend": self.hedge_backend,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "latency": self.latency.stats(),
+            "retries": self.retries,
+            "rate_limit": self.rate_limiter.stats() if self.rate_limiter is not None else None,
+            "output_sizing": self.output_sizer.stats(),
+            "preprocessing": self.preprocessor.stats() if self.preprocessor is not None else None,
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache is not None else None,
+            "audits_dropped": self.audits_dropped,
+            "cpu_pool": self.cpu_pool.stats() if self.cpu_pool is not None else None,
+            "breakers": {
+                name: self.breaker(backend).stats()
+                for name, backend in self.backends.items() if backend.remote
+            },
+        }
+
+    def breaker(self, backend) -> CircuitBreaker:
+        if backend.name not in self.breakers:
+            self.breakers[backend.name] = CircuitBreaker(
+                backend.name, self.breaker_threshold, self.breaker_reset_timeout
+            )
+        return self.breakers[backend.name]
+
+    def degraded(self) -> bool:
+        """True while any backend's breaker is open"""
+        return any(b.state == OPEN for b in self.breakers.values())
+
+    def backend(self, name: Optional[str] = None):
+        name = name or self.default_backend
+        if name not in self.backends:
+            raise UnknownBackend(name, self.backends)
+        return self.backends[name]
+
+    def cache_key(self, text: str, max_length: int, backend=None) -> str:
+        backend = backend or self.backend()
+        return cache_key(text, max_length, backend.model_id, backend.prompt_version or "")
+
+    async def _off_loop(self, text: str, function, *args):
+        """function(*args), on a worker thread when text is large enough to stall the loop"""
+        if len(text) > OFFLOAD_CHARS:
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+
+    async def preprocess(self, text: str) -> Tuple[str, int]:
+        """The text as it is cached and summarized, and the tokens that saved"""
+        if self.preprocessor is None:
+            return text, 0
+        with stage("preprocessing") as current:
+            if self.cpu_pool is not None and self.cpu_pool.offloads(text):
+                processed = self.preprocessor.record(await self.cpu_pool.preprocess(text))
+            else:
+                processed = await self._off_loop(text, self.preprocessor.process, text)
+            current.set_attribute("tokens_saved", processed.tokens_saved)
+        return processed.text, processed.tokens_saved
+
+    async def semantic_lookup(self, text: str, max_length: int, backend):
+        """A semantic cache hit for text, if any, and its vector for adding it later"""
+        if self.semantic_cache is None:
+            return None, None
+        with stage("semantic_lookup") as current:
+            hit, vector = await self._off_loop(
+                text, self.semantic_cache.lookup, text, semantic_namespace(backend, max_length)
+            )
+            current.set_attribute("semantic_cache.hit", hit is not None)
+            if hit is not None:
+                current.set_attribute("semantic_cache.similarity", round(hit.similarity, 4))
+        if hit is not None and self.semantic_cache.should_audit():
+            self._start_audit(text, max_length, backend, hit, vector)
+        return hit, vector
+
+    def _remember(self, key: str, max_length: int, backend, summary: str, vector) -> None:
+        if self.cache is not None:
+            self.cache.set(key, summary)
+        if vector is not None:
+            self.semantic_cache.add(vector, semantic_namespace(backend, max_length), summary)
+
+    def _start_audit(self, text: str, max_length: int, backend, hit, vector) -> None:
+        """Re-summarize a semantic hit in the background and score it against the cached summary.
+
+        Audits count against the in-flight cap and join identical calls like
+        any request; when the engine is saturated they are dropped, not queued.
+        """
+        if self.in_flight >= self.max_in_flight:
+            self.audits_dropped += 1
+            return
+        key = self.cache_key(text, max_length, backend)
+
+        async def audit():
+            try:
+                fresh = await self.inflight_calls.run(
+                    key, lambda: self._admit(key, text, max_length, backend)
+                )
+            except EngineBusy:
+                self.audits_dropped += 1
+                return
+            except Exception as e:
+                log.warning("semantic cache audit failed", extra={"error": type(e).__name__, "detail": str(e)})
+                return
+            if fresh.source != backend.name:
+                return
+            agreement = rouge_score(fresh.summary, hit.summary)["rougeL"]
+            if self.semantic_cache.audit(hit, agreement):
+                log.warning("semantic cache false hit", extra={
+                    "similarity": round(hit.similarity, 4), "rouge_l": agreement,
+                })
+                self._remember(key, max_length, backend, fresh.summary, vector)
+
+        task = asyncio.ensure_future(audit())
+        # Held so the task isn't garbage collected before it finishes
+        self._audits.add(task)
+        task.add_done_callback(self._audits.discard)
+
+    async def summarize(self, text: str, max_length: int = 150, backend: Optional[str] = None,
+                        progress: Progress = None, deadline: Optional[float] = None) -> SummaryResult:
+        """Summarize text via preprocessing, the cache, request coalescing and the chosen backend.
+
+        deadline is a time.monotonic() timestamp; backend calls get only the
+        time left before it, and fall back once it has passed.
+        """
+        chosen = self.backend(backend)
+        text, saved = await self.preprocess(text)
+        result = await self._summarize_prepared(text, max_length, chosen, progress, deadline)
+        # Coalesced requests share one result, but each saved its own tokens
+        return replace(result, input_tokens_saved=saved)
+
+    async def _summarize_prepared(self, text: str, max_length: int, chosen, progress: Progress = None,
+                                  deadline: Optional[float] = None) -> SummaryResult:
+        with span("summarize", {"backend": chosen.name, "max_length": max_length, "input.chars": len(text)}) as current:
+            with stage("cache_lookup"):
+                key = self.cache_key(text, max_length, chosen)
+                cached = self.cache.get(key) if self.cache is not None else None
+            current.set_attribute("cache.hit", cached is not None)
+            if cached is not None:
+                SUMMARIES.inc(source="cache")
+                current.set_attribute("summary.source", "cache")
+                return SummaryResult(summary=cached, source="cache", prompt_version=chosen.prompt_version)
+
+            hit, vector = await self.semantic_lookup(text, max_length, chosen)
+            if hit is not None:
+                SUMMARIES.inc(source="semantic_cache")
+                current.set_attribute("summary.source", "semantic_cache")
+                return SummaryResult(summary=hit.summary, source="semantic_cache",
+                                     prompt_version=chosen.prompt_version)
+
+            # Identical concurrent requests wait on the first one's completion
+            current.set_attribute("coalesced", key in self.inflight_calls)
+            call = self.inflight_calls.run(
+                key, lambda: self._admit(key, text, max_length, chosen, progress, deadline, vector)
+            )
+            # A waiter may have a tighter deadline than the call it joined
+            result = await self._within(call, deadline)
+            SUMMARIES.inc(source=result.source)
+            current.set_attributes({"summary.source": result.source, "chunks": result.chunks})
+            return result
+
+    async def _within(self, call: Awaitable, deadline: Optional[float]):
+        """Await call, raising DeadlineExceeded if deadline (plus grace) passes first"""
+        if deadline is None:
+            return await call
+        try:
+            return await asyncio.wait_for(call, remaining(deadline) + self.deadline_grace)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded()
+
+    async def summarize_many(
+        self, items: List[Tuple[str, int, Optional[str], Optional[float]]], parallelism: int = 8,
+        deadline: Optional[float] = None
+    ) -> List[Union[SummaryResult, Exception]]:
+        """Summarize (text, max_length, backend, deadline) items concurrently, in input order.
+
+        Each item fails on its own, whether in preprocessing, backend lookup
+        or the backend call: its slot holds the exception instead of a
+        result. An item's deadline is the tighter of its own and deadline.
+        Items that are the same after preprocessing are summarized once, with
+        the loosest of their deadlines, and each waits on it for its own.
+        """
+        slots = asyncio.Semaphore(parallelism)
+        deadlines = [
+            min((d for d in (deadline, item_deadline) if d is not None), default=None)
+            for _, _, _, item_deadline in items
+        ]
+
+        async def prepare(text: str, max_length: int, backend: Optional[str]):
+            async with slots:
+                chosen = self.backend(backend)
+                text, tokens_saved = await self.preprocess(text)
+            return self.cache_key(text, max_length, chosen), text, max_length, chosen, tokens_saved
+
+        prepared = await asyncio.gather(
+            *(prepare(text, max_length, backend) for text, max_length, backend, _ in items),
+            return_exceptions=True,
+        )
+
+        # A shared call runs until the most patient of its items gives up
+        call_deadlines: Dict[str, Optional[float]] = {}
+        for item, item_deadline in zip(prepared, deadlines):
+            if isinstance(item, BaseException):
+                continue
+            key = item[0]
+            if key not in call_deadlines:
+                call_deadlines[key] = item_deadline
+            elif call_deadlines[key] is not None:
+                call_deadlines[key] = None if item_deadline is None else max(call_deadlines[key], item_deadline)
+
+        async def call(text: str, max_length: int, chosen, call_deadline: Optional[float]) -> SummaryResult:
+            async with slots:
+                return await self._summarize_prepared(text, max_length, chosen, deadline=call_deadline)
+
+        calls: Dict[str, asyncio.Future] = {}
+
+        async def run(item, item_deadline: Optional[float]) -> SummaryResult:
+            if isinstance(item, BaseException):
+                raise item
+            key, text, max_length, chosen, tokens_saved = item
+            if key not in calls:
+                calls[key] = asyncio.ensure_future(call(text, max_length, chosen, call_deadlines[key]))
+                # Retrieved even if every item waiting on it gave up
+                calls[key].add_done_callback(lambda done: done.cancelled() or done.exception())
+            result = await self._within(asyncio.shield(calls[key]), item_deadline)
+            return replace(result, input_tokens_saved=tokens_saved)
+
+        return await asyncio.gather(
+            *(run(item, item_deadline) for item, item_deadline in zip(prepared, deadlines)),
+            return_exceptions=True,
+        )
+
+    async def summarize_variants(
+        self, texts: List[str], max_lengths: List[int], backend: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> List[SummaryResult]:
+        """One summary of texts, taken together, at each of max_lengths, in that order.
+
+        The texts are preprocessed and joined into one document, which goes
+        upstream once: it is summarized at the longest length (through the
+        map pass if it overflows one call), and each shorter length is a
+        reduce of that summary. Variants are cached under the joined text,
+        so they are also hits for /summarize of it at that length.
+        """
+        chosen = self.backend(backend)
+        prepared = [await self.preprocess(text) for text in texts]
+        text = DOCUMENT_SEPARATOR.join(t for t, _ in prepared)
+        saved = sum(tokens_saved for _, tokens_saved in prepared)
+        lengths = sorted(set(max_lengths), reverse=True)
+        keys = {n: self.cache_key(text, n, chosen) for n in lengths}
+        variants: Dict[int, SummaryResult] = {}
+        with span("summarize.variants", {"backend": chosen.name, "documents": len(texts),
+                                          "lengths": len(lengths), "input.chars": len(text)}) as current:
+            with stage("cache_lookup"):
+                for n in lengths:
+                    cached = self.cache.get(keys[n]) if self.cache is not None else None
+                    if cached is not None:
+                        variants[n] = SummaryResult(summary=cached, source="cache",
+                                                    prompt_version=chosen.prompt_version)
+            current.set_attribute("cache.hits", len(variants))
+
+            missing = [n for n in lengths if n not in variants]
+            if missing:
+                if self.in_flight >= self.max_in_flight:
+                    raise EngineBusy(self.retry_after)
+                self.in_flight += 1
+                try:
+                    variants.update(await self._variants(text, missing, variants.get(lengths[0]), chosen, deadline))
+                finally:
+                    self.in_flight -= 1
+                for n in missing:
+                    if variants[n].source == chosen.name:
+                        self._remember(keys[n], n, chosen, variants[n].summary, None)
+            for n in lengths:
+                SUMMARIES.inc(source=variants[n].source)
+        return [replace(variants[n], input_tokens_saved=saved) for n in max_lengths]
+
+    async def _variants(self, text: str, lengths: List[int], reference: Optional[SummaryResult], backend,
+                        deadline: Optional[float] = None) -> Dict[int, SummaryResult]:
+        """Summaries of text at lengths (longest first), shorter ones reduced from reference.
+
+        reference is the summary at the longest requested length if it was
+        cached; otherwise the first of lengths is that length, summarized
+        from text itself.
+        """
+        results: Dict[int, SummaryResult] = {}
+        if reference is None:
+            reference = results[lengths[0]] = await self._summarize(text, lengths[0], backend, deadline=deadline)
+
+        async def reduce(n: int) -> SummaryResult:
+            if len(reference.summary.split()) <= n:
+                # The longer summary already fits
+                return replace(reference, chunks=1, depth=0, stage_latency_ms={}, prompt_tokens=0,
+                               completion_tokens=0, cached_prompt_tokens=0)
+            start = time.perf_counter()
+            with span("reduce.variant", {"max_length": n}):
+                result = await self._complete(reference.summary, n, backend, deadline)
+            result.stage_latency_ms = {"reduce": elapsed_ms(start)}
+            if reference.source == "fallback":
+                # Reduced from a fallback summary is no better than one
+                result.source = "fallback"
+                result.fallback_reason = result.fallback_reason or reference.fallback_reason
+            return result
+
+        shorter = [n for n in lengths if n not in results]
+        results.update(zip(shorter, await asyncio.gather(*(reduce(n) for n in shorter))))
+        return results
+
+    async def _admit(self, key: str, text: str, max_length: int, backend,
+                     progress: Progress = None, deadline: Optional[float] = None,
+                     vector=None) -> SummaryResult:
+        """Run one backend summary, rejecting immediately at the in-flight cap"""
+        if self.in_flight >= self.max_in_flight:
+            raise EngineBusy(self.retry_after)
+
+        self.in_flight += 1
+        try:
+            result = await self._summarize(text, max_length, backend, progress, deadline)
+        finally:
+            self.in_flight -= 1
+
+        # Only answers from the requested backend are kept, never fallbacks
+        if result.source == backend.name:
+            self._remember(key, max_length, backend, result.summary, vector)
+        return result
+
+    async def _summarize(self, text: str, max_length: int, backend,
+                         progress: Progress = None, deadline: Optional[float] = None) -> SummaryResult:
+        start = time.perf_counter()
+        if estimate_tokens(text) > self.chunk_tokens:
+            return await self._summarize_long(text, max_length, backend, progress, deadline)
+
+        result = await self._complete(text, max_length, backend, deadline)
+        result.stage_latency_ms = {"summarize": elapsed_ms(start)}
+        if progress is not None:
+            progress(1, 1)
+        return result
+
+    async def _summarize_long(self, text: str, max_length: int, backend,
+                              progress: Progress = None, deadline: Optional[float] = None) -> SummaryResult:
+        """Map-reduce: summarize chunks in parallel, then merge until one fits"""
+        start = time.perf_counter()
+        condensed = await self._condense(text, backend, progress, deadline)
+        with span("reduce.final"):
+            final = await self._complete(condensed.summary, max_length, backend, deadline)
+        result = merge_final(condensed, final, start)
+        observe_stages(result)
+        return result
+
+    async def _condense(self, text: str, backend, progress: Progress = None,
+                        deadline: Optional[float] = None) -> SummaryResult:
+        """Map and reduce text until its partial summaries fit one context.
+
+        The returned result holds the joined partials (not yet the final
+        summary) along with the chunk count, depth and token usage so far.
+        """
+        start = time.perf_counter()
+        chunks = split_text(text, self.chunk_tokens, self.chunk_overlap_tokens)
+        with span("map") as current:
+            partials = await self._map(
+                chunks, self.chunk_summary_words, backend, progress, self.estimate_chunks(text), deadline
+            )
+            current.set_attribute("chunks", len(partials))
+        map_ms = elapsed_ms(start)
+
+        chunk_count = len(partials)
+        sources = list(partials)
+        depth = 1
+        while True:
+            combined = "\n\n".join(p.summary for p in partials)
+            if estimate_tokens(combined) <= self.chunk_tokens or depth >= self.max_reduce_depth:
+                break
+            # Partial summaries still overflow the context: merge them in groups
+            with span("reduce", {"depth": depth}):
+                partials = await self._map(
+                    split_text(combined, self.chunk_tokens), self.chunk_summary_words, backend,
+                    deadline=deadline
+                )
+            sources.extend(partials)
+            depth += 1
+
+        return SummaryResult(
+            summary=combined,
+            source=worst_source(sources),
+            chunks=chunk_count,
+            depth=depth,
+            stage_latency_ms={"map": map_ms},
+            prompt_tokens=sum(r.prompt_tokens for r in sources),
+            completion_tokens=sum(r.completion_tokens for r in sources),
+            cached_prompt_tokens=sum(r.cached_prompt_tokens for r in sources),
+            prompt_version=next((r.prompt_version for r in sources if r.prompt_version), None),
+            truncated=any(r.truncated for r in sources),
+            fallback_reason=first_fallback_reason(sources),
+        )
+
+    def estimate_chunks(self, text: str) -> int:
+        stride = max(1, self.chunk_tokens - self.chunk_overlap_tokens)
+        return max(1, math.ceil(estimate_tokens(text) / stride))
+
+    async def _map(self, chunks: Iterable[str], max_length: int, backend,
+                   progress: Progress = None, total: int = 0,
+                   deadline: Optional[float] = None) -> List[SummaryResult]:
+        # A fixed pool of workers pulls chunks from the generator, so only
+        # chunk_concurrency chunks are ever materialized at once
+        numbered = enumerate(chunks)
+        results: Dict[int, SummaryResult] = {}
+
+        async def worker():
+            for index, chunk in numbered:
+                with span("chunk", {"chunk.index": index, "input.chars": len(chunk)}):
+                    results[index] = await self._complete(chunk, max_length, backend, deadline)
+                if progress is not None:
+                    # The total is an estimate; never report more done than total
+                    progress(len(results), max(total, len(results)))
+
+        await asyncio.gather(*(worker() for _ in range(self.chunk_concurrency)))
+        return [results[i] for i in sorted(results)]
+
+    def _timeout(self, deadline: Optional[float]) -> Optional[float]:
+        """Seconds a backend call may take: the latency budget or the time left"""
+        limits = [self.latency_budget] if self.latency_budget is not None else []
+        if deadline is not None:
+            limits.append(remaining(deadline))
+        return min(limits) if limits else None
+
+    async def _complete(self, text: str, max_length: int, backend,
+                        deadline: Optional[float] = None) -> SummaryResult:
+        """One backend call, bounded by the latency budget and deadline, with fallback"""
+        timeout = self._timeout(deadline)
+        give_up_at = time.monotonic() + timeout if timeout is not None else None
+        try:
+            log.debug("upstream request", extra={"backend": backend.name, "chars": len(text)})
+            hedge = self.backends.get(self.hedge_backend) if self.hedge_backend else None
+            if hedge is None or not backend.remote:
+                result = await asyncio.wait_for(self._call(backend, text, max_length, give_up_at), timeout)
+            else:
+                result = await hedged(
+                    lambda: self._call(backend, text, max_length, give_up_at),
+                    lambda: self._call(hedge, text, max_length, give_up_at),
+                    delay=self._hedge_delay(backend),
+                    timeout=timeout,
+                    on_hedge=self._count_hedge,
+                )
+            return result
+
+        except Exception as e:
+            self._count_timeout(backend, e, timeout)
+            UPSTREAM_ERRORS.inc(backend=backend.name, type=type(e).__name__)
+            return await self._fallback(text, max_length, backend, e)
+
+    async def _call(self, backend, text: str, max_length: int,
+                    give_up_at: Optional[float] = None) -> SummaryResult:
+        attempts = 0
+        budget = self.output_sizer.budget(backend.model_id, max_length) if backend.remote else None
+
+        async def attempt():
+            nonlocal attempts
+            attempts += 1
+            return await self._attempt(backend, text, max_length, budget)
+
+        with span("upstream", {"backend": backend.name, "model": backend.model_id,
+                               "input.chars": len(text), "max_tokens": budget or 0}) as current:
+            try:
+                result = await self._retrying(backend, attempt, give_up_at)
+                if result.truncated and not trims_cleanly(result.summary):
+                    # Cutting back to a full sentence would lose most of it:
+                    # ask again with room to finish
+                    cut = result
+                    budget *= 2
+                    result = await self._retrying(backend, attempt, give_up_at)
+                    result.prompt_tokens += cut.prompt_tokens
+                    result.completion_tokens += cut.completion_tokens
+                    result.cached_prompt_tokens += cut.cached_prompt_tokens
+                    TRUNCATIONS.inc(model=backend.model_id, action="extended")
+                if result.truncated:
+                    result.summary = trim_to_sentence(result.summary)
+                    TRUNCATIONS.inc(model=backend.model_id, action="trimmed")
+            finally:
+                current.set_attribute("retries", max(0, attempts - 1))
+            current.set_attributes({
+                "tokens.prompt": result.prompt_tokens,
+                "tokens.completion": result.completion_tokens,
+                "truncated": result.truncated,
+            })
+            return result
+
+    async def _attempt(self, backend, text: str, max_length: int,
+                       max_tokens: Optional[int] = None) -> SummaryResult:
+        queued = time.perf_counter()
+        reserved = await self._reserve(backend, text, max_length, max_tokens)
+        async with self._slot(backend):
+            start = time.perf_counter()
+            if backend.remote:
+                # Waiting on rate limits and for an upstream slot
+                STAGE_SECONDS.observe(start - queued, stage="queue_wait")
+                current_span().set_attribute("queue_wait_ms", round((start - queued) * 1000, 2))
+            result = await backend.complete(text, max_length, max_tokens)
+        seconds = time.perf_counter() - start
+        self.latency.record(backend.name, seconds)
+        STAGE_SECONDS.observe(seconds, stage="upstream")
+        await self._settle(backend, reserved, result, max_length, max_tokens)
+        return result
+
+    async def _reserve(self, backend, text: str, max_length: int, max_tokens: Optional[int] = None) -> int:
+        # Queue for provider rate limit capacity before taking an upstream slot
+        if self.rate_limiter is None or not backend.remote:
+            return 0
+        reserved = backend.token_cost(text, max_length, max_tokens)
+        await self.rate_limiter.acquire(backend.name, reserved)
+        return reserved
+
+    async def _settle(self, backend, reserved: int, result: SummaryResult, max_length: int,
+                      max_tokens: Optional[int]) -> None:
+        if max_tokens:
+            self.output_sizer.observe(backend.model_id, max_length, max_tokens,
+                                      result.completion_tokens, result.truncated)
+        UPSTREAM_TOKENS.inc(result.prompt_tokens, backend=backend.name, kind="prompt")
+        UPSTREAM_TOKENS.inc(result.completion_tokens, backend=backend.name, kind="completion")
+        if result.prompt_version:
+            template = result.prompt_version
+            PROMPT_TOKENS.inc(result.cached_prompt_tokens, backend=backend.name, template=template, cache="hit")
+            PROMPT_TOKENS.inc(result.prompt_tokens - result.cached_prompt_tokens,
+                              backend=backend.name, template=template, cache="miss")
+        if reserved:
+            await self.rate_limiter.settle(backend.name, reserved, result.prompt_tokens + result.completion_tokens)
+
+    async def _retrying(self, backend, attempt: Callable, give_up_at: Optional[float] = None):
+        """Run attempt() behind the backend's circuit breaker, retrying transient errors.
+
+        Backoff never sleeps past give_up_at: if the next attempt could not
+        start before then, the last error is raised instead.
+        """
+        if not backend.remote:
+            return await attempt()
+
+        breaker = self.breaker(backend)
+        failures = 0
+        while True:
+            breaker.before_call()
+            try:
+                result = await attempt()
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The backend answered; it just won't take this request
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                failures += 1
+                delay = self.retry_policy.delay(failures, e)
+                if failures >= self.retry_policy.attempts or (
+                    give_up_at is not None and time.monotonic() + delay >= give_up_at
+                ):
+                    raise
+                log.info("retrying upstream call", extra={
+                    "backend": backend.name, "error": type(e).__name__,
+                    "attempt": failures, "delay_s": round(delay, 3),
+                })
+                self.retries += 1
+                UPSTREAM_RETRIES.inc(backend=backend.name)
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    def _count_timeout(self, backend, error: Exception, timeout: Optional[float]) -> None:
+        # Running out the latency budget counts against the backend's breaker;
+        # running out a client's own (possibly tiny) deadline does not
+        if (backend.remote and isinstance(error, asyncio.TimeoutError)
+                and timeout is not None and timeout == self.latency_budget):
+            self.breaker(backend).record_failure()
+
+    def _hedge_delay(self, backend) -> float:
+        # Hedge once the primary is slower than usual for its backend
+        observed = self.latency.quantile(backend.name, self.hedge_quantile)
+        return observed if observed is not None else self.hedge_delay
+
+    def _count_hedge(self, won: bool) -> None:
+        self.hedges_fired += 1
+        if won:
+            self.hedges_won += 1
+
+    async def _fallback(self, text: str, max_length: int, failed, error: Exception) -> SummaryResult:
+        log.warning("upstream call failed", extra={
+            "backend": failed.name, "error": type(error).__name__, "detail": str(error),
+        })
+        fallback = self.backends.get(self.fallback_backend)
+        if fallback is None or fallback is failed:
+            raise error
+
+        with span("fallback", {"backend": fallback.name, "failed_backend": failed.name,
+                               "error": type(error).__name__}):
+            result = await fallback.complete(text, max_length)
+        result.source = "fallback"
+        result.fallback_reason = f"{failed.name}: {type(error).__name__}"
+        return result
+
+    async def stream(self, text: str, max_length: int = 150, backend: Optional[str] = None,
+                     deadline: Optional[float] = None) -> AsyncIterator[dict]:
+        """Yield a start event, the summary as token events, then a done event.
+
+        The in-flight cap is checked before the start event, so callers can
+        await the first event to surface EngineBusy before streaming begins.
+        """
+        start = time.perf_counter()
+        chosen = self.backend(backend)
+        text, saved = await self.preprocess(text)
+        with stage("cache_lookup"):
+            key = self.cache_key(text, max_length, chosen)
+            cached = self.cache.get(key) if self.cache is not None else None
+        source, vector = "cache", None
+        if cached is None:
+            hit, vector = await self.semantic_lookup(text, max_length, chosen)
+            if hit is not None:
+                cached, source = hit.summary, "semantic_cache"
+        if cached is not None:
+            SUMMARIES.inc(source=source)
+            yield {"event": "start"}
+            yield {"event": "token", "text": cached}
+            yield {
+                "event": "done",
+                "summary_source": source,
+                "prompt_version": chosen.prompt_version,
+                "input_tokens_saved": saved,
+                "time_to_first_token_ms": elapsed_ms(start),
+                "latency_ms": elapsed_ms(start),
+            }
+            return
+
+        if self.in_flight >= self.max_in_flight:
+            raise EngineBusy(self.retry_after)
+        self.in_flight += 1
+        try:
+            yield {"event": "start"}
+
+            condensed = None
+            if estimate_tokens(text) > self.chunk_tokens:
+                with span("condense", {"backend": chosen.name, "input.chars": len(text)}):
+                    condensed = await self._condense(text, chosen, deadline=deadline)
+                text = condensed.summary
+
+            first_token_ms = None
+            final = None
+            async for item in self._complete_stream(text, max_length, chosen, deadline):
+                if isinstance(item, SummaryResult):
+                    final = item
+                    continue
+                if first_token_ms is None:
+                    first_token_ms = elapsed_ms(start)
+                yield {"event": "token", "text": item}
+
+            if condensed is not None:
+                final = merge_final(condensed, final, start)
+                observe_stages(final)
+            SUMMARIES.inc(source=final.source)
+            if final.source == chosen.name:
+                self._remember(key, max_length, chosen, final.summary, vector)
+
+            yield {
+                "event": "done",
+                "summary_source": final.source,
+                "fallback_reason": final.fallback_reason,
+                "chunks": final.chunks,
+                "depth": final.depth,
+                "prompt_version": final.prompt_version,
+                "prompt_tokens": final.prompt_tokens,
+                "cached_prompt_tokens": final.cached_prompt_tokens,
+                "input_tokens_saved": saved,
+                "completion_tokens": final.completion_tokens,
+                "truncated": final.truncated,
+                "time_to_first_token_ms": first_token_ms,
+                "latency_ms": elapsed_ms(start),
+            }
+        finally:
+            self.in_flight -= 1
+
+    async def _complete_stream(self, text: str, max_length: int, backend,
+                               deadline: Optional[float] = None) -> AsyncIterator[Union[str, SummaryResult]]:
+        """Like _complete, but yield text deltas and finish with the result"""
+        parts: List[str] = []
+        timeout = self._timeout(deadline)
+        give_up_at = time.monotonic() + timeout if timeout is not None else None
+        budget = self.output_sizer.budget(backend.model_id, max_length) if backend.remote else None
+
+        def time_left() -> Optional[float]:
+            return remaining(give_up_at) if give_up_at is not None else None
+
+        async def first_delta():
+            deltas = backend.stream(text, max_length, budget)
+            try:
+                # The latency budget and deadline bound the wait for the first delta
+                return deltas, await asyncio.wait_for(deltas.__anext__(), time_left())
+            except BaseException:
+                await deltas.aclose()
+                raise
+
+        try:
+            log.debug("upstream stream", extra={"backend": backend.name, "chars": len(text)})
+            queued = time.perf_counter()
+            reserved = await asyncio.wait_for(self._reserve(backend, text, max_length, budget), timeout)
+            async with self._slot(backend):
+                if backend.remote:
+                    STAGE_SECONDS.observe(time.perf_counter() - queued, stage="queue_wait")
+                # Opening the stream is retried; once text has flowed it is not
+                with span("upstream.first_token", {"backend": backend.name, "model": backend.model_id}):
+                    deltas, item = await self._retrying(backend, first_delta, give_up_at)
+                try:
+                    while not isinstance(item, SummaryResult):
+                        parts.append(item)
+                        yield item
+                        # ...and every later one, so a stream that stalls mid-way
+                        # ends at the deadline instead of holding its slot
+                        item = await asyncio.wait_for(deltas.__anext__(), time_left())
+                finally:
+                    await deltas.aclose()
+            await self._settle(backend, reserved, item, max_length, budget)
+            if item.truncated:
+                # The cut-off text already went out; what is kept ends on a full sentence
+                item.summary = trim_to_sentence(item.summary)
+                TRUNCATIONS.inc(model=backend.model_id, action="trimmed")
+            yield item
+
+        except Exception as e:
+            UPSTREAM_ERRORS.inc(backend=backend.name, type=type(e).__name__)
+            if parts:
+                # Part of the summary already reached the client; keep it
+                log.warning("upstream stream failed mid-way", extra={
+                    "backend": backend.name, "error": type(e).__name__, "detail": str(e),
+                })
+                yield SummaryResult(
+                    summary="".join(parts).strip(),
+                    source="fallback",
+                    fallback_reason=f"{backend.name}: {type(e).__name__}",
+                )
+                return
+            self._count_timeout(backend, e, timeout)
+            fallback = await self._fallback(text, max_length, backend, e)
+            yield fallback.summary
+            yield fallback
+
+
+def merge_final(condensed: SummaryResult, final: SummaryResult, start: float) -> SummaryResult:
+    """Combine the map-reduce bookkeeping with the final reduce call"""
+    map_ms = condensed.stage_latency_ms["map"]
+    return SummaryResult(
+        summary=final.summary,
+        source=worst_source([condensed, final]),
+        chunks=condensed.chunks,
+        depth=condensed.depth,
+        stage_latency_ms={
+            "map": map_ms,
+            "reduce": round(elapsed_ms(start) - map_ms, 2),
+            "summarize": elapsed_ms(start),
+        },
+        prompt_tokens=condensed.prompt_tokens + final.prompt_tokens,
+        completion_tokens=condensed.completion_tokens + final.completion_tokens,
+        cached_prompt_tokens=condensed.cached_prompt_tokens + final.cached_prompt_tokens,
+        prompt_version=final.prompt_version or condensed.prompt_version,
+        truncated=condensed.truncated or final.truncated,
+        fallback_reason=first_fallback_reason([condensed, final]),
+    )
+
+
+def observe_stages(result: SummaryResult) -> None:
+    for name in ("map", "reduce"):
+        if name in result.stage_latency_ms:
+            STAGE_SECONDS.observe(result.stage_latency_ms[name] / 1000, stage=name)
+
+
+def semantic_namespace(backend, max_length: int) -> str:
+    """Semantic cache entries only match requests that would be summarized the same way"""
+    return f"{backend.model_id}|{backend.prompt_version or ''}|{max_length}"
+
+
+def remaining(deadline: float) -> float:
+    return max(0.0, deadline - time.monotonic())
+
+
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
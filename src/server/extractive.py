@@ -0,0 +1,97 @@
+# src/server/extractive.py
+import itertools
+import re
+from typing import List
+
+import numpy as np
+
+from src.server.chunking import SENTENCE
+
+TOKEN = re.compile(r"[a-z0-9']+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its "
+    "of on or our she so that the their them they this to was we were what "
+    "when which who will with would you your".split()
+)
+
+# Bound the sentence-term matrix; past this, terms are hashed into fewer columns
+MAX_CELLS = 4_000_000
+# Above this many sentences the n x n similarity graph gets too big for
+# TextRank, so sentences are scored by similarity to the document centroid
+TEXTRANK_MAX_SENTENCES = 1500
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in (m.group().strip() for m in SENTENCE.finditer(text)) if s]
+
+
+def tfidf_matrix(sentences: List[str]) -> np.ndarray:
+    """L2-normalized TF-IDF rows, one per sentence"""
+    vocab = {}
+    terms = [
+        [vocab.setdefault(word, len(vocab)) for word in TOKEN.findall(sentence.lower())
+         if word not in STOPWORDS]
+        for sentence in sentences
+    ]
+    n = len(sentences)
+    dims = max(1, len(vocab))
+    if n * dims > MAX_CELLS:
+        dims = max(256, MAX_CELLS // n)
+
+    rows = np.repeat(np.arange(n), [len(t) for t in terms])
+    cols = np.fromiter(itertools.chain.from_iterable(terms), dtype=np.int64, count=len(rows)) % dims
+    tf = np.bincount(rows * dims + cols, minlength=n * dims).reshape(n, dims).astype(np.float32)
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + n) / (1 + df)).astype(np.float32) + 1
+    weights = tf * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return weights / norms
+
+
+def textrank(similarity: np.ndarray, damping: float = 0.85, iterations: int = 50) -> np.ndarray:
+    n = similarity.shape[0]
+    np.fill_diagonal(similarity, 0)
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    out_weight[out_weight == 0] = 1
+    transition = (similarity / out_weight).T
+
+    scores = np.full(n, 1 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+
+def summarize(text: str, max_words: int) -> str:
+    """Pick the highest-ranked sentences, in document order, within max_words"""
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
+
+    lengths = np.array([len(s.split()) for s in sentences])
+    if lengths.sum() <= max_words:
+        return " ".join(sentences)
+
+    vectors = tfidf_matrix(sentences)
+    if len(sentences) <= TEXTRANK_MAX_SENTENCES:
+        scores = textrank(vectors @ vectors.T)
+    else:
+        scores = vectors @ vectors.mean(axis=0)
+
+    chosen = []
+    words = 0
+    for index in np.argsort(-scores, kind="stable"):
+        if words + lengths[index] > max_words:
+            continue
+        chosen.append(index)
+        words += lengths[index]
+
+    if not chosen:
+        # Even the best sentence is too long: trim it to the budget
+        best = sentences[int(np.argmax(scores))].split()
+        return " ".join(best[:max_words])
+    return " ".join(sentences[i] for i in sorted(chosen))
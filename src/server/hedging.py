@@ -0,0 +1,76 @@
+# src/server/hedging.py
+import asyncio
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+import numpy as np
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies per backend"""
+
+    def __init__(self, window: int = 500):
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, backend: str, seconds: float) -> None:
+        self._samples[backend].append(seconds)
+
+    def quantile(self, backend: str, q: float, min_samples: int = 20) -> Optional[float]:
+        samples = self._samples.get(backend)
+        if not samples or len(samples) < min_samples:
+            return None
+        return float(np.quantile(np.fromiter(samples, dtype=float), q))
+
+    def stats(self) -> dict:
+        return {
+            backend: {
+                "samples": len(samples),
+                "p50_ms": round(float(np.quantile(list(samples), 0.5)) * 1000, 2),
+                "p95_ms": round(float(np.quantile(list(samples), 0.95)) * 1000, 2),
+                "p99_ms": round(float(np.quantile(list(samples), 0.99)) * 1000, 2),
+            }
+            for backend, samples in self._samples.items() if samples
+        }
+
+
+async def hedged(primary: Callable[[], Awaitable], backup: Callable[[], Awaitable],
+                 delay: float, timeout: Optional[float] = None, on_hedge=None):
+    """Run primary; if it hasn't answered after `delay`, also run backup.
+
+    The first successful answer wins and the other call is cancelled. If
+    one call fails, the other is still awaited. on_hedge(won: bool) is
+    called once a backup was fired, telling whether the backup won.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    first = asyncio.ensure_future(primary())
+    second = None
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay if deadline is None else min(delay, timeout))
+        if done:
+            return first.result()
+        if deadline is not None and loop.time() >= deadline:
+            raise asyncio.TimeoutError()
+
+        second = asyncio.ensure_future(backup())
+        pending = {first, second}
+        error = None
+        while pending:
+            remaining = None if deadline is None else max(0, deadline - loop.time())
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                raise asyncio.TimeoutError()
+            for task in done:
+                if task.exception() is None:
+                    if on_hedge is not None:
+                        on_hedge(task is second)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # Whoever lost (or everything, on timeout/cancellation) is cancelled
+        for task in (first, second):
+            if task is not None:
+                task.cancel()
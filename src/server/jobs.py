@@ -0,0 +1,425 @@
+# src/server/jobs.py
+import asyncio
+import ipaddress
+import itertools
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional, Set
+from urllib.parse import urlsplit
+
+from src.server.engine import EngineBusy, SummaryResult
+from src.server.logs import request_id
+from src.server.ratelimit import current_tenant
+from src.server.resilience import CircuitOpen
+
+log = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+COLUMNS = (
+    "id", "status", "priority", "text", "max_length", "backend", "callback_url",
+    "created_at", "started_at", "finished_at", "progress", "result", "error",
+    "callback_status", "heartbeat_at",
+)
+# What status polls read: everything but the submitted text, which can be large
+STATUS_COLUMNS = tuple(column for column in COLUMNS if column != "text")
+
+
+class UnsafeCallback(ValueError):
+    """A callback URL the service refuses to POST to"""
+
+
+def check_callback_url(url: str, allowed_hosts: Optional[Set[str]] = None) -> str:
+    """Validate a job's callback URL before it is accepted; returns its host.
+
+    Only https is allowed. With an allowlist the host must be on it;
+    without one, a literal IP address must be public (not loopback, private,
+    link-local or reserved), and a name's addresses are checked before each
+    callback by check_callback_addresses.
+    """
+    parts = urlsplit(url)
+    if parts.scheme != "https" or not parts.hostname:
+        raise UnsafeCallback("callback_url must be an https URL")
+    host = parts.hostname.lower()
+    if allowed_hosts is not None:
+        if host not in allowed_hosts:
+            raise UnsafeCallback(f"callback host {host} is not allowed")
+        return host
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return host
+    if not is_public(address):
+        raise UnsafeCallback(f"callback host {host} is not a public address")
+    return host
+
+
+def check_callback_addresses(url: str) -> None:
+    """Refuse a callback whose host resolves to any non-public address (blocking)"""
+    parts = urlsplit(url)
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or 443, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        raise UnsafeCallback(f"callback host {parts.hostname} does not resolve: {e}")
+    for info in infos:
+        if not is_public(ipaddress.ip_address(info[4][0].split("%")[0])):
+            raise UnsafeCallback(f"callback host {parts.hostname} resolves to {info[4][0]}")
+
+
+def is_public(address) -> bool:
+    # ::ffff:127.0.0.1 is loopback too
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+
+class JobStore:
+    """SQLite-backed job records, so queued work survives a restart; a file
+    can be shared by every worker process on the host"""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " priority INTEGER NOT NULL,"
+            " text TEXT NOT NULL,"
+            " max_length INTEGER NOT NULL,"
+            " backend TEXT,"
+            " callback_url TEXT,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " progress TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " callback_status TEXT,"
+            " heartbeat_at REAL)"
+        )
+        self._conn.commit()
+
+    def create(self, text: str, max_length: int, priority: int, callback_url: Optional[str],
+               backend: Optional[str] = None) -> dict:
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "priority": priority,
+            "text": text,
+            "max_length": max_length,
+            "backend": backend,
+            "callback_url": callback_url,
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, priority, text, max_length, backend, callback_url, created_at)"
+                " VALUES (:id, :status, :priority, :text, :max_length, :backend, :callback_url, :created_at)",
+                job,
+            )
+            self._conn.commit()
+        return self.get(job["id"])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """The job's status and result, without its text"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(STATUS_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for column in ("progress", "result"):
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def text(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def update(self, job_id: str, **fields) -> None:
+        for column in ("progress", "result"):
+            if column in fields and fields[column] is not None:
+                fields[column] = json.dumps(fields[column])
+        assignments = ", ".join(f"{column} = :{column}" for column in fields if column in COLUMNS)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = :id", {**fields, "id": job_id})
+            self._conn.commit()
+
+    def claim(self, job_id: str) -> bool:
+        """Mark a queued job running; false if it isn't queued, e.g. because
+        another worker process claimed it first"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, now, now, job_id, QUEUED),
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        """Note that these running jobs are still being worked on"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+                [(time.time(), job_id, RUNNING) for job_id in job_ids],
+            )
+            self._conn.commit()
+
+    def requeue_stale(self, before: float) -> List[dict]:
+        """Queue again the running jobs whose last heartbeat is older than
+        before: their process died or restarted. Returns them."""
+        requeued = []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, priority, heartbeat_at FROM jobs"
+                " WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (RUNNING, before),
+            ).fetchall()
+            for row in rows:
+                # Only if unchanged since the select, so one process requeues each job
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = ? WHERE id = ? AND status = ? AND heartbeat_at IS ?",
+                    (QUEUED, row["id"], RUNNING, row["heartbeat_at"]),
+                )
+                if cursor.rowcount == 1:
+                    requeued.append({"id": row["id"], "priority": row["priority"]})
+            self._conn.commit()
+        return requeued
+
+    def queued(self) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, priority FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+class JobQueue:
+    """Priority queue of summarization jobs drained by a fixed worker pool.
+
+    When several processes share a file-backed store, each also polls it
+    every poll_interval for jobs the others accepted, so a job runs in
+    whichever process claims it first, not only the one it was submitted to.
+    """
+
+    def __init__(self, engine, store: JobStore, workers: int = 2, callback_timeout: float = 10,
+                 heartbeat_interval: float = 10, poll_interval: float = 1.0, progress_interval: float = 1.0,
+                 callback_hosts: Optional[Set[str]] = None, error_backoff: float = 1.0):
+        self.engine = engine
+        self.store = store
+        self.workers = workers
+        self.callback_timeout = callback_timeout
+        # Hosts callbacks may go to; any public host when None
+        self.callback_hosts = callback_hosts
+        # Pause after a store error (e.g. "database is locked") before going on
+        self.error_backoff = error_backoff
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        # Chunk progress is written at most this often per job
+        self.progress_interval = progress_interval
+        # Created by start(), so it binds to the server's running loop
+        self._queue = None
+        self._tasks: List[asyncio.Task] = []
+        self._order = itertools.count()
+        self._enqueued: Set[str] = set()
+        self._running: Set[str] = set()
+
+    async def start(self) -> None:
+        self._queue = asyncio.PriorityQueue()
+        # Anything queued before a restart (or before start) goes back in line
+        self._enqueue_queued()
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.ensure_future(self._heartbeats()))
+        if self.store.path != ":memory:":
+            self._tasks.append(asyncio.ensure_future(self._poll()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, text: str, max_length: int = 150, priority: int = 0,
+               callback_url: Optional[str] = None, backend: Optional[str] = None) -> dict:
+        """Store a queued job; before start() it waits in the store until start() runs.
+
+        Raises UnsafeCallback for a callback URL the queue won't call.
+        """
+        if callback_url is not None:
+            check_callback_url(callback_url, self.callback_hosts)
+        job = self.store.create(text, max_length, priority, callback_url, backend)
+        if self._queue is not None:
+            self._enqueue(job["id"], priority)
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers if self._tasks else 0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "by_status": self.store.counts(),
+        }
+
+    async def _heartbeats(self) -> None:
+        """Keep this process's running jobs fresh, and requeue those a dead
+        or restarted process left running, once they miss three heartbeats"""
+        while True:
+            try:
+                if self._running:
+                    self.store.heartbeat(list(self._running))
+                for job in self.store.requeue_stale(time.time() - 3 * self.heartbeat_interval):
+                    self._enqueue(job["id"], job["priority"])
+            except Exception as e:
+                log.warning("job heartbeat failed", extra={"error": type(e).__name__, "detail": str(e)})
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                self._enqueue_queued()
+            except Exception as e:
+                log.warning("job poll failed", extra={"error": type(e).__name__, "detail": str(e)})
+
+    def _enqueue_queued(self) -> None:
+        for job in self.store.queued():
+            self._enqueue(job["id"], job["priority"])
+
+    def _enqueue(self, job_id: str, priority: int) -> None:
+        if job_id in self._enqueued:
+            return
+        self._enqueued.add(job_id)
+        # Higher priority first, then first come first served
+        self._queue.put_nowait((-priority, next(self._order), job_id))
+
+    async def _worker(self) -> None:
+        # Background work shares rate limits with interactive callers as one tenant
+        current_tenant.set("jobs")
+        while True:
+            priority, _, job_id = await self._queue.get()
+            self._enqueued.discard(job_id)
+            # Log lines of a job carry its id as their request id
+            request_id.set(f"job-{job_id}")
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                # A store error must not end the worker and shrink the pool
+                log.warning("job worker error", extra={"error": type(e).__name__, "detail": str(e)})
+                await asyncio.sleep(self.error_backoff)
+                # Tried again unless it was claimed; a claimed job that lost
+                # its worker is requeued once its heartbeats stop
+                self._enqueue(job_id, -priority)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        if not self.store.claim(job_id):
+            return
+        self._running.add(job_id)
+        try:
+            await self._execute(job_id)
+        finally:
+            self._running.discard(job_id)
+
+    async def _execute(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        text = self.store.text(job_id)
+        written = 0.0
+
+        def progress(done: int, total: int) -> None:
+            nonlocal written
+            # A synchronous write on the event loop, so not one per chunk
+            if done < total and time.monotonic() - written < self.progress_interval:
+                return
+            written = time.monotonic()
+            self.store.update(job_id, progress={"chunks_done": done, "chunks_total": total})
+
+        try:
+            while True:
+                try:
+                    result = await self.engine.summarize(
+                        text, job["max_length"], job["backend"], progress=progress
+                    )
+                    break
+                except (EngineBusy, CircuitOpen) as e:
+                    # Jobs wait their turn instead of failing on backpressure
+                    # or while their backend is known to be down
+                    await asyncio.sleep(e.retry_after)
+            self.store.update(
+                job_id,
+                status=SUCCEEDED,
+                finished_at=time.time(),
+                result=job_result(result),
+            )
+        except Exception as e:
+            self.store.update(
+                job_id,
+                status=FAILED,
+                finished_at=time.time(),
+                error=f"{type(e).__name__}: {e}",
+            )
+
+        if job["callback_url"]:
+            await self._notify(job_id, job["callback_url"])
+
+    async def _notify(self, job_id: str, url: str) -> None:
+        # Imported on first use so it stays off the startup path
+        import requests
+
+        job = public_job(self.store.get(job_id))
+        try:
+            check_callback_url(url, self.callback_hosts)
+            if self.callback_hosts is None:
+                # Checked now, not at submit time, since DNS may have changed
+                await asyncio.to_thread(check_callback_addresses, url)
+            # Redirects aren't followed: they could lead to an internal host
+            response = await asyncio.to_thread(
+                requests.post, url, json=job, timeout=self.callback_timeout, allow_redirects=False
+            )
+            status = str(response.status_code)
+        except UnsafeCallback as e:
+            status = f"refused: {e}"
+        except Exception as e:
+            status = f"error: {type(e).__name__}"
+        self.store.update(job_id, callback_status=status)
+
+
+def job_result(result: SummaryResult) -> dict:
+    return {
+        "summary": result.summary,
+        "summary_source": result.source,
+        "fallback_reason": result.fallback_reason,
+        "chunks": result.chunks,
+        "depth": result.depth,
+        "stage_latency_ms": result.stage_latency_ms,
+        "prompt_version": result.prompt_version,
+        "prompt_tokens": result.prompt_tokens,
+        "cached_prompt_tokens": result.cached_prompt_tokens,
+        "input_tokens_saved": result.input_tokens_saved,
+    }
+
+
+def public_job(job: dict) -> dict:
+    """The job as returned to clients: everything but the submitted text"""
+    return {key: value for key, value in job.items() if key in STATUS_COLUMNS}
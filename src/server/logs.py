@@ -0,0 +1,49 @@
+# src/server/logs.py
+import contextvars
+import json
+import logging
+import sys
+import time
+from typing import Optional
+
+from src.server.tracing import current_trace_id
+
+# Set per HTTP request (and per background job) so every log line of a
+# request can be found by its id
+request_id = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed in extra=
+STANDARD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the fields Cloud Logging understands"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": request_id.get(),
+        }
+        trace_id = current_trace_id()
+        if trace_id is not None:
+            entry["trace_id"] = trace_id
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: Optional[str] = None) -> None:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level or "INFO")
+    # The HTTP client logs every upstream request at INFO; our own lines cover those
+    logging.getLogger("httpx").setLevel(logging.WARNING)
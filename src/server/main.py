@@ -1,185 +1,855 @@
 # src/server/main.py
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError, conint
+import asyncio
+import contextlib
+import importlib.util
+import json
+import logging
+import math
 import os
 import sys
+import tempfile
+import time
+import uuid
 from pathlib import Path
+from typing import Dict, List, Literal, Optional
 
 # Add project root to path
 project_root = Path(__file__).parent.parent.parent
 sys.path.append(str(project_root))
 
-# Try to load environment variables safely
-try:
-    from dotenv import load_dotenv
-    env_file = project_root / ".env"
-    if env_file.exists():
+from src.server.logs import configure_logging, request_id
+
+configure_logging(os.getenv("LOG_LEVEL"))
+log = logging.getLogger(__name__)
+
+# Load a local .env file when there is one; deployments set the environment directly
+env_file = project_root / ".env"
+if env_file.exists():
+    try:
+        from dotenv import load_dotenv
         load_dotenv(env_file)
-except ImportError:
-    print("Warning: dotenv not available, using environment variables directly")
+    except ImportError:
+        log.warning("dotenv not available, using environment variables directly")
 
 
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-    print(" OpenAI library imported successfully")
-except ImportError as e:
-    print(f" OpenAI library import failed: {e}")
-    OPENAI_AVAILABLE = False
-    OpenAI = None
+from src.server.backends import LocalBackend, OpenAIBackend, VertexBackend
+from src.server.cache import SQLiteStore, SummaryCache
+from src.server.cpu import CPUPool
+from src.server.documents import DocumentStore
+from src.server.engine import (
+    DeadlineExceeded, EngineBusy, SummarizationEngine, SummaryResult, UnknownBackend
+)
+from src.server.jobs import JobQueue, JobStore, UnsafeCallback, public_job
+from src.server.metrics import HTTP_REQUESTS, HTTP_SECONDS, REGISTRY, REQUEST_ERRORS, Counter, Gauge
+from src.server.payloads import ECHO_MODES, FastJSONResponse, echo_original, read_json, read_jsonl
+from src.server.preprocess import DEFAULT_BOILERPLATE, Preprocessor, load_patterns
+from src.server.prompts import get_prompt
+from src.server.ratelimit import (
+    MemoryBuckets, RateLimiter, SQLiteBuckets, current_tenant, tenant_from_headers
+)
+from src.server.resilience import CircuitOpen
+from src.server.rouge import score as rouge_score
+from src.server.semantic_cache import SemanticCache
+from src.server.tracing import configure_tracing, span, stage
 
-# Initialize OpenAI client with detailed debugging
+# The OpenAI client is built, and the openai package imported, on first use
+# (or at startup with SUMMARIZE_PREWARM), keeping both off the cold start
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
+if not OPENAI_AVAILABLE:
+    log.warning("OpenAI library not installed")
+# Likewise vertexai (google-cloud-aiplatform), which the API image leaves out
+VERTEX_AVAILABLE = importlib.util.find_spec("vertexai") is not None
 openai_api_key = os.getenv("OPENAI_API_KEY")
-initialization_error = None
 
+# Traces go to an OTLP collector when OTEL_EXPORTER_OTLP_ENDPOINT is set
+configure_tracing()
+
+# With several worker processes (WEB_CONCURRENCY, which uvicorn --workers
+# also reads), the summary cache, rate limits and jobs are kept in SQLite
+# files in one directory, unless a path is configured for them, so every
+# worker sees the same state
+web_concurrency = int(os.getenv("WEB_CONCURRENCY", "1"))
+state_dir = os.getenv("SUMMARIZE_STATE_DIR") or (
+    os.path.join(tempfile.gettempdir(), "summarizer") if web_concurrency > 1 else None
+)
+if state_dir:
+    os.makedirs(state_dir, exist_ok=True)
+
+def shared_path(variable: str, filename: str, default: Optional[str] = None) -> Optional[str]:
+    return os.getenv(variable) or (os.path.join(state_dir, filename) if state_dir else default)
+
+# Summary cache: in-memory LRU, persisted to SQLite when a path is configured
+cache_path = shared_path("SUMMARY_CACHE_PATH", "summaries.db")
+summary_cache = SummaryCache(
+    max_entries=int(os.getenv("SUMMARY_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SUMMARY_CACHE_TTL", "86400")),
+    store=SQLiteStore(cache_path) if cache_path else None,
+)
+
+# Semantic cache: summaries of near-duplicate texts, matched by embedding
+# similarity; off unless a threshold is set, saved to a file when a path is
+semantic_threshold = os.getenv("SEMANTIC_CACHE_THRESHOLD")
+semantic_cache_path = os.getenv("SEMANTIC_CACHE_PATH")
+semantic_cache = None
+if semantic_threshold:
+    semantic_cache = SemanticCache(
+        threshold=float(semantic_threshold),
+        max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("SUMMARY_CACHE_TTL", "86400")),
+        audit_rate=float(os.getenv("SEMANTIC_CACHE_AUDIT_RATE", "0.02")),
+    )
+    if semantic_cache_path:
+        semantic_cache.load(semantic_cache_path)
+
+# Prompt template for the LLM backends: a name (its latest version) or name@version
+prompt = get_prompt(os.getenv("PROMPT_TEMPLATE"))
+
+# Cleanup before the cache and backends: Unicode and whitespace
+# normalization, boilerplate patterns and near-duplicate sentences
+boilerplate_path = os.getenv("SUMMARIZE_BOILERPLATE_FILE")
+dedupe_distance = os.getenv("SUMMARIZE_DEDUPE_DISTANCE", "3")
+preprocessor = None
+if os.getenv("SUMMARIZE_PREPROCESS", "1") != "0":
+    preprocessor = Preprocessor(
+        boilerplate=load_patterns(boilerplate_path) if boilerplate_path else DEFAULT_BOILERPLATE,
+        dedupe_distance=int(dedupe_distance) if dedupe_distance else None,
+    )
+
+# Worker processes for CPU-bound steps on large texts: preprocessing and
+# the local extractive summarizer
+cpu_workers = int(os.getenv("SUMMARIZE_CPU_WORKERS", "0"))
+cpu_pool = None
+if cpu_workers > 0:
+    cpu_pool = CPUPool(
+        cpu_workers, preprocessor, min_chars=int(os.getenv("SUMMARIZE_CPU_MIN_CHARS", "10000"))
+    )
+
+# Summarization backends; the local extractive engine is always available
+backends = {"local": LocalBackend(cpu_pool)}
 if OPENAI_AVAILABLE and openai_api_key:
-    try:
-        client = OpenAI(api_key=openai_api_key)
-        print(f" OpenAI client created with key: {openai_api_key[:15]}...")
-        
-        # Don't test the client during initialization - just create it
-        print(" OpenAI client initialization complete")
-        
-    except Exception as e:
-        print(f" OpenAI client initialization failed: {type(e).__name__}: {e}")
-        initialization_error = str(e)
-        client = None
+    backends["openai"] = OpenAIBackend(
+        model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"), prompt=prompt, api_key=openai_api_key
+    )
+if os.getenv("PROJECT_ID") and not VERTEX_AVAILABLE:
+    log.warning("PROJECT_ID is set but google-cloud-aiplatform is not installed; vertex backend disabled")
+elif os.getenv("PROJECT_ID"):
+    backends["vertex"] = VertexBackend(
+        project=os.getenv("PROJECT_ID"),
+        location=os.getenv("LOCATION", "us-central1"),
+        model=os.getenv("VERTEX_MODEL", "gemini-2.5-flash"),
+        prompt=prompt,
+    )
+
+default_backend = os.getenv("SUMMARIZE_BACKEND") or ("openai" if "openai" in backends else "local")
+if default_backend not in backends:
+    log.warning("Configured backend is not available, using local", extra={"backend": default_backend})
+    default_backend = "local"
+
+def env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+# Provider request/token limits per minute, e.g. OPENAI_RPM and OPENAI_TPM;
+# with RATE_LIMIT_DB_PATH set, all workers on the host share the buckets
+rate_limit_path = shared_path("RATE_LIMIT_DB_PATH", "ratelimits.db")
+rate_limiter = RateLimiter(
+    limits={
+        name: (env_int(f"{name.upper()}_RPM"), env_int(f"{name.upper()}_TPM"))
+        for name, backend in backends.items() if backend.remote
+    },
+    buckets=SQLiteBuckets(rate_limit_path) if rate_limit_path else MemoryBuckets(),
+)
+
+engine = SummarizationEngine(
+    backends=backends,
+    default_backend=default_backend,
+    fallback_backend=os.getenv("SUMMARIZE_FALLBACK_BACKEND", "local") or None,
+    latency_budget=float(os.getenv("SUMMARIZE_LATENCY_BUDGET", "0")) or None,
+    hedge_backend=os.getenv("SUMMARIZE_HEDGE_BACKEND") or None,
+    hedge_quantile=float(os.getenv("SUMMARIZE_HEDGE_QUANTILE", "0.95")),
+    hedge_delay=float(os.getenv("SUMMARIZE_HEDGE_DELAY", "1.0")),
+    max_concurrency=int(os.getenv("SUMMARIZE_MAX_CONCURRENCY", "8")),
+    max_in_flight=int(os.getenv("SUMMARIZE_MAX_IN_FLIGHT", "32")),
+    retry_after=int(os.getenv("SUMMARIZE_RETRY_AFTER", "1")),
+    retry_attempts=int(os.getenv("SUMMARIZE_RETRY_ATTEMPTS", "3")),
+    retry_base_delay=float(os.getenv("SUMMARIZE_RETRY_BASE_DELAY", "0.2")),
+    retry_max_delay=float(os.getenv("SUMMARIZE_RETRY_MAX_DELAY", "5")),
+    breaker_threshold=int(os.getenv("SUMMARIZE_BREAKER_THRESHOLD", "5")),
+    breaker_reset_timeout=float(os.getenv("SUMMARIZE_BREAKER_RESET", "30")),
+    cache=summary_cache,
+    rate_limiter=rate_limiter,
+    chunk_tokens=int(os.getenv("SUMMARIZE_CHUNK_TOKENS", "3000")),
+    chunk_overlap_tokens=int(os.getenv("SUMMARIZE_CHUNK_OVERLAP_TOKENS", "200")),
+    chunk_summary_words=int(os.getenv("SUMMARIZE_CHUNK_SUMMARY_WORDS", "120")),
+    chunk_concurrency=int(os.getenv("SUMMARIZE_CHUNK_CONCURRENCY", "4")),
+    preprocessor=preprocessor,
+    semantic_cache=semantic_cache,
+    cpu_pool=cpu_pool,
+)
+# How much of the input /summarize echoes back unless the request says otherwise,
+# and the largest request body it reads
+echo_default = os.getenv("SUMMARIZE_ECHO_ORIGINAL", "full")
+if echo_default not in ECHO_MODES:
+    raise ValueError(f"SUMMARIZE_ECHO_ORIGINAL must be one of {', '.join(ECHO_MODES)}")
+echo_preview_chars = int(os.getenv("SUMMARIZE_ECHO_PREVIEW_CHARS", "500"))
+max_body_bytes = int(os.getenv("SUMMARIZE_MAX_BODY_BYTES", str(32 * 1024 * 1024)))
+batch_parallelism = int(os.getenv("SUMMARIZE_BATCH_PARALLELISM", "8"))
+batch_max_items = int(os.getenv("SUMMARIZE_BATCH_MAX_ITEMS", "100"))
+# Most lengths one /summarize/multi request may ask for
+max_variants = int(os.getenv("SUMMARIZE_MAX_VARIANTS", "8"))
+
+# Background jobs for large or bulk work, persisted in SQLite
+job_queue = JobQueue(
+    engine,
+    JobStore(shared_path("JOBS_DB_PATH", "jobs.db", ":memory:")),
+    workers=int(os.getenv("JOBS_WORKERS", "2")),
+    callback_timeout=float(os.getenv("JOBS_CALLBACK_TIMEOUT", "10")),
+    callback_hosts={
+        host.strip().lower() for host in os.getenv("JOBS_CALLBACK_HOSTS", "").split(",") if host.strip()
+    } or None,
+)
+
+# Sample document for testing
+SAMPLE_DOC = """Media playback is not supported on this device
+The QPR striker scored on his home debut to boost his hopes of making the squad for the Euro 2016 finals.
+"Conor has strength, power and composure - he looks like he is going to be an asset for us," said O'Neill.
+"It's a great achievement to go unbeaten in 10 games and now we just want to build on it."
+Washington struck his first goal for Northern Ireland before the break, while Roy Carroll kept out Milivoje Novakovic's penalty in the second half."""
+SAMPLE_SUMMARY = "Northern Ireland boss Michael O'Neill praised scorer Conor Washington as a 1-0 win over Slovenia set a new record of 10 games unbeaten."
 
-app = FastAPI(title="AI Summarizer", version="1.0.0")
+# Documents served by index, with their generated summaries. Without a
+# configured path the store starts with just the sample, in the shared state
+# directory when there is one (so every worker serves the same documents)
+# and otherwise in a temporary one
+document_store_path = shared_path("DOCUMENT_STORE_PATH", "documents")
+document_store = DocumentStore(document_store_path or tempfile.mkdtemp(prefix="documents-"))
+if not os.getenv("DOCUMENT_STORE_PATH"):
+    document_store.ingest([{"id": "sample", "document": SAMPLE_DOC, "summary": SAMPLE_SUMMARY}],
+                          only_if_empty=True)
+document_page_size = int(os.getenv("DOCUMENT_PAGE_SIZE_MAX", "100"))
+# Largest single JSON line POST /documents accepts; the body as a whole is
+# bounded by SUMMARIZE_MAX_BODY_BYTES
+document_max_line_bytes = int(os.getenv("DOCUMENT_MAX_LINE_BYTES", str(1024 * 1024)))
+
+# Point-in-time values, read when /metrics is scraped
+Gauge("summarize_in_flight", "Summaries being generated").set_function(lambda: engine.in_flight)
+Gauge("upstream_in_flight", "Upstream calls holding a concurrency slot").set_function(
+    lambda: engine.upstream_in_flight
+)
+Gauge("rate_limit_queue_depth", "Upstream calls waiting for rate limit capacity", ["backend", "tenant"]).set_function(
+    lambda: {
+        (backend, tenant): depth
+        for backend, tenants in rate_limiter.stats()["queued"].items()
+        for tenant, depth in tenants.items()
+    }
+)
+Gauge("circuit_breaker_open", "1 while a backend's circuit breaker is open", ["backend"]).set_function(
+    lambda: {(name,): int(state["state"] == "open") for name, state in engine.stats()["breakers"].items()}
+)
+Gauge("summary_cache_entries", "Summaries held in the in-memory cache").set_function(
+    lambda: summary_cache.stats()["size"]
+)
+# Running totals kept by the caches, exported as counters so rate() works
+Counter("summary_cache_hits_total", "Cache lookups that found a summary").set_function(lambda: summary_cache.hits)
+Counter("summary_cache_misses_total", "Cache lookups that found nothing").set_function(
+    lambda: summary_cache.misses
+)
+if semantic_cache is not None:
+    Gauge("semantic_cache_entries", "Texts held in the semantic cache index").set_function(lambda: len(semantic_cache))
+    Counter("semantic_cache_hits_total", "Semantic lookups that found a similar text").set_function(
+        lambda: semantic_cache.hits
+    )
+    Counter("semantic_cache_misses_total", "Semantic lookups that found nothing similar enough").set_function(
+        lambda: semantic_cache.misses
+    )
+if cpu_pool is not None:
+    Gauge("cpu_pool_in_flight", "Tasks running or waiting in the CPU worker pool").set_function(
+        lambda: cpu_pool.in_flight
+    )
+Gauge("jobs_queued", "Background jobs waiting for a worker").set_function(lambda: job_queue.stats()["queued"])
+
+# Import and build every backend's client at startup instead of on its first
+# request; startup takes longer, but the first request doesn't wait for it
+prewarm = os.getenv("SUMMARIZE_PREWARM", "0") == "1"
+
+async def prewarm_backends() -> Dict[str, float]:
+    """Warm every backend at once, off the event loop; returns seconds per backend"""
+    async def warm(name, backend):
+        start = time.perf_counter()
+        try:
+            await run_in_threadpool(backend.warm)
+        except Exception as e:
+            # The backend's first request will try again, and fall back if it fails
+            log.warning("backend pre-warm failed", extra={"backend": name, "error": type(e).__name__})
+        return name, time.perf_counter() - start
+
+    timings = dict(await asyncio.gather(*(warm(name, b) for name, b in engine.backends.items())))
+    log.info("backends pre-warmed", extra={"seconds": {name: round(t, 3) for name, t in timings.items()}})
+    return timings
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the CPU pool and job workers (pre-warming first when configured);
+    on shutdown stop them and save the semantic cache"""
+    if prewarm:
+        await prewarm_backends()
+    if cpu_pool is not None:
+        await cpu_pool.start()
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    if cpu_pool is not None:
+        cpu_pool.shutdown()
+    if semantic_cache is not None and semantic_cache_path:
+        semantic_cache.save(semantic_cache_path)
+
+app = FastAPI(title="AI Summarizer", version="1.0.0", default_response_class=FastJSONResponse, lifespan=lifespan)
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    """Tag the request with an id and tenant, then log and measure it"""
+    request_id.set(request.headers.get("x-request-id") or uuid.uuid4().hex)
+    # Requests that have to wait for rate limit capacity queue per tenant
+    current_tenant.set(tenant_from_headers(request.headers))
+    start = time.perf_counter()
+    # The span continues the caller's trace when it sends a traceparent header
+    with span(f"{request.method} {request.url.path}", headers=request.headers) as current:
+        response = await call_next(request)
+        # Streaming responses are timed to their first byte
+        seconds = time.perf_counter() - start
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        current.update_name(f"{request.method} {path}")
+        current.set_attributes({
+            "http.method": request.method,
+            "http.route": path,
+            "http.status_code": response.status_code,
+            "request_id": request_id.get(),
+            "tenant": current_tenant.get(),
+        })
+    HTTP_REQUESTS.inc(method=request.method, path=path, status=response.status_code)
+    HTTP_SECONDS.observe(seconds, method=request.method, path=path)
+    log.info("request", extra={
+        "method": request.method,
+        "path": path,
+        "status": response.status_code,
+        "duration_ms": round(seconds * 1000, 2),
+        "tenant": current_tenant.get(),
+    })
+    response.headers["X-Request-Id"] = request_id.get()
+    return response
+
+# Summary lengths are word counts; a bound keeps output budgets sane
+MAX_SUMMARY_WORDS = 2000
+SummaryLength = conint(ge=1, le=MAX_SUMMARY_WORDS)
 
 class SummarizeRequest(BaseModel):
     text: str
-    max_length: int = 150
+    max_length: SummaryLength = 150
+    backend: Optional[str] = None
+    timeout_ms: Optional[int] = None
+    # "full", "truncated" (the first characters) or "none"; hash and length are always returned
+    echo_original: Optional[Literal["full", "truncated", "none"]] = None
 
 class SummarizeResponse(BaseModel):
-    original_text: str
+    original_text: Optional[str] = None
+    original_chars: int = 0
+    original_sha256: Optional[str] = None
+    original_truncated: bool = False
     summary: str
     summary_source: str = "generated"
+    fallback_reason: Optional[str] = None
+    chunks: Optional[int] = None
+    depth: Optional[int] = None
+    stage_latency_ms: Optional[Dict[str, float]] = None
+    prompt_version: Optional[str] = None
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    input_tokens_saved: int = 0
 
-def summarize_text(text: str, max_length: int = 150) -> str:
-    """Use OpenAI to summarize text with fallback to mock"""
-    
-    # Use mock if OpenAI not available
-    if not client or not OPENAI_AVAILABLE:
-        print(f"Using mock response. Client: {bool(client)}, Available: {OPENAI_AVAILABLE}")
-        return f"Mock summary: This text contains {len(text)} characters and discusses various topics. In a real implementation, AI would analyze the content and extract key points to create a meaningful summary of approximately {max_length} words."
-    
-    try:
-        print(f"Attempting OpenAI request for {len(text)} characters...")
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": f"You are a helpful assistant that creates concise summaries. Summarize the following text in {max_length} words or less."
-                },
-                {
-                    "role": "user", 
-                    "content": text
-                }
-            ],
-            max_tokens=max_length * 2,
-            temperature=0.3
-        )
-        
-        result = response.choices[0].message.content.strip()
-        print(f"OpenAI request successful, got {len(result)} characters")
-        return result
-        
-    except Exception as e:
-        print(f" OpenAI API error: {type(e).__name__}: {e}")
-        # Fallback to mock on any error
-        return f"Fallback summary (OpenAI error: {type(e).__name__}): This text contains {len(text)} characters and would normally be summarized to highlight the main points and key information."
+class BatchSummarizeRequest(BaseModel):
+    items: List[SummarizeRequest]
+
+class BatchItemResult(BaseModel):
+    index: int
+    summary: Optional[str] = None
+    summary_source: Optional[str] = None
+    fallback_reason: Optional[str] = None
+    chunks: Optional[int] = None
+    depth: Optional[int] = None
+    prompt_version: Optional[str] = None
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    input_tokens_saved: int = 0
+    error: Optional[str] = None
+    status_code: int = 200
+
+class BatchSummarizeResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+class MultiSummarizeRequest(BaseModel):
+    # Summarized together, as one document
+    texts: List[str]
+    max_lengths: List[SummaryLength] = [150]
+    backend: Optional[str] = None
+    timeout_ms: Optional[int] = None
+
+class SummaryVariant(BaseModel):
+    max_length: int
+    summary: str
+    summary_source: str
+    fallback_reason: Optional[str] = None
+    stage_latency_ms: Optional[Dict[str, float]] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0
+
+class MultiSummarizeResponse(BaseModel):
+    variants: List[SummaryVariant]
+    documents: int
+    original_chars: int
+    chunks: Optional[int] = None
+    depth: Optional[int] = None
+    prompt_version: Optional[str] = None
+    # Totals over all variants
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    input_tokens_saved: int = 0
+
+class JobRequest(BaseModel):
+    text: str
+    max_length: SummaryLength = 150
+    priority: int = 0
+    callback_url: Optional[str] = None
+    backend: Optional[str] = None
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    priority: int
+    max_length: int
+    backend: Optional[str] = None
+    callback_url: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Optional[Dict[str, int]] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    callback_status: Optional[str] = None
+
+async def summarize_text(text: str, max_length: int = 150, backend: Optional[str] = None,
+                         deadline: Optional[float] = None) -> SummaryResult:
+    """Summarize text through the shared async engine"""
+    return await engine.summarize(text, max_length, backend, deadline=deadline)
+
+def request_deadline(*timeouts_ms: Optional[int]) -> Optional[float]:
+    """Absolute deadline from the tightest of the given timeouts, if any"""
+    given = [t for t in timeouts_ms if t is not None]
+    if not given:
+        return None
+    return time.monotonic() + max(0, min(given)) / 1000
+
+
+def busy_response(e: EngineBusy) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def unavailable_response(e: CircuitOpen) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(math.ceil(e.retry_after))}
+    )
+
+def http_error(e: Exception) -> HTTPException:
+    """The HTTP answer for a failed summary, counted by exception type"""
+    REQUEST_ERRORS.inc(type=type(e).__name__)
+    if isinstance(e, EngineBusy):
+        return busy_response(e)
+    if isinstance(e, CircuitOpen):
+        return unavailable_response(e)
+    if isinstance(e, UnknownBackend):
+        return HTTPException(status_code=400, detail=str(e))
+    if isinstance(e, DeadlineExceeded):
+        return HTTPException(status_code=504, detail=str(e))
+    log.error("summarization failed", exc_info=e)
+    return HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+def openai_client_state() -> Dict[str, object]:
+    """Whether the OpenAI client has been built yet, and why building it failed if it did"""
+    backend = engine.backends.get("openai")
+    return {
+        "ready": getattr(backend, "client", None) is not None,
+        "error": getattr(backend, "load_error", None),
+    }
 
 @app.get("/")
 async def health_check():
     """API health check"""
-    ai_status = "openai" if (client and OPENAI_AVAILABLE) else "mock"
+    ai_status = engine.default_backend
     return {
         "message": "Hello, this API is to showcase AI-powered summarization!",
         "ai_status": ai_status,
         "openai_available": OPENAI_AVAILABLE,
         "api_key_configured": bool(openai_api_key),
-        "initialization_error": initialization_error,
+        "initialization_error": openai_client_state()["error"],
         "status": "Ready"
     }
 
 @app.get("/health")
 async def health():
-    ai_mode = "openai" if (client and OPENAI_AVAILABLE) else "mock"
+    ai_mode = engine.default_backend
+    openai_state = openai_client_state()
     return {
-        "status": "healthy", 
+        "status": "degraded" if engine.degraded() else "healthy",
         "ai": ai_mode,
         "openai_library": OPENAI_AVAILABLE,
         "api_key": bool(openai_api_key),
-        "client_ready": bool(client),
-        "init_error": initialization_error
+        "client_ready": openai_state["ready"],
+        "init_error": openai_state["error"],
+        "engine": engine.stats(),
+        "cache": summary_cache.stats(),
+        "documents": document_store.stats(),
+        "jobs": job_queue.stats()
     }
 
 @app.get("/debug")
 async def debug_env():
+    openai_state = openai_client_state()
     return {
         "env_vars": {
             "OPENAI_API_KEY_present": bool(openai_api_key),
             "OPENAI_API_KEY_length": len(openai_api_key) if openai_api_key else 0,
-            "OPENAI_API_KEY_prefix": openai_api_key[:15] if openai_api_key else None,
             "PROJECT_ID": os.getenv("PROJECT_ID"),
             "LOCATION": os.getenv("LOCATION")
         },
         "openai_status": {
             "library_available": OPENAI_AVAILABLE,
-            "client_initialized": bool(client),
-            "initialization_error": initialization_error
+            "client_initialized": openai_state["ready"],
+            "initialization_error": openai_state["error"]
         }
     }
 
-@app.post("/summarize", response_model=SummarizeResponse)
-async def summarize_endpoint(request: SummarizeRequest):
-    """Summarize text using OpenAI or mock"""
-    if not request.text.strip():
-        raise HTTPException(status_code=400, detail="Text cannot be empty")
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def validate_text(text: str):
+    with stage("validation"):
+        # isspace() rather than strip(), which would copy a large text
+        if not text or text.isspace():
+            raise HTTPException(status_code=400, detail="Text cannot be empty")
+        
+        if len(text) < 50:
+            raise HTTPException(status_code=400, detail="Text too short to summarize")
+
+@app.post(
+    "/summarize",
+    response_model=SummarizeResponse,
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": SummarizeRequest.schema()}},
+    }},
+)
+async def summarize_endpoint(http_request: Request, x_request_timeout_ms: Optional[int] = Header(None)):
+    """Summarize text with the requested (or default) backend"""
+    # The body is read and validated here rather than by FastAPI, which
+    # would keep the raw bytes for the whole request and re-encode the
+    # response through its own validation
+    try:
+        request = SummarizeRequest.parse_obj(await read_json(http_request, max_body_bytes))
+    except ValidationError as e:
+        raise RequestValidationError(e.raw_errors)
+    deadline = request_deadline(request.timeout_ms, x_request_timeout_ms)
+    validate_text(request.text)
     
-    if len(request.text) < 50:
-        raise HTTPException(status_code=400, detail="Text too short to summarize")
+    try:
+        result = await summarize_text(request.text, request.max_length, request.backend, deadline)
+    except Exception as e:
+        raise http_error(e)
     
+    with stage("post_processing"):
+        response = SummarizeResponse(
+            **echo_original(request.text, request.echo_original or echo_default, echo_preview_chars),
+            summary=result.summary,
+            summary_source=result.source,
+            fallback_reason=result.fallback_reason,
+            chunks=result.chunks,
+            depth=result.depth,
+            stage_latency_ms=result.stage_latency_ms,
+            prompt_version=result.prompt_version,
+            prompt_tokens=result.prompt_tokens,
+            cached_prompt_tokens=result.cached_prompt_tokens,
+            input_tokens_saved=result.input_tokens_saved
+        )
+        return FastJSONResponse(response.dict())
+
+@app.post("/summarize/batch", response_model=BatchSummarizeResponse)
+async def summarize_batch(request: BatchSummarizeRequest,
+                          x_request_timeout_ms: Optional[int] = Header(None)):
+    """Summarize many texts in one call; each item succeeds or fails on its own"""
+    deadline = request_deadline(x_request_timeout_ms)
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    
+    if len(request.items) > batch_max_items:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {batch_max_items} items")
+    
+    results: List[Optional[BatchItemResult]] = [None] * len(request.items)
+    valid = []
+    for index, item in enumerate(request.items):
+        try:
+            validate_text(item.text)
+            valid.append(index)
+        except HTTPException as e:
+            results[index] = BatchItemResult(index=index, error=e.detail, status_code=e.status_code)
+    
+    outcomes = await engine.summarize_many(
+        [
+            (item.text, item.max_length, item.backend, request_deadline(item.timeout_ms))
+            for item in (request.items[i] for i in valid)
+        ],
+        parallelism=batch_parallelism,
+        deadline=deadline
+    )
+    for index, outcome in zip(valid, outcomes):
+        if isinstance(outcome, Exception):
+            error = http_error(outcome)
+            results[index] = BatchItemResult(index=index, error=error.detail, status_code=error.status_code)
+        else:
+            results[index] = BatchItemResult(
+                index=index,
+                summary=outcome.summary,
+                summary_source=outcome.source,
+                fallback_reason=outcome.fallback_reason,
+                chunks=outcome.chunks,
+                depth=outcome.depth,
+                prompt_version=outcome.prompt_version,
+                prompt_tokens=outcome.prompt_tokens,
+                cached_prompt_tokens=outcome.cached_prompt_tokens,
+                input_tokens_saved=outcome.input_tokens_saved
+            )
+    
+    failed = sum(1 for r in results if r.error is not None)
+    return BatchSummarizeResponse(
+        results=results,
+        succeeded=len(results) - failed,
+        failed=failed
+    )
+
+@app.post("/summarize/multi", response_model=MultiSummarizeResponse)
+async def summarize_multi(request: MultiSummarizeRequest,
+                          x_request_timeout_ms: Optional[int] = Header(None)):
+    """Summarize one or more documents together at one or more lengths, in one pass"""
+    deadline = request_deadline(request.timeout_ms, x_request_timeout_ms)
+    if not request.texts:
+        raise HTTPException(status_code=400, detail="texts cannot be empty")
+    if len(request.texts) > batch_max_items:
+        raise HTTPException(status_code=413, detail=f"texts exceeds {batch_max_items} documents")
+    if not request.max_lengths:
+        raise HTTPException(status_code=400, detail="max_lengths cannot be empty")
+    if len(set(request.max_lengths)) > max_variants:
+        raise HTTPException(status_code=413, detail=f"max_lengths exceeds {max_variants} lengths")
+    for text in request.texts:
+        validate_text(text)
+
     try:
-        summary = summarize_text(request.text, request.max_length)
-        source = "openai" if (client and OPENAI_AVAILABLE) else "mock"
-        
-        return SummarizeResponse(
-            original_text=request.text,
-            summary=summary,
-            summary_source=source
+        results = await engine.summarize_variants(request.texts, request.max_lengths, request.backend, deadline)
+    except Exception as e:
+        raise http_error(e)
+
+    with stage("post_processing"):
+        # Each length once, however often it was asked for, in the order first asked
+        variants = dict(zip(request.max_lengths, results))
+        return MultiSummarizeResponse(
+            variants=[
+                SummaryVariant(
+                    max_length=n,
+                    summary=r.summary,
+                    summary_source=r.source,
+                    fallback_reason=r.fallback_reason,
+                    stage_latency_ms=r.stage_latency_ms or None,
+                    prompt_tokens=r.prompt_tokens,
+                    completion_tokens=r.completion_tokens,
+                    cached_prompt_tokens=r.cached_prompt_tokens
+                )
+                for n, r in variants.items()
+            ],
+            documents=len(request.texts),
+            original_chars=sum(len(text) for text in request.texts),
+            chunks=max(r.chunks for r in results),
+            depth=max(r.depth for r in results),
+            prompt_version=results[0].prompt_version,
+            prompt_tokens=sum(r.prompt_tokens for r in variants.values()),
+            completion_tokens=sum(r.completion_tokens for r in variants.values()),
+            cached_prompt_tokens=sum(r.cached_prompt_tokens for r in variants.values()),
+            input_tokens_saved=results[0].input_tokens_saved
         )
-    except HTTPException:
-        raise
+
+def sse_event(event: dict) -> str:
+    name = event.pop("event")
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+@app.post("/summarize/stream")
+async def summarize_stream(request: SummarizeRequest,
+                           x_request_timeout_ms: Optional[int] = Header(None)):
+    """Stream the summary as Server-Sent Events: token events, then a done event"""
+    deadline = request_deadline(request.timeout_ms, x_request_timeout_ms)
+    validate_text(request.text)
+    
+    events = engine.stream(request.text, request.max_length, request.backend, deadline)
+    try:
+        # The first event is emitted once the request is preprocessed and
+        # admitted, so anything failing until then is an ordinary HTTP error
+        await events.__anext__()
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        raise http_error(e)
+    
+    async def body():
+        try:
+            async for event in events:
+                yield sse_event(event)
+        except Exception as e:
+            # The 200 is already sent: report the failure in the stream instead
+            error = http_error(e)
+            yield sse_event({"event": "error", "status_code": error.status_code, "detail": error.detail})
+    
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-# Sample document for testing
-SAMPLE_DOC = """Media playback is not supported on this device
-The QPR striker scored on his home debut to boost his hopes of making the squad for the Euro 2016 finals.
-"Conor has strength, power and composure - he looks like he is going to be an asset for us," said O'Neill.
-"It's a great achievement to go unbeaten in 10 games and now we just want to build on it."
-Washington struck his first goal for Northern Ireland before the break, while Roy Carroll kept out Milivoje Novakovic's penalty in the second half."""
+@app.post("/jobs", response_model=JobResponse, status_code=202)
+async def create_job(request: JobRequest):
+    """Queue a summarization job and return its id immediately"""
+    validate_text(request.text)
+    try:
+        engine.backend(request.backend)
+    except UnknownBackend as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        job = job_queue.submit(
+            request.text,
+            max_length=request.max_length,
+            priority=request.priority,
+            callback_url=request.callback_url,
+            backend=request.backend
+        )
+    except UnsafeCallback as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return public_job(job)
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Job status, progress and, once finished, its result"""
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return public_job(job)
+
+@app.post("/documents", status_code=201)
+async def ingest_documents(request: Request):
+    """Bulk-load documents from a JSONL body of {"document", "summary"?, "id"?} lines"""
+    added = 0
+    batch = []
+    try:
+        async for record in read_jsonl(request, max_body_bytes, document_max_line_bytes):
+            batch.append(record)
+            if len(batch) >= 1000:
+                added += await run_in_threadpool(document_store.ingest, batch)
+                batch = []
+        added += await run_in_threadpool(document_store.ingest, batch)
+    except (ValueError, KeyError, TypeError) as e:
+        # Whole batches before the bad line are kept
+        raise HTTPException(status_code=400, detail=f"Invalid document after {added} added: {e}")
+    return {"added": added, "total": len(document_store)}
+
+@app.get("/documents")
+async def list_documents(offset: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=document_page_size)):
+    """Page through the stored documents; indexes start at 1"""
+    documents = document_store.documents(offset, limit)
+    return {
+        "total": len(document_store),
+        "offset": offset,
+        "limit": limit,
+        "items": [
+            {
+                "index": d.index + 1,
+                "id": d.id,
+                "chars": len(d.document),
+                "preview": d.document[:200],
+                "ground_truth_summary": d.summary,
+            }
+            for d in documents
+        ],
+    }
+
+@app.get("/documents/summaries")
+async def list_summaries(offset: int = Query(0, ge=0), limit: int = Query(20, ge=1, le=document_page_size)):
+    """Page through the summaries generated for stored documents"""
+    items = [
+        {"index": summary.pop("document") + 1, **summary}
+        for summary in document_store.summaries(offset, limit)
+    ]
+    return {"total": document_store.summary_count(), "offset": offset, "limit": limit, "items": items}
 
 @app.get("/summarize/{index}")
-async def summarize_by_index(index: int):
-    """Get summary of sample document by index"""
-    if index != 1:
+async def summarize_by_index(index: int, max_length: int = Query(150, ge=1, le=MAX_SUMMARY_WORDS),
+                             backend: Optional[str] = None, refresh: bool = False,
+                             x_request_timeout_ms: Optional[int] = Header(None)):
+    """Summary of a stored document by index (from 1), generated once and then served from the store"""
+    document = await run_in_threadpool(document_store.get, index - 1)
+    if document is None:
         raise HTTPException(status_code=404, detail="Document not found")
-    
-    summary = summarize_text(SAMPLE_DOC)
-    source = "openai" if (client and OPENAI_AVAILABLE) else "mock"
-    
+    try:
+        chosen = engine.backend(backend)
+    except UnknownBackend as e:
+        raise http_error(e)
+    # Keyed like engine.cache_key, so a new prompt template version is a miss
+    model, prompt_version = chosen.model_id, chosen.prompt_version or ""
+
+    stored = None if refresh else document_store.summary(document.index, max_length, model, prompt_version)
+    if stored is not None:
+        summary, source = stored["summary"], "store"
+    else:
+        try:
+            result = await summarize_text(document.document, max_length, backend,
+                                          deadline=request_deadline(x_request_timeout_ms))
+        except Exception as e:
+            raise http_error(e)
+        summary, source = result.summary, result.source
+        # A fallback summary stands in for this request only
+        if source != "fallback":
+            await run_in_threadpool(document_store.save_summary, document.index, max_length, model,
+                                    prompt_version, summary, source)
+
     return {
-        "document": SAMPLE_DOC,
+        "index": index,
+        "id": document.id,
+        "document": document.document,
         "generated_summary": summary,
-        "ground_truth_summary": "Northern Ireland boss Michael O'Neill praised scorer Conor Washington as a 1-0 win over Slovenia set a new record of 10 games unbeaten.",
+        "ground_truth_summary": document.summary,
+        "rouge": rouge_score(summary, document.summary) if document.summary else None,
         "summary_source": source
     }
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)  
+    # An import string, which uvicorn needs to start several workers
+    uvicorn.run("src.server.main:app", host="0.0.0.0", port=8000, workers=web_concurrency)
      
\ No newline at end of file
@@ -0,0 +1,168 @@
+# src/server/metrics.py
+import bisect
+import contextlib
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Upstream calls run from milliseconds to a minute, so the default buckets
+# are stretched at the top end
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+LabelValues = Tuple[str, ...]
+
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), registry=None):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def key(self, labels: dict) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+def read_function(values: Dict[LabelValues, float], function: Optional[Callable]) -> Dict[LabelValues, float]:
+    """values plus what function returns: a number, or for labelled metrics a
+    {label values: number} dict"""
+    values = dict(values)
+    if function is not None:
+        current = function()
+        values.update(current if isinstance(current, dict) else {(): current})
+    return values
+
+
+class Counter(Metric):
+    """A count that only goes up: incremented here, or read at scrape time
+    from a total kept elsewhere (which resets only when the process does)"""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[LabelValues, float] = defaultdict(float)
+        self._function: Optional[Callable] = None
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        self.values[self.key(labels)] += amount
+
+    def set_function(self, function: Callable) -> None:
+        self._function = function
+
+    def samples(self) -> List[str]:
+        values = read_function(self.values, self._function)
+        return [f"{self.name}{format_labels(self.labels, k)} {float(v):g}" for k, v in sorted(values.items())]
+
+
+class Gauge(Metric):
+    """A value set directly, or read from a function at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable] = None
+
+    def set(self, value: float, **labels) -> None:
+        self.values[self.key(labels)] = value
+
+    def set_function(self, function: Callable) -> None:
+        """function returns a number, or for labelled gauges a {label values: number} dict"""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        values = read_function(self.values, self._function)
+        return [f"{self.name}{format_labels(self.labels, k)} {float(v):g}" for k, v in sorted(values.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        self.counts: Dict[LabelValues, List[int]] = {}
+        self.sums: Dict[LabelValues, float] = defaultdict(float)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self.key(labels)
+        if key not in self.counts:
+            self.counts[key] = [0] * (len(self.buckets) + 1)
+        # Counted in the first bucket it fits; made cumulative when rendered
+        self.counts[key][bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[key] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, counts in sorted(self.counts.items()):
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                total += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket = format_labels(self.labels, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket} {total}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {self.sums[key]:g}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {total}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = Histogram(
+    "summarize_stage_seconds",
+    "Time spent per stage: validation, cache_lookup, queue_wait, upstream, map, reduce, post_processing",
+    ["stage"],
+)
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ["method", "path", "status"])
+HTTP_SECONDS = Histogram("http_request_seconds", "HTTP request latency by route", ["method", "path"])
+SUMMARIES = Counter("summaries_total", "Summaries returned, by where the answer came from", ["source"])
+UPSTREAM_TOKENS = Counter("upstream_tokens_total", "Tokens reported by upstream backends", ["backend", "kind"])
+PROMPT_TOKENS = Counter(
+    "prompt_tokens_total", "Prompt tokens by template version and whether the provider's prompt cache served them",
+    ["backend", "template", "cache"]
+)
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed upstream calls by exception type", ["backend", "type"])
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Upstream calls retried after a transient error", ["backend"])
+REQUEST_ERRORS = Counter("summarize_errors_total", "Requests that failed, by exception type", ["type"])
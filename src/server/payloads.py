@@ -0,0 +1,104 @@
+# src/server/payloads.py
+import hashlib
+import json
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+
+# orjson serializes several times faster than the json module; optional
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    FastJSONResponse = JSONResponse
+    ORJSON_AVAILABLE = False
+
+# How much of the original a response echoes back
+ECHO_FULL = "full"
+ECHO_TRUNCATED = "truncated"
+ECHO_NONE = "none"
+ECHO_MODES = (ECHO_FULL, ECHO_TRUNCATED, ECHO_NONE)
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+async def read_json(request: Request, max_bytes: int) -> dict:
+    """Parse a JSON body read chunk by chunk, refusing it as soon as it passes max_bytes.
+
+    Only the raw buffer and the parsed result exist at once, and the buffer
+    is dropped on return; Starlette's request.json() would keep the bytes
+    cached on the request for its whole lifetime.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+    try:
+        payload = loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON object")
+    return payload
+
+
+async def read_jsonl(request: Request, max_bytes: int, max_line_bytes: int) -> AsyncIterator[dict]:
+    """Yield the objects of a JSON lines body as it arrives, without holding all of it.
+
+    The body is refused (413) past max_bytes and so is any line past
+    max_line_bytes, so input without newlines can't grow the buffer
+    unbounded. A line that isn't valid JSON, or isn't an object, raises
+    ValueError for the caller to report with its own context.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+    received = 0
+    pending = b""
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            if len(line) > max_line_bytes:
+                raise HTTPException(status_code=413, detail=f"A line exceeds {max_line_bytes} bytes")
+            if line.strip():
+                yield _record(line)
+        if len(pending) > max_line_bytes:
+            raise HTTPException(status_code=413, detail=f"A line exceeds {max_line_bytes} bytes")
+    if pending.strip():
+        yield _record(pending)
+
+
+def _record(line: bytes) -> dict:
+    record = loads(line)
+    if not isinstance(record, dict):
+        raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+    return record
+
+
+def echo_original(text: str, mode: str, preview_chars: int) -> dict:
+    """The original_* response fields: the text itself, its start, or neither,
+    always with its length and hash so clients can match it up"""
+    if mode == ECHO_FULL:
+        echoed: Optional[str] = text
+    elif mode == ECHO_TRUNCATED:
+        echoed = text[:preview_chars]
+    else:
+        echoed = None
+    return {
+        "original_text": echoed,
+        "original_chars": len(text),
+        "original_sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "original_truncated": echoed is not None and len(echoed) < len(text),
+    }
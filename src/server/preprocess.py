@@ -0,0 +1,253 @@
+# src/server/preprocess.py
+import hashlib
+import re
+import threading
+import unicodedata
+from itertools import chain
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.server.chunking import SENTENCE, estimate_tokens
+from src.server.metrics import Counter
+
+PREPROCESS_TOKENS_SAVED = Counter(
+    "preprocess_tokens_saved_total", "Estimated input tokens removed before summarizing, by step", ["step"]
+)
+
+# Page furniture that scraped articles carry; matched case-insensitively,
+# starting at a word boundary
+DEFAULT_BOILERPLATE = (
+    r"Media\s+playback\s+is\s+(?:not\s+supported|unsupported)\s+on\s+(?:this|your)\s+device",
+    r"Share\s+this\s+with\s+(?:Email|Facebook|Messenger|Twitter|Pinterest|WhatsApp|LinkedIn)",
+    r"Copy\s+this\s+link",
+    r"(?:Skip|End\s+of)\s+(?:Twitter|Facebook|Instagram|YouTube)\s+post(?:\s+\d+)?(?:\s+by\s+@?\w+)?",
+)
+INVISIBLE = re.compile("[\u00ad\u200b\u200c\u200d\u2060\ufeff]")
+PARAGRAPH = re.compile(r"\n\s*\n")
+# Whitespace other than a lone space, which is left alone
+SPACING = re.compile(r"\s{2,}|[^\S ]")
+TOKEN = re.compile(r"\w+")
+# Tokens fingerprinted at a time, bounding the token lists and bit matrix
+# held at once to a few MB
+FINGERPRINT_BATCH = 1 << 14
+# Bit counts are summed in 16-bit lanes; longer sentences are not deduped
+MAX_SENTENCE_TOKENS = 0xFFFF
+
+
+class Preprocessed(NamedTuple):
+    text: str
+    original_tokens: int
+    tokens: int
+    # Estimated tokens each step removed
+    saved: Dict[str, int]
+    duplicates: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+def load_patterns(path: str) -> List[str]:
+    """One regular expression per line; blank lines and # comments are skipped"""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def token_hash(token: str) -> int:
+    # Stable across processes, unlike hash(), so every worker drops the same
+    # sentences and computes the same cache key
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class TokenHashes(dict):
+    """Memoized token_hash"""
+
+    def __missing__(self, token: str) -> int:
+        value = self[token] = token_hash(token)
+        return value
+
+
+def simhashes(sentences: Sequence[List[str]], hashes: TokenHashes) -> np.ndarray:
+    """64-bit SimHash of each token list: bit i is set when most of its
+    tokens' hashes have bit i set"""
+    lengths = np.fromiter(map(len, sentences), dtype=np.int64, count=len(sentences))
+    ids = np.fromiter(map(hashes.__getitem__, chain.from_iterable(sentences)), dtype=np.uint64,
+                      count=int(lengths.sum()))
+    bits = np.unpackbits(ids.view(np.uint8)).reshape(len(ids), 64)
+    # Four 16-bit counters per uint64, so the sum runs over 16 columns instead of 64
+    lanes = bits.astype(np.uint16).view(np.uint64)
+    ones = np.add.reduceat(lanes, np.concatenate(([0], np.cumsum(lengths)[:-1])), axis=0).view(np.uint16)
+    return np.packbits(2 * ones > lengths[:, None], axis=1).view(np.uint64).ravel()
+
+
+class NearDuplicates:
+    """Fingerprints seen so far, found by exact match on any of distance + 1
+    bands: two fingerprints within that Hamming distance must agree on at
+    least one band, so each lookup checks a handful of candidates instead of
+    every earlier sentence"""
+
+    def __init__(self, distance: int):
+        self.distance = distance
+        width = 64 // (distance + 1)
+        self.shifts = np.arange(0, width * (distance + 1), width, dtype=np.uint64)
+        self.mask = np.uint64((1 << width) - 1)
+        self.bands: List[Dict[int, Union[int, List[int]]]] = [{} for _ in self.shifts]
+
+    def add(self, fingerprints: np.ndarray) -> List[bool]:
+        """For each fingerprint in order, whether a near-duplicate came before
+        it; those that are new are added"""
+        values = ((fingerprints[:, None] >> self.shifts) & self.mask).tolist()
+        duplicate = []
+        for fingerprint, keys in zip(fingerprints.tolist(), values):
+            found = False
+            for band, key in zip(self.bands, keys):
+                others = band.get(key)
+                if others is None:
+                    continue
+                # Most keys hold a single fingerprint, kept without a list
+                for other in ((others,) if type(others) is int else others):
+                    if bin(fingerprint ^ other).count("1") <= self.distance:
+                        found = True
+                        break
+                if found:
+                    break
+            if not found:
+                for band, key in zip(self.bands, keys):
+                    others = band.get(key)
+                    if others is None:
+                        band[key] = fingerprint
+                    elif type(others) is int:
+                        band[key] = [others, fingerprint]
+                    else:
+                        others.append(fingerprint)
+            duplicate.append(found)
+        return duplicate
+
+
+class Preprocessor:
+    """Cheap cleanup before text is sent to a model, in one pass per step.
+
+    Unicode is NFKC-normalized and invisible characters dropped, boilerplate
+    patterns removed, whitespace collapsed (keeping paragraph breaks), and
+    sentences whose SimHash is within dedupe_distance bits of an earlier
+    sentence's dropped. Sentences under min_words are never dropped: their
+    fingerprints are too coarse to compare. dedupe_distance None skips the
+    dedupe step; the default 3 is the usual setting for 64-bit SimHash and
+    catches duplicates up to case, punctuation and spacing, and small edits
+    to longer sentences. Larger distances need narrower bands, which match
+    more unrelated fingerprints, so they are capped at 7.
+    """
+
+    def __init__(self, boilerplate: Sequence[str] = DEFAULT_BOILERPLATE,
+                 dedupe_distance: Optional[int] = 3, min_words: int = 5):
+        self.boilerplate = None
+        if boilerplate:
+            # Anchoring at word boundaries lets the scan skip most positions quickly
+            self.boilerplate = re.compile(r"\b(?:" + "|".join(f"(?:{p})" for p in boilerplate) + ")", re.I)
+        if dedupe_distance is not None and not 0 <= dedupe_distance <= 7:
+            raise ValueError("dedupe_distance must be between 0 and 7")
+        self.dedupe_distance = dedupe_distance
+        self.min_words = min_words
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.tokens_saved = 0
+        self.duplicates = 0
+
+    def __getstate__(self) -> dict:
+        # Pickled to run clean() in other processes; counters stay with the original
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state, _lock=threading.Lock())
+
+    def process(self, text: str) -> Preprocessed:
+        return self.record(self.clean(text))
+
+    def clean(self, text: str) -> Preprocessed:
+        """The cleaned text and what each step saved, without counting it in stats()"""
+        original_tokens = estimate_tokens(text)
+        # Both return text itself when there is nothing to change
+        cleaned = INVISIBLE.sub("", unicodedata.normalize("NFKC", text))
+        unicode_tokens = estimate_tokens(cleaned)
+        if self.boilerplate is not None:
+            cleaned = self.boilerplate.sub(" ", cleaned)
+        boilerplate_tokens = estimate_tokens(cleaned)
+        paragraphs = [p for p in (SPACING.sub(" ", p).strip() for p in PARAGRAPH.split(cleaned)) if p]
+        normalized_tokens = estimate_tokens("\n\n".join(paragraphs))
+
+        duplicates = 0
+        if self.dedupe_distance is not None:
+            paragraphs, duplicates = self._dedupe(paragraphs)
+        result = "\n\n".join(paragraphs)
+        if not result:
+            # Everything matched a pattern; summarize what was sent instead of nothing
+            result = " ".join(text.split())
+        saved = {
+            "normalize": original_tokens - unicode_tokens + boilerplate_tokens - normalized_tokens,
+            "boilerplate": unicode_tokens - boilerplate_tokens,
+            "duplicates": normalized_tokens - estimate_tokens(result),
+        } if paragraphs else {}
+
+        return Preprocessed(result, original_tokens, estimate_tokens(result), saved, duplicates)
+
+    def record(self, outcome: Preprocessed) -> Preprocessed:
+        """Count a clean() outcome in the metrics and stats()"""
+        for step, tokens in outcome.saved.items():
+            if tokens > 0:
+                PREPROCESS_TOKENS_SAVED.inc(tokens, step=step)
+        with self._lock:
+            self.processed += 1
+            self.tokens_saved += outcome.tokens_saved
+            self.duplicates += outcome.duplicates
+        return outcome
+
+    def _dedupe(self, paragraphs: List[str]) -> Tuple[List[str], int]:
+        seen = NearDuplicates(self.dedupe_distance)
+        hashes = TokenHashes()
+        sentences = [[m.group().strip() for m in SENTENCE.finditer(paragraph)] for paragraph in paragraphs]
+        dropped = set()
+        # Fingerprinted a batch at a time, in order, so token lists never
+        # exist for the whole text at once
+        positions: List[Tuple[int, int]] = []
+        batch: List[List[str]] = []
+        size = 0
+
+        def flush():
+            for position, duplicate in zip(positions, seen.add(simhashes(batch, hashes))):
+                if duplicate:
+                    dropped.add(position)
+            positions.clear()
+            batch.clear()
+
+        for p, paragraph in enumerate(sentences):
+            for s, sentence in enumerate(paragraph):
+                tokens = TOKEN.findall(sentence.lower())
+                if not self.min_words <= len(tokens) <= MAX_SENTENCE_TOKENS:
+                    continue
+                positions.append((p, s))
+                batch.append(tokens)
+                size += len(tokens)
+                if size >= FINGERPRINT_BATCH:
+                    flush()
+                    size = 0
+        if batch:
+            flush()
+        if not dropped:
+            return paragraphs, 0
+        kept = [
+            " ".join(sentence for s, sentence in enumerate(paragraph) if (p, s) not in dropped)
+            for p, paragraph in enumerate(sentences)
+        ]
+        return [k for k in kept if k], len(dropped)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "processed": self.processed,
+                "tokens_saved": self.tokens_saved,
+                "duplicate_sentences": self.duplicates,
+                "dedupe_distance": self.dedupe_distance,
+            }
@@ -0,0 +1,102 @@
+# src/server/prompts.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+LENGTH = "{max_length}"
+# Shortest prefix OpenAI (and Gemini implicit caching) will serve from cache
+MIN_CACHED_PREFIX_TOKENS = 1024
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A versioned summarization prompt.
+
+    system is the same for every request and always comes first; only
+    instruction (which names the length) and the text itself change between
+    requests. Providers cache a repeated prefix only from
+    MIN_CACHED_PREFIX_TOKENS up, so a short system message just keeps the
+    ordering stable: it saves nothing until a template's system text (rules,
+    examples) is that long. instruction is split around its placeholder
+    once, so rendering is one concatenation.
+    """
+
+    name: str
+    version: int
+    system: str
+    instruction: str
+    _parts: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.instruction.count(LENGTH) != 1:
+            raise ValueError(f"instruction must contain {LENGTH} exactly once")
+        object.__setattr__(self, "_parts", tuple(self.instruction.split(LENGTH)))
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def render_instruction(self, max_length: int) -> str:
+        before, after = self._parts
+        return f"{before}{max_length}{after}"
+
+    def messages(self, text: str, max_length: int) -> List[dict]:
+        """Chat messages, static prefix first"""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": f"{self.render_instruction(max_length)}\n\n{text}"},
+        ]
+
+    def prompt(self, text: str, max_length: int) -> str:
+        """The same, as one string for completion-style APIs"""
+        return f"{self.system}\n\n{self.render_instruction(max_length)}\n\n{text}"
+
+    def overhead(self, max_length: int) -> str:
+        """Everything but the text, for token estimates"""
+        return f"{self.system}\n\n{self.render_instruction(max_length)}"
+
+
+class PromptRegistry:
+    """Templates by name and version; a name without a version means its latest"""
+
+    def __init__(self):
+        self._templates: Dict[str, Dict[int, PromptTemplate]] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        versions = self._templates.setdefault(template.name, {})
+        if template.version in versions:
+            raise ValueError(f"{template.id} is already registered")
+        versions[template.version] = template
+        return template
+
+    def get(self, spec: str) -> PromptTemplate:
+        """Look up "name" or "name@version" """
+        name, _, version = spec.partition("@")
+        versions = self._templates.get(name)
+        if not versions:
+            raise KeyError(f"Unknown prompt template {name!r}")
+        if not version:
+            return versions[max(versions)]
+        if int(version) not in versions:
+            raise KeyError(f"Unknown prompt template version {spec!r}")
+        return versions[int(version)]
+
+    def ids(self) -> List[str]:
+        return [t.id for versions in self._templates.values() for t in versions.values()]
+
+
+PROMPTS = PromptRegistry()
+
+# A change to a template's wording is a new version, never an edit in place:
+# cached summaries are keyed by the version that produced them
+PROMPTS.register(PromptTemplate(
+    name="summary",
+    version=1,
+    system="You are a helpful assistant that creates concise summaries.",
+    instruction="Summarize the following text in {max_length} words or less.",
+))
+
+DEFAULT_PROMPT = "summary"
+
+
+def get_prompt(spec: Optional[str]) -> PromptTemplate:
+    return PROMPTS.get(spec or DEFAULT_PROMPT)
@@ -0,0 +1,253 @@
+# src/server/ratelimit.py
+import asyncio
+import contextlib
+import contextvars
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+from src.server.metrics import Histogram
+
+RATE_LIMIT_WAIT = Histogram(
+    "rate_limit_wait_seconds", "Time upstream calls queued for rate limit capacity", ["backend"]
+)
+
+# Who the current request is for; set per request by the API and read when
+# an upstream call has to queue for rate limit capacity
+current_tenant = contextvars.ContextVar("current_tenant", default="anonymous")
+
+# name -> (amount to take, bucket capacity, refill per second)
+Costs = Dict[str, Tuple[float, float, float]]
+
+
+def tenant_from_headers(headers) -> str:
+    """The X-Tenant-Id header, else a fingerprint of X-API-Key, else anonymous"""
+    if headers.get("x-tenant-id"):
+        return headers["x-tenant-id"]
+    if headers.get("x-api-key"):
+        return "key:" + hashlib.sha256(headers["x-api-key"].encode()).hexdigest()[:12]
+    return "anonymous"
+
+
+class TokenBuckets:
+    """Token buckets that refill continuously; subclasses decide where levels live"""
+
+    # Whether take and adjust can block (on I/O or another process's lock),
+    # so the rate limiter runs them off the event loop
+    blocking = False
+
+    def _transaction(self) -> contextlib.AbstractContextManager:
+        raise NotImplementedError
+
+    def take(self, costs: Costs) -> float:
+        """Take every cost at once, or nothing; returns 0 or the seconds until all would fit"""
+        now = time.time()
+        with self._transaction() as levels:
+            current = {}
+            wait = 0.0
+            for name, (amount, capacity, rate) in costs.items():
+                tokens, updated = levels.get(name, (capacity, now))
+                current[name] = min(capacity, tokens + (now - updated) * rate)
+                if current[name] < amount:
+                    wait = max(wait, (amount - current[name]) / rate)
+            if wait == 0:
+                for name, (amount, _, _) in costs.items():
+                    levels[name] = (current[name] - amount, now)
+        return wait
+
+    def adjust(self, name: str, delta: float, capacity: float, rate: float) -> None:
+        """Give back (or, if negative, take more of) a bucket's tokens"""
+        now = time.time()
+        with self._transaction() as levels:
+            tokens, updated = levels.get(name, (capacity, now))
+            levels[name] = (min(capacity, tokens + (now - updated) * rate + delta), now)
+
+
+class MemoryBuckets(TokenBuckets):
+    """Buckets for a single process"""
+
+    def __init__(self):
+        self._levels: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[dict]:
+        with self._lock:
+            yield self._levels
+
+
+class SQLiteBuckets(TokenBuckets):
+    """Buckets in a SQLite file, so every uvicorn worker draws from the same limits"""
+
+    blocking = True
+
+    def __init__(self, path: str, timeout: float = 1.0):
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=timeout)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[dict]:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                levels = {
+                    name: (tokens, updated)
+                    for name, tokens, updated in self._conn.execute("SELECT name, tokens, updated FROM buckets")
+                }
+                before = dict(levels)
+                yield levels
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    [(name, *level) for name, level in levels.items() if before.get(name) != level],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def take(self, costs: Costs) -> float:
+        try:
+            return super().take(costs)
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            # Other workers kept the buckets busy past the timeout: not admitted yet
+            return self.timeout
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class RateLimiter:
+    """Requests/minute and tokens/minute limits per backend.
+
+    A call that doesn't fit waits instead of failing. Waiting calls are
+    queued per tenant and served round-robin, so one tenant's burst can't
+    starve everyone else.
+    """
+
+    def __init__(self, limits: Dict[str, Tuple[Optional[int], Optional[int]]],
+                 buckets: Optional[TokenBuckets] = None, poll_interval: float = 0.05):
+        # backend -> (requests per minute, tokens per minute); None is unlimited
+        self.limits = limits
+        self.buckets = buckets or MemoryBuckets()
+        self.poll_interval = poll_interval
+        self._queues: Dict[str, "OrderedDict[str, Deque[Tuple[Costs, asyncio.Future]]]"] = {}
+        self._dispatchers: Dict[str, asyncio.Task] = {}
+        self.admitted = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def costs(self, backend: str, tokens: int) -> Costs:
+        rpm, tpm = self.limits.get(backend, (None, None))
+        costs = {}
+        if rpm:
+            costs[f"{backend}:requests"] = (1, rpm, rpm / 60)
+        if tpm:
+            # A request bigger than the whole bucket would otherwise never fit
+            costs[f"{backend}:tokens"] = (min(tokens, tpm), tpm, tpm / 60)
+        return costs
+
+    async def acquire(self, backend: str, tokens: int, tenant: Optional[str] = None) -> float:
+        """Wait until the backend has room for a call of this many tokens; returns seconds waited"""
+        costs = self.costs(backend, tokens)
+        if not costs:
+            return 0.0
+        self.admitted += 1
+
+        queues = self._queues.setdefault(backend, OrderedDict())
+        # Skip the queue only when nobody is in it, so waiting tenants keep their turn
+        if not queues and await self._take(costs) == 0:
+            RATE_LIMIT_WAIT.observe(0, backend=backend)
+            return 0.0
+
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        queues.setdefault(tenant or current_tenant.get(), deque()).append((costs, future))
+        if backend not in self._dispatchers:
+            self._dispatchers[backend] = asyncio.ensure_future(self._dispatch(backend))
+        await future
+
+        waited = time.perf_counter() - start
+        RATE_LIMIT_WAIT.observe(waited, backend=backend)
+        self.waited += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    async def settle(self, backend: str, reserved: int, used: int) -> None:
+        """Correct the token bucket once a call reports what it actually used"""
+        _, tpm = self.limits.get(backend, (None, None))
+        if tpm and used:
+            args = (f"{backend}:tokens", min(reserved, tpm) - used, tpm, tpm / 60)
+            if self.buckets.blocking:
+                await asyncio.to_thread(self.buckets.adjust, *args)
+            else:
+                self.buckets.adjust(*args)
+
+    async def _take(self, costs: Costs) -> float:
+        # A shared file can be locked by another worker; wait for it on a thread
+        if self.buckets.blocking:
+            return await asyncio.to_thread(self.buckets.take, costs)
+        return self.buckets.take(costs)
+
+    async def _dispatch(self, backend: str) -> None:
+        queues = self._queues[backend]
+        try:
+            while queues:
+                tenant, waiting = next(iter(queues.items()))
+                costs, future = waiting[0]
+                if not future.done():
+                    wait = await self._take(costs)
+                    if wait > 0:
+                        # Other workers share the buckets and refunds land early,
+                        # so check back regularly rather than sleeping it all off
+                        await asyncio.sleep(min(wait, self.poll_interval))
+                        continue
+                    future.set_result(None)
+                # Served (or gave up waiting): the tenant goes to the back of the line
+                waiting.popleft()
+                del queues[tenant]
+                if waiting:
+                    queues[tenant] = waiting
+        except Exception as e:
+            for waiting in queues.values():
+                for _, future in waiting:
+                    if not future.done():
+                        future.set_exception(e)
+            queues.clear()
+        finally:
+            del self._dispatchers[backend]
+
+    def stats(self) -> dict:
+        queued = {
+            backend: {tenant: len(waiting) for tenant, waiting in queues.items()}
+            for backend, queues in self._queues.items() if queues
+        }
+        return {
+            "limits": {
+                backend: {"requests_per_minute": rpm, "tokens_per_minute": tpm}
+                for backend, (rpm, tpm) in self.limits.items()
+            },
+            "shared": isinstance(self.buckets, SQLiteBuckets),
+            "queue_depth": sum(sum(t.values()) for t in queued.values()),
+            "queued": queued,
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "wait_seconds_total": round(self.wait_seconds, 3),
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+        }
@@ -0,0 +1,133 @@
+# src/server/resilience.py
+import random
+import sys
+import time
+from typing import Optional
+
+# Rate limits, timeouts and server-side failures are worth another attempt;
+# anything else (bad request, auth, not found) will fail the same way again
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a backend whose breaker is open"""
+
+    def __init__(self, backend: str, retry_after: float):
+        super().__init__(f"Circuit for '{backend}' is open, retry in {retry_after:.1f}s")
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """HTTP status of an upstream error: OpenAI errors carry status_code, Google ones code"""
+    for attribute in ("status_code", "code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_connection_error(error: Exception) -> bool:
+    if isinstance(error, ConnectionError):
+        return True
+    # An openai error can only exist once openai has been imported, so this
+    # module never imports it (it takes most of a second)
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(error, openai.APIConnectionError)
+
+
+def is_retryable(error: Exception) -> bool:
+    if is_connection_error(error):
+        return True
+    return status_code(error) in RETRYABLE_STATUS
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the upstream asked us to wait, from its Retry-After header"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        # Missing, or an HTTP date, which the APIs we call don't send
+        return None
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter"""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.2, max_delay: float = 5.0,
+                 seed: Optional[int] = None):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.random = random.Random(seed)
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """Seconds to sleep after the given (1-based) failed attempt"""
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures, then let one probe through after a cool-down"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpen unless a call may go through right now"""
+        if self.state == OPEN:
+            waited = time.monotonic() - self.opened_at
+            if waited < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpen(self.name, self.reset_timeout - waited)
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN:
+            # Exactly one probe at a time decides whether the backend is back
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpen(self.name, self.reset_timeout)
+            self._probing = True
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self) -> None:
+        """A probe ended without a verdict (cancelled or a client error)"""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+        }
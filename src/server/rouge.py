@@ -0,0 +1,112 @@
+# src/server/rouge.py
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Same tokenization as the reference rouge-score package, without stemming
+TOKEN = re.compile(r"[a-z0-9]+")
+METRICS = ("rouge1", "rouge2", "rougeL")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+def ngram_ids(tokens: np.ndarray, n: int, vocab_size: int) -> np.ndarray:
+    """One int per n-gram, from token ids in base vocab_size"""
+    if len(tokens) < n:
+        return np.empty(0, dtype=np.int64)
+    ids = np.zeros(len(tokens) - n + 1, dtype=np.int64)
+    for offset in range(n):
+        ids = ids * vocab_size + tokens[offset:len(tokens) - n + 1 + offset]
+    return ids
+
+
+def ngram_overlap(predictions: List[np.ndarray], references: List[np.ndarray], n: int,
+                  vocab_size: int) -> np.ndarray:
+    """Clipped n-gram matches, predicted and reference n-gram counts per pair; shape (pairs, 3).
+
+    Every pair's n-grams go into one array keyed by (pair, n-gram), so the
+    whole batch is counted with a couple of sorts instead of a dict per pair.
+    """
+    pairs = len(predictions)
+    predicted = [ngram_ids(tokens, n, vocab_size) for tokens in predictions]
+    expected = [ngram_ids(tokens, n, vocab_size) for tokens in references]
+    predicted_pair = np.repeat(np.arange(pairs), [len(g) for g in predicted])
+    expected_pair = np.repeat(np.arange(pairs), [len(g) for g in expected])
+    predicted_total = np.bincount(predicted_pair, minlength=pairs)
+    expected_total = np.bincount(expected_pair, minlength=pairs)
+
+    grams = np.concatenate(predicted + expected + [np.empty(0, dtype=np.int64)])
+    # Renumber n-grams densely so pair * distinct + gram can't overflow
+    distinct, dense = np.unique(grams, return_inverse=True)
+    width = max(1, len(distinct))
+    predicted_keys, predicted_counts = np.unique(
+        predicted_pair * width + dense[:len(predicted_pair)], return_counts=True
+    )
+    expected_keys, expected_counts = np.unique(
+        expected_pair * width + dense[len(predicted_pair):], return_counts=True
+    )
+    common, p, e = np.intersect1d(predicted_keys, expected_keys, assume_unique=True, return_indices=True)
+    matches = np.bincount(
+        common // width, weights=np.minimum(predicted_counts[p], expected_counts[e]), minlength=pairs
+    )
+    return np.stack([matches, predicted_total, expected_total], axis=1).astype(np.float64)
+
+
+def lcs_length(a: Sequence[int], b: Sequence[int]) -> int:
+    """Longest common subsequence length, bit-parallel over a (Hyyrö's algorithm).
+
+    Each bit of an arbitrary-size int is one DP cell of a row, so a row is
+    updated with a handful of big-int operations instead of a Python loop.
+    """
+    if not a or not b:
+        return 0
+    positions: Dict[int, int] = {}
+    for i, token in enumerate(a):
+        positions[token] = positions.get(token, 0) | (1 << i)
+    mask = (1 << len(a)) - 1
+    row = mask
+    for token in b:
+        matched = row & positions.get(token, 0)
+        row = ((row + matched) | (row - matched)) & mask
+    return len(a) - bin(row).count("1")
+
+
+def precision_recall_f1(counts: np.ndarray) -> np.ndarray:
+    """(matches, predicted, expected) rows -> (precision, recall, f1) rows"""
+    matches, predicted, expected = counts.T
+    precision = np.divide(matches, predicted, out=np.zeros_like(matches), where=predicted > 0)
+    recall = np.divide(matches, expected, out=np.zeros_like(matches), where=expected > 0)
+    total = precision + recall
+    f1 = np.divide(2 * precision * recall, total, out=np.zeros_like(total), where=total > 0)
+    return np.stack([precision, recall, f1], axis=1)
+
+
+def score_batch(predictions: Sequence[str], references: Sequence[str]) -> Dict[str, np.ndarray]:
+    """ROUGE-1/2/L for each (prediction, reference) pair; each metric is an
+    array of (precision, recall, f1) rows"""
+    if len(predictions) != len(references):
+        raise ValueError("predictions and references must have the same length")
+    vocab: Dict[str, int] = {}
+    predicted = [np.array([vocab.setdefault(t, len(vocab)) for t in tokenize(p)], dtype=np.int64)
+                 for p in predictions]
+    expected = [np.array([vocab.setdefault(t, len(vocab)) for t in tokenize(r)], dtype=np.int64)
+                for r in references]
+    vocab_size = max(1, len(vocab))
+
+    lcs = np.array([
+        [lcs_length(p.tolist(), e.tolist()), len(p), len(e)] for p, e in zip(predicted, expected)
+    ], dtype=np.float64).reshape(-1, 3)
+    return {
+        "rouge1": precision_recall_f1(ngram_overlap(predicted, expected, 1, vocab_size)),
+        "rouge2": precision_recall_f1(ngram_overlap(predicted, expected, 2, vocab_size)),
+        "rougeL": precision_recall_f1(lcs),
+    }
+
+
+def score(prediction: str, reference: str) -> Dict[str, float]:
+    """F1 for each ROUGE metric of a single summary"""
+    scores = score_batch([prediction], [reference])
+    return {metric: round(float(scores[metric][0, 2]), 4) for metric in METRICS}
@@ -0,0 +1,229 @@
+# src/server/semantic_cache.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from src.server.metrics import Counter
+
+SEMANTIC_AUDITS = Counter(
+    "semantic_cache_audits_total", "Semantic cache hits re-summarized to check them, by outcome", ["outcome"]
+)
+
+FNV_OFFSET = np.uint32(2166136261)
+FNV_PRIME = np.uint32(16777619)
+
+
+def ngram_hashes(text: str, n: int) -> np.ndarray:
+    """32-bit hash of every n-byte window of the lowercased UTF-8 text"""
+    data = np.frombuffer(text.lower().encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+    windows = len(data) - n + 1
+    if windows < 1:
+        return np.empty(0, dtype=np.uint32)
+    # FNV-1a over each window at once, then a finalizer to spread the bits
+    h = np.full(windows, FNV_OFFSET, dtype=np.uint32)
+    for offset in range(n):
+        h = (h ^ data[offset:offset + windows]) * FNV_PRIME
+    h ^= h >> np.uint32(15)
+    h *= np.uint32(0x2C1B3C6D)
+    h ^= h >> np.uint32(12)
+    return h
+
+
+def embed(text: str, dim: int = 512, n: int = 5) -> np.ndarray:
+    """Unit vector of signed, hashed character n-gram counts.
+
+    Counts are square-rooted so n-grams every English text shares (" the ")
+    don't dominate; the sign bit of each hash cancels out bucket collisions
+    on average. dim must be a power of two.
+    """
+    grams, counts = np.unique(ngram_hashes(text, n), return_counts=True)
+    signs = np.where(grams >> np.uint32(31), 1.0, -1.0)
+    vector = np.bincount(grams & np.uint32(dim - 1), weights=signs * np.sqrt(counts), minlength=dim)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).astype(np.float32)
+
+
+class SemanticHit(NamedTuple):
+    entry: int
+    summary: str
+    similarity: float
+
+
+class SemanticCache:
+    """Summaries found by what a text says rather than its exact bytes.
+
+    Texts are embedded with embed() and indexed by random-hyperplane LSH:
+    each of `tables` tables buckets a vector by which side of `bits`
+    hyperplanes it falls on, so a lookup only compares the vectors sharing a
+    bucket with it in some table. Two texts at cosine 0.85 share a bucket in
+    at least one of 16 8-bit tables about 98% of the time, and closer ones
+    almost always. A hit needs cosine similarity >= threshold and the same
+    namespace (model, prompt version and length), and entries are evicted
+    least recently used past max_entries or once older than ttl.
+
+    audit_rate of hits are meant to be re-summarized by the caller and
+    passed to audit(), which counts a false hit when the fresh summary's
+    ROUGE-L F1 against the cached one is under audit_min_rouge.
+    """
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 10_000, ttl: float = 86400,
+                 dim: int = 512, ngram: int = 5, tables: int = 16, bits: int = 8,
+                 audit_rate: float = 0.02, audit_min_rouge: float = 0.2, seed: int = 0):
+        if dim & (dim - 1):
+            raise ValueError("dim must be a power of two")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dim = dim
+        self.ngram = ngram
+        self.audit_rate = audit_rate
+        self.audit_min_rouge = audit_min_rouge
+        self.random = np.random.default_rng(seed)
+        self.planes = np.random.default_rng(seed).standard_normal((tables, bits, dim)).astype(np.float32)
+        self.weights = 1 << np.arange(bits)
+        self._lock = threading.Lock()
+        self.vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        # entry -> (namespace, summary, created_at, signatures), least recently used first
+        self._entries: "OrderedDict[int, Tuple[str, str, float, Tuple[int, ...]]]" = OrderedDict()
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in range(tables)]
+        self._free = list(range(max_entries - 1, -1, -1))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lookup_seconds = 0.0
+        self.audits = 0
+        self.false_hits = 0
+
+    def embed(self, text: str) -> np.ndarray:
+        return embed(text, self.dim, self.ngram)
+
+    def _signatures(self, vector: np.ndarray) -> Tuple[int, ...]:
+        sides = (self.planes @ vector) > 0
+        return tuple(int(s) for s in sides @ self.weights)
+
+    def lookup(self, text: str, namespace: str) -> Tuple[Optional[SemanticHit], np.ndarray]:
+        """The most similar live entry in namespace, if similar enough, and the text's vector"""
+        start = time.perf_counter()
+        vector = self.embed(text)
+        signatures = self._signatures(vector)
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            for buckets, signature in zip(self._buckets, signatures):
+                candidates.update(buckets.get(signature, ()))
+            candidates = [e for e in candidates if self._entries[e][0] == namespace]
+            hit = None
+            if candidates:
+                similarities = self.vectors[candidates] @ vector
+                best = int(np.argmax(similarities))
+                entry = candidates[best]
+                if similarities[best] >= self.threshold:
+                    _, summary, created_at, _ = self._entries[entry]
+                    if created_at + self.ttl > now:
+                        self._entries.move_to_end(entry)
+                        hit = SemanticHit(entry, summary, float(similarities[best]))
+                    else:
+                        self._remove(entry)
+            if hit is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.lookup_seconds += time.perf_counter() - start
+        return hit, vector
+
+    def add(self, vector: np.ndarray, namespace: str, summary: str) -> None:
+        signatures = self._signatures(vector)
+        with self._lock:
+            self._add(vector, namespace, summary, time.time(), signatures)
+
+    def _add(self, vector: np.ndarray, namespace: str, summary: str, created_at: float,
+             signatures: Tuple[int, ...]) -> None:
+        if not self._free:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        entry = self._free.pop()
+        self.vectors[entry] = vector
+        self._entries[entry] = (namespace, summary, created_at, signatures)
+        for buckets, signature in zip(self._buckets, signatures):
+            buckets.setdefault(signature, set()).add(entry)
+
+    def _remove(self, entry: int) -> None:
+        _, _, _, signatures = self._entries.pop(entry)
+        for buckets, signature in zip(self._buckets, signatures):
+            bucket = buckets[signature]
+            bucket.discard(entry)
+            if not bucket:
+                del buckets[signature]
+        self._free.append(entry)
+
+    def should_audit(self) -> bool:
+        return self.audit_rate > 0 and self.random.random() < self.audit_rate
+
+    def audit(self, hit: SemanticHit, agreement: float) -> bool:
+        """Record how well a fresh summary agreed (ROUGE-L F1) with a hit's;
+        a false hit is dropped from the index. Returns whether it was one."""
+        false_hit = agreement < self.audit_min_rouge
+        SEMANTIC_AUDITS.inc(outcome="false_hit" if false_hit else "agreed")
+        with self._lock:
+            self.audits += 1
+            if false_hit:
+                self.false_hits += 1
+                # The entry may have been evicted or replaced since the hit
+                if hit.entry in self._entries and self._entries[hit.entry][1] == hit.summary:
+                    self._remove(hit.entry)
+        return false_hit
+
+    def save(self, path: str) -> None:
+        """Write the index to path (.npz), replacing any earlier file atomically"""
+        with self._lock:
+            entries = list(self._entries.items())
+            vectors = self.vectors[[e for e, _ in entries]] if entries else np.zeros((0, self.dim), np.float32)
+            meta = [{"namespace": n, "summary": s, "created_at": c} for _, (n, s, c, _) in entries]
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, vectors=vectors, meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8))
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> int:
+        """Add the entries saved at path that are still fresh, oldest use first; returns how many"""
+        if not os.path.exists(path):
+            return 0
+        with np.load(path) as saved:
+            vectors = saved["vectors"]
+            meta = json.loads(saved["meta"].tobytes().decode("utf-8"))
+        if vectors.shape[1:] != (self.dim,):
+            return 0  # saved with another embedding size
+        now = time.time()
+        loaded = 0
+        for vector, item in zip(vectors, meta):
+            if item["created_at"] + self.ttl > now:
+                signatures = self._signatures(vector)
+                with self._lock:
+                    self._add(vector, item["namespace"], item["summary"], item["created_at"], signatures)
+                loaded += 1
+        return loaded
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "mean_lookup_ms": round(self.lookup_seconds / lookups * 1000, 3) if lookups else 0.0,
+                "audits": self.audits,
+                "false_hits": self.false_hits,
+                "false_hit_rate": round(self.false_hits / self.audits, 4) if self.audits else 0.0,
+            }
@@ -0,0 +1,35 @@
+# src/server/singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto one shared task"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._calls
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            # Forget the key as soon as the call settles, so a failure is
+            # delivered to current waiters but never served to later retries
+            task.add_done_callback(lambda _: self._forget(key, task))
+        else:
+            self.coalesced += 1
+
+        # Shield so one caller disconnecting does not cancel everyone's work
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
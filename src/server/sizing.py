@@ -0,0 +1,125 @@
+# src/server/sizing.py
+import math
+import threading
+from typing import Dict
+
+from src.server.chunking import SENTENCE, WORD
+from src.server.metrics import Counter, Histogram
+
+# Characters a finished sentence can end with
+SENTENCE_END = ".!?\"'”’)]"
+
+OUTPUT_BUDGET_USED = Histogram(
+    "completion_budget_used_ratio", "Completion tokens used as a share of the max_tokens budget",
+    ["model"], buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+TRUNCATIONS = Counter(
+    "completion_truncations_total", "Completions cut off at max_tokens, by how they were repaired",
+    ["model", "action"],
+)
+
+
+class ModelSizing:
+    """Running mean and variance of completion tokens per requested word"""
+
+    def __init__(self):
+        self.samples = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.truncated = 0
+        self.error = 0.0
+        self.used = 0.0
+
+
+class OutputSizer:
+    """Completion budgets (max_tokens) per model, learned from observed completions.
+
+    Until a model has min_samples untruncated completions, budgets are a
+    fixed uncalibrated_per_word * max_length. After that a budget covers the
+    learned tokens per requested word plus `deviations` standard deviations,
+    so it tracks how verbose the model actually is instead of a worst case.
+    """
+
+    def __init__(self, uncalibrated_per_word: float = 2.0, deviations: float = 2.0,
+                 min_samples: int = 20, alpha: float = 0.05, margin: int = 8):
+        self.uncalibrated_per_word = uncalibrated_per_word
+        self.deviations = deviations
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.margin = margin
+        self._models: Dict[str, ModelSizing] = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model: str) -> ModelSizing:
+        if model not in self._models:
+            self._models[model] = ModelSizing()
+        return self._models[model]
+
+    def budget(self, model: str, max_length: int) -> int:
+        with self._lock:
+            sizing = self._model(model)
+            if sizing.samples < self.min_samples:
+                return math.ceil(max_length * self.uncalibrated_per_word)
+            per_word = sizing.mean + self.deviations * math.sqrt(sizing.variance)
+        return math.ceil(max_length * per_word) + self.margin
+
+    def observe(self, model: str, max_length: int, budget: int, completion_tokens: int,
+                truncated: bool) -> None:
+        """Learn from one completion; truncated ones only say the budget was too small"""
+        if not completion_tokens or not max_length:
+            return
+        OUTPUT_BUDGET_USED.observe(min(1.0, completion_tokens / budget), model=model)
+        with self._lock:
+            sizing = self._model(model)
+            if truncated:
+                sizing.truncated += 1
+                # The real length is unknown but above the budget; learn from a
+                # value past it so budgets grow instead of staying too tight
+                per_word = 1.25 * budget / max_length
+            else:
+                per_word = completion_tokens / max_length
+                if sizing.samples:
+                    # Accuracy of the estimate made before this observation
+                    error = abs(sizing.mean * max_length - completion_tokens) / completion_tokens
+                    sizing.error += self._step(sizing) * (error - sizing.error)
+                sizing.used += self._step(sizing) * (completion_tokens / budget - sizing.used)
+                sizing.samples += 1
+            step = self._step(sizing)
+            delta = per_word - sizing.mean
+            sizing.mean += step * delta
+            sizing.variance = (1 - step) * (sizing.variance + step * delta * delta)
+
+    def _step(self, sizing: ModelSizing) -> float:
+        # Plain averaging while samples are few, then an exponential moving average
+        return max(self.alpha, 1 / (sizing.samples + 1))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                model: {
+                    "samples": s.samples,
+                    "calibrated": s.samples >= self.min_samples,
+                    "tokens_per_word": round(s.mean, 3),
+                    "tokens_per_word_stddev": round(math.sqrt(s.variance), 3),
+                    "mean_abs_error": round(s.error, 3),
+                    "budget_used": round(s.used, 3),
+                    "truncated": s.truncated,
+                }
+                for model, s in self._models.items()
+            }
+
+
+def trim_to_sentence(text: str) -> str:
+    """Drop an unfinished trailing sentence, if any sentence ends before it"""
+    ends = [m.end() for m in SENTENCE.finditer(text) if m.group().rstrip()[-1:] in SENTENCE_END]
+    return text[:ends[-1]].rstrip() if ends else text
+
+
+def word_count(text: str) -> int:
+    return sum(1 for _ in WORD.finditer(text))
+
+
+def trims_cleanly(text: str, keep: float = 0.5) -> bool:
+    """Whether cutting text back to its last full sentence keeps at least `keep` of its words"""
+    trimmed = trim_to_sentence(text)
+    return bool(trimmed) and trimmed[-1] in SENTENCE_END and word_count(trimmed) >= keep * word_count(text)
@@ -0,0 +1,103 @@
+# src/server/tracing.py
+import contextlib
+import logging
+import os
+from typing import Iterator, Mapping, Optional
+
+from src.server.metrics import STAGE_SECONDS
+
+log = logging.getLogger(__name__)
+
+# OpenTelemetry is optional: without it every span is a no-op
+try:
+    from opentelemetry import propagate, trace
+    from opentelemetry.trace import SpanKind
+    TRACING_AVAILABLE = True
+except ImportError:
+    TRACING_AVAILABLE = False
+
+
+class NoopSpan:
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_attributes(self, attributes: dict) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def configure_tracing(exporter=None) -> bool:
+    """Install an SDK tracer provider; returns whether spans will be exported.
+
+    Spans go to the given exporter (tests pass an in-memory one) or, when
+    OTEL_EXPORTER_OTLP_ENDPOINT is set, to that OTLP collector.
+    """
+    if not TRACING_AVAILABLE:
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+    except ImportError:
+        return False
+
+    if exporter is not None:
+        processor = SimpleSpanProcessor(exporter)
+    elif os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            log.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-exporter-otlp is not installed")
+            return False
+        processor = BatchSpanProcessor(OTLPSpanExporter())
+    else:
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "ai-summarizer")})
+    )
+    provider.add_span_processor(processor)
+    trace.set_tracer_provider(provider)
+    return True
+
+
+@contextlib.contextmanager
+def span(name: str, attributes: Optional[dict] = None,
+         headers: Optional[Mapping[str, str]] = None) -> Iterator:
+    """A span under the current one, or, given incoming request headers, a
+    server span continuing the caller's trace"""
+    if not TRACING_AVAILABLE:
+        yield NOOP_SPAN
+        return
+    tracer = trace.get_tracer("src.server")
+    if headers is None:
+        with tracer.start_as_current_span(name, attributes=attributes) as current:
+            yield current
+    else:
+        with tracer.start_as_current_span(
+            name, context=propagate.extract(headers), kind=SpanKind.SERVER, attributes=attributes
+        ) as current:
+            yield current
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator:
+    """Time a request stage into the stage histogram and trace it as a span"""
+    with STAGE_SECONDS.time(stage=name), span(name) as current:
+        yield current
+
+
+def current_span():
+    return trace.get_current_span() if TRACING_AVAILABLE else NOOP_SPAN
+
+
+def current_trace_id() -> Optional[str]:
+    if not TRACING_AVAILABLE:
+        return None
+    context = trace.get_current_span().get_span_context()
+    return format(context.trace_id, "032x") if context.is_valid else None
@@ -1,6 +1,29 @@
 import streamlit as st
-import requests
+import httpx
+import contextvars
+import hashlib
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+# HTTP/2 needs the h2 package (pip install "httpx[http2]"); without it the
+# pooled client still keeps HTTP/1.1 connections alive
+try:
+   import h2  # noqa: F401
+   HTTP2 = True
+except ImportError:
+   HTTP2 = False
+
+# Optional tracing: when OpenTelemetry is installed and configured (e.g. the
+# app is started with opentelemetry-instrument), each API call runs in a span
+# whose trace context is sent along, so UI and API time show up in one trace
+try:
+   from opentelemetry import trace
+   from opentelemetry.propagate import inject
+   tracer = trace.get_tracer("streamlit_app")
+except ImportError:
+   tracer = None
 
 # Configure the page
 st.set_page_config(
@@ -14,6 +37,153 @@ st.set_page_config(
 #API_URL = "http://localhost:8000"
 API_URL = "https://vertex-ai-summarizer-1055382643810.us-central1.run.app"
 
+# Client-side timeout; the API is told to finish a little earlier so a slow
+# model falls back to a quick answer instead of the request timing out
+REQUEST_TIMEOUT = 30
+API_DEADLINE_MS = (REQUEST_TIMEOUT - 2) * 1000
+# Attempts to re-open a connection that failed before the request was sent
+CONNECT_RETRIES = 2
+# Summaries kept per browser session, for repeated clicks on the same text
+SESSION_CACHE_SIZE = 20
+
+@st.cache_resource
+def get_client():
+   """One pooled client for the whole Streamlit server, shared by every
+   session and rerun, so connections and their TLS sessions are reused"""
+   return httpx.Client(
+       base_url=API_URL,
+       transport=httpx.HTTPTransport(
+           http2=HTTP2,
+           retries=CONNECT_RETRIES,
+           limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+       ),
+       timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=10),
+   )
+
+@st.cache_resource
+def get_background():
+   """Threads for API calls the script run shouldn't wait on"""
+   return ThreadPoolExecutor(max_workers=4, thread_name_prefix="api")
+
+def summary_card(summary):
+   """HTML card for the summary, with better contrast"""
+   return f"""
+   <div style="
+       background-color: #ffffff;
+       color: #333333;
+       padding: 20px;
+       border-radius: 10px;
+       border: 2px solid #4CAF50;
+       margin: 10px 0;
+       box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+   ">
+       <p style="margin: 0; font-size: 16px; line-height: 1.6; color: #333333;">
+           {summary}
+       </p>
+   </div>
+   """
+
+def traced(name):
+   """Span around a UI action, or nothing when tracing is off"""
+   return tracer.start_as_current_span(name) if tracer is not None else nullcontext()
+
+def api_headers(headers=None):
+   """Request headers plus the current trace context"""
+   headers = dict(headers or {})
+   if tracer is not None:
+       inject(headers)
+   return headers
+
+def is_json(response):
+   return response.headers.get("content-type", "").startswith("application/json")
+
+def error_detail(response):
+   """The API's error detail, or the status and the start of the body when a
+   proxy or load balancer answered with HTML or plain text instead"""
+   if is_json(response):
+       try:
+           detail = response.json().get("detail")
+       except (ValueError, AttributeError):
+           detail = None
+       if detail:
+           return detail
+   text = " ".join(response.text.split())[:200]
+   return f"HTTP {response.status_code}" + (f": {text}" if text else "")
+
+def stream_summary(payload):
+   """Yield (event, data) pairs from the API's Server-Sent Events stream"""
+   with get_client().stream(
+       "POST",
+       "/summarize/stream",
+       json=payload,
+       headers=api_headers({
+           "Accept": "text/event-stream",
+           "X-Request-Timeout-Ms": str(API_DEADLINE_MS)
+       }),
+       # The read timeout applies between streamed events
+       timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=10)
+   ) as response:
+       is_stream = response.headers.get("content-type", "").startswith("text/event-stream")
+       if response.status_code != 200 or not is_stream:
+           response.read()
+           yield "error", {"detail": error_detail(response)}
+           return
+       
+       event = "message"
+       for line in response.iter_lines():
+           if line.startswith("event: "):
+               event = line[len("event: "):]
+           elif line.startswith("data: "):
+               yield event, json.loads(line[len("data: "):])
+
+def check_status(client):
+   """GET /health: (status code, body or error detail, round trip in ms)"""
+   with traced("check api status"):
+       start = time.perf_counter()
+       response = client.get("/health", headers=api_headers(), timeout=10)
+       round_trip_ms = (time.perf_counter() - start) * 1000
+   if response.status_code == 200 and is_json(response):
+       return response.status_code, response.json(), round_trip_ms
+   return response.status_code, error_detail(response), round_trip_ms
+
+def check_status_async():
+   """Start a status check on a background thread, in the current trace.
+
+   The client is fetched here, on the script thread: st.cache_resource needs
+   the script's run context, which the background thread doesn't have"""
+   client = get_client()
+   return get_background().submit(contextvars.copy_context().run, check_status, client)
+
+def render_status():
+   """Show the latest status check; returns whether it has finished"""
+   future = st.session_state.api_status
+   if not future.done():
+       st.caption("⏳ Checking API status...")
+       return False
+   try:
+       status_code, data, round_trip_ms = future.result()
+   except Exception as e:
+       st.error(f"❌ Cannot reach API: {str(e)}")
+       return True
+   if isinstance(data, dict):
+       st.success(f"✅ API is online!")
+       st.info(f"AI Mode: {data.get('ai', 'unknown')}")
+       st.caption(f"Round trip {round_trip_ms:.0f} ms")
+   else:
+       st.error(f"❌ API is having issues ({data})")
+   return True
+
+def summary_key(text, max_length):
+   return hashlib.sha256(text.encode("utf-8")).hexdigest(), max_length
+
+def remember_summary(key, result):
+   """Keep a summary for this session, dropping the oldest past SESSION_CACHE_SIZE"""
+   summaries = st.session_state.setdefault("summaries", {})
+   summaries.pop(key, None)
+   summaries[key] = result
+   while len(summaries) > SESSION_CACHE_SIZE:
+       summaries.pop(next(iter(summaries)))
+
 # Title and description
 st.title("🤖 AI Text Summarizer")
 st.markdown("### Powered by OpenAI GPT")
@@ -29,20 +199,21 @@ max_length = st.sidebar.slider(
    step=10
 )
 
-# API status check
+# API status check, on a background thread so the page renders meanwhile;
+# the first one of a session also opens the pooled connection early
 with st.sidebar:
    st.markdown("---")
-   if st.button("🔍 Check API Status"):
-       try:
-           response = requests.get(f"{API_URL}/health", timeout=10)
-           if response.status_code == 200:
-               data = response.json()
-               st.success(f"✅ API is online!")
-               st.info(f"AI Mode: {data.get('ai', 'unknown')}")
-           else:
-               st.error("❌ API is having issues")
-       except Exception as e:
-           st.error(f"❌ Cannot reach API: {str(e)}")
+   if st.button("🔍 Check API Status") or "api_status" not in st.session_state:
+       st.session_state.api_status = check_status_async()
+   if not st.session_state.api_status.done() and hasattr(st, "fragment"):
+       # Redraw just this part until the answer arrives (Streamlit 1.37+)
+       @st.fragment(run_every=0.5)
+       def pending_status():
+           if render_status():
+               st.rerun()
+       pending_status()
+   else:
+       render_status()
 
 # Main interface
 col1, col2 = st.columns([1, 1])
@@ -98,77 +269,90 @@ with col2:
    if st.button("✨ Generate Summary", type="primary", use_container_width=True):
        if not user_text:
            st.error("❌ Please enter some text to summarize!")
-       elif len(user_text.strip()) < 50:
+       elif len(stripped_text := user_text.strip()) < 50:
            st.error("❌ Text is too short! Please enter at least 50 characters.")
        else:
-           # Show loading spinner
-           with st.spinner("🤖 AI is analyzing your text..."):
-               try:
-                   # Make API call
+           try:
+               key = summary_key(stripped_text, max_length)
+               result = st.session_state.get("summaries", {}).get(key)
+               from_session = result is not None
+               
+               st.markdown("### 📄 AI Summary:")
+               summary_box = st.empty()
+               
+               if from_session:
+                   summary_box.markdown(summary_card(result["summary"]), unsafe_allow_html=True)
+               else:
                    payload = {
-                       "text": user_text.strip(),
+                       "text": stripped_text,
                        "max_length": max_length
                    }
+                   summary = ""
+                   meta = {}
+                   stream_error = None
                    
-                   response = requests.post(
-                       f"{API_URL}/summarize",
-                       json=payload,
-                       headers={"Content-Type": "application/json"},
-                       timeout=30
-                   )
+                   # Render tokens as the API streams them
+                   with st.spinner("🤖 AI is analyzing your text..."), traced("generate summary"):
+                       start = time.perf_counter()
+                       for event, data in stream_summary(payload):
+                           if event == "token":
+                               summary += data["text"]
+                               summary_box.markdown(summary_card(summary), unsafe_allow_html=True)
+                           elif event == "done":
+                               meta = data
+                           elif event == "error":
+                               stream_error = data.get("detail", "Unknown error")
+                       round_trip_ms = (time.perf_counter() - start) * 1000
+                   
+                   if stream_error is None:
+                       result = {"summary": summary.strip(), "round_trip_ms": round_trip_ms, **meta}
+                       remember_summary(key, result)
+                   else:
+                       summary_box.empty()
+                       st.error(f"❌ API Error: {stream_error}")
+               
+               if result is not None:
+                   # Display success metrics
+                   original_length = char_count
+                   original_words = word_count
+                   summary_length = len(result["summary"])
+                   summary_words = len(result["summary"].split())
+                   compression_ratio = (1 - summary_length/original_length) * 100
                    
-                   if response.status_code == 200:
-                       result = response.json()
-                       
-                       # Display success metrics
-                       original_length = len(user_text)
-                       original_words = len(user_text.split())
-                       summary_length = len(result["summary"])
-                       summary_words = len(result["summary"].split())
-                       compression_ratio = (1 - summary_length/original_length) * 100
-                       
-                       # Metrics
-                       col_metric1, col_metric2, col_metric3 = st.columns(3)
-                       with col_metric1:
-                           st.metric("Original", f"{original_words} words")
-                       with col_metric2:
-                           st.metric("Summary", f"{summary_words} words")
-                       with col_metric3:
-                           st.metric("Compressed", f"{compression_ratio:.1f}%")
-                       
-                       # Summary result
+                   # Metrics
+                   col_metric1, col_metric2, col_metric3 = st.columns(3)
+                   with col_metric1:
+                       st.metric("Original", f"{original_words} words")
+                   with col_metric2:
+                       st.metric("Summary", f"{summary_words} words")
+                   with col_metric3:
+                       st.metric("Compressed", f"{compression_ratio:.1f}%")
+                   
+                   # Summary result
+                   if from_session:
+                       st.success("♻️ Same text and length as earlier in this session - shown without calling the API")
+                   else:
                        st.success("✅ Summary generated successfully!")
-                       st.markdown("### 📄 AI Summary:")
-                       
-                       # Display summary with better contrast
-                       st.markdown(f"""
-                       <div style="
-                           background-color: #ffffff;
-                           color: #333333;
-                           padding: 20px;
-                           border-radius: 10px;
-                           border: 2px solid #4CAF50;
-                           margin: 10px 0;
-                           box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                       ">
-                           <p style="margin: 0; font-size: 16px; line-height: 1.6; color: #333333;">
-                               {result['summary']}
-                           </p>
-                       </div>
-                       """, unsafe_allow_html=True)
-
-                       
-                       # Additional info
-                       ai_source = result.get('summary_source', 'unknown')
-                       if ai_source == 'openai':
-                           st.info("🚀 Powered by OpenAI GPT")
-                       elif ai_source == 'mock':
-                           st.warning("⚠️ Demo mode - using mock responses")
-                       else:
-                           st.info(f"🔧 Source: {ai_source}")
-                       
-                       # Download option
-                       summary_text = f"""AI TEXT SUMMARIZER RESULTS
+                   if result.get("latency_ms") is not None:
+                       st.caption(
+                           f"⏱️ First token after {result.get('time_to_first_token_ms') or 0:.0f} ms, "
+                           f"complete after {result['latency_ms']:.0f} ms "
+                           f"({result['round_trip_ms']:.0f} ms round trip)"
+                       )
+                   
+                   # Additional info
+                   ai_source = result.get('summary_source', 'unknown')
+                   if ai_source == 'openai':
+                       st.info("🚀 Powered by OpenAI GPT")
+                   elif ai_source == 'local':
+                       st.info("⚡ Local extractive summary")
+                   elif ai_source == 'fallback':
+                       st.warning(f"⚠️ AI service unavailable ({result.get('fallback_reason')}) - showing a local extractive summary")
+                   else:
+                       st.info(f"🔧 Source: {ai_source}")
+                   
+                   # Download option
+                   summary_text = f"""AI TEXT SUMMARIZER RESULTS
 {'='*50}
 
 ORIGINAL TEXT ({original_words} words):
@@ -184,24 +368,20 @@ Compression: {compression_ratio:.1f}%
 AI Source: {ai_source}
 Generated: {st.session_state.get('timestamp', 'Unknown')}
 """
-                       
-                       st.download_button(
-                           label="📥 Download Summary",
-                           data=summary_text,
-                           file_name="ai_summary.txt",
-                           mime="text/plain"
-                       )
-                       
-                   else:
-                       error_detail = response.json().get("detail", "Unknown error")
-                       st.error(f"❌ API Error: {error_detail}")
-                       
-               except requests.exceptions.Timeout:
-                   st.error("⏰ Request timed out. The text might be too long or the API is busy.")
-               except requests.exceptions.ConnectionError:
-                   st.error("🔌 Cannot connect to the API. Please check if the service is running.")
-               except Exception as e:
-                   st.error(f"💥 Unexpected error: {str(e)}")
+                   
+                   st.download_button(
+                       label="📥 Download Summary",
+                       data=summary_text,
+                       file_name="ai_summary.txt",
+                       mime="text/plain"
+                   )
+                   
+           except httpx.TimeoutException:
+               st.error("⏰ Request timed out. The text might be too long or the API is busy.")
+           except httpx.TransportError:
+               st.error("🔌 Cannot connect to the API. Please check if the service is running.")
+           except Exception as e:
+               st.error(f"💥 Unexpected error: {str(e)}")
 
 # Footer section
 st.markdown("---")
@@ -249,7 +429,7 @@ with st.expander("📖 How to Use This App"):
    - **AI Model**: OpenAI GPT-3.5-turbo
    - **Cost**: ~$0.002 per 1000 words
    - **Response Time**: Usually 2-5 seconds
-   - **Max Input**: No hard limit, but longer texts take more time
+   - **Max Input**: No hard limit; long documents are split into chunks and summarized hierarchically
    """)
 
 # Fixed CSS for better styling